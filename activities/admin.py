@@ -1,10 +1,24 @@
 from django.contrib import admin
+from users.models import CustomUser
 from .models import Activity
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
     list_display = ['title', 'activity_type', 'created_by', 'created_at']
     list_filter = ['activity_type', 'created_by', 'created_at']
-    search_fields = ['title', 'description', 'created_by__username']
+    # Поиск по автору - в get_search_results: пользователи могут быть в другой БД
+    search_fields = ['title', 'description']
+    # Автора подгружает get_queryset (JOIN между БД невозможен)
+    list_select_related = ()
     fields = ['title', 'description', 'activity_type', 'created_by', 'photo_url', 'created_at']
     readonly_fields = ['created_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_author()
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            authors = CustomUser.objects.filter(username__icontains=search_term).values_list('pk', flat=True)
+            queryset |= self.get_queryset(request).filter(created_by_id__in=list(authors))
+        return queryset, may_have_duplicates
@@ -0,0 +1,4 @@
+"""Пользовательские фрагменты ленты активностей."""
+from config.page_cache import register_hole
+
+register_hole('activity_actions', 'activities/holes/activity_actions.html', arg_names=['activity_id'])
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "activities",
+            "0003_alter_activity_options_alter_activity_activity_type_and_more",
+        ),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activity",
+            index=models.Index(
+                fields=["created_at", "id"], name="activity_created_id_idx"
+            ),
+        ),
+    ]
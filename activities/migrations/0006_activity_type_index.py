@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activities", "0005_photo_derivatives"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activity",
+            index=models.Index(
+                fields=["activity_type", "created_at", "id"],
+                name="activity_type_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from config.routers import database_for_app
+
+# Как в activities.models: FK без ограничения только для отдельной БД активностей
+SEPARATE_DATABASE = database_for_app('activities') != database_for_app('users')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activities", "0008_created_by_cross_database"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="activity",
+            name="created_by",
+            field=models.ForeignKey(
+                db_constraint=not SEPARATE_DATABASE,
+                on_delete=(
+                    django.db.models.deletion.DO_NOTHING if SEPARATE_DATABASE
+                    else django.db.models.deletion.CASCADE
+                ),
+                related_name="activities",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Создатель",
+            ),
+        ),
+    ]
@@ -1,6 +1,20 @@
 from django.db import models
+from config.routers import database_for_app, same_database
 from users.models import CustomUser
 
+# Активности вынесены в свою БД (PAWSHELTER_ACTIVITIES_DB, config/routers.py):
+# ограничение FK на пользователей из другой БД невозможно
+SEPARATE_DATABASE = database_for_app('activities') != database_for_app('users')
+
+
+class ActivityQuerySet(models.QuerySet):
+    def with_author(self):
+        """Подгружает автора: JOIN, если пользователи в той же БД, иначе отдельным запросом."""
+        if same_database(Activity, CustomUser):
+            return self.select_related('created_by')
+        return self.prefetch_related('created_by')
+
+
 class Activity(models.Model):
     ACTIVITY_TYPES = [
         ('feeding', 'Кормление'),
@@ -14,14 +28,31 @@ class Activity(models.Model):
     title = models.CharField("Название", max_length=255)
     description = models.TextField("Описание")
     activity_type = models.CharField("Тип активности", max_length=20, choices=ACTIVITY_TYPES)
-    created_by = models.ForeignKey(CustomUser, verbose_name="Создатель", related_name='activities', on_delete=models.CASCADE)
+    # В отдельной БД активностей FK без ограничения в БД, а каскадное удаление
+    # выполняет сигнал (activities/signals.py); в общей - обычный FK с CASCADE
+    created_by = models.ForeignKey(
+        CustomUser, verbose_name="Создатель", related_name='activities',
+        on_delete=models.DO_NOTHING if SEPARATE_DATABASE else models.CASCADE,
+        db_constraint=not SEPARATE_DATABASE,
+    )
     photo_url = models.ImageField("Фото (опционально)", upload_to='activities/%Y/%m/%d', blank=True, null=True)
     created_at = models.DateTimeField("Дата создания", auto_now_add=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+    # Файл, для которого построены миниатюры (см. config/images.py)
+    derivatives_name = models.CharField(max_length=255, blank=True, default='', editable=False)
+
+    objects = ActivityQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Активность приюта"
         verbose_name_plural = "Активности приюта"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset-пагинация API по (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='activity_created_id_idx'),
+            # Лента с фильтром по типу
+            models.Index(fields=['activity_type', 'created_at', 'id'], name='activity_type_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.activity_type})"
@@ -1,11 +1,17 @@
 from rest_framework import serializers
+from config.images import derivative_urls
 from .models import Activity
 
 class ActivitySerializer(serializers.ModelSerializer):
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
+    # Миниатюры {thumb|card|full: {webp, jpg}}; пока их нет - ссылки на оригинал
+    photo_derivatives = serializers.SerializerMethodField()
     
     class Meta:
         model = Activity
-        fields = ['id', 'title', 'description', 'activity_type', 'photo_url', 
+        fields = ['id', 'title', 'description', 'activity_type', 'photo_url', 'photo_derivatives',
                   'created_by', 'created_by_username', 'created_at']
         read_only_fields = ['id', 'created_by', 'created_at']
+    
+    def get_photo_derivatives(self, obj):
+        return derivative_urls(obj)
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from config import page_cache
+from config.images import derivatives_ready, schedule_derivatives, schedule_file_cleanup
+from users.models import CustomUser
+from .models import SEPARATE_DATABASE, Activity
+
+
+@receiver(post_save, sender=Activity)
+def build_photo_derivatives(sender, instance, **kwargs):
+    schedule_derivatives(instance)
+
+
+@receiver(post_delete, sender=Activity)
+def delete_photo_files(sender, instance, **kwargs):
+    schedule_file_cleanup(instance)
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+@receiver(derivatives_ready, sender=Activity)
+def invalidate_pages(sender, **kwargs):
+    page_cache.invalidate('activities')
+
+
+@receiver(post_save, sender=CustomUser)
+def touch_user_activities(sender, instance, created, update_fields=None, **kwargs):
+    """Имя автора входит в ответ API активностей: меняем updated_at его записей (ETag списка)."""
+    if not created and (update_fields is None or 'username' in update_fields):
+        Activity.objects.filter(created_by=instance).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=CustomUser)
+def delete_user_activities(sender, instance, **kwargs):
+    # Каскад вручную, только если активности в другой БД, чем пользователи:
+    # в общей БД их удаляет CASCADE внешнего ключа
+    if SEPARATE_DATABASE:
+        Activity.objects.filter(created_by=instance).delete()
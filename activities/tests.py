@@ -1,6 +1,9 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from .models import Activity
 
 User = get_user_model()
 
@@ -56,3 +59,130 @@ class ActivitiesPermissionsTests(TestCase):
         )
         self.assertEqual(response.status_code, 201)
 
+
+
+class ActivityListPaginationTests(TestCase):
+    """Keyset-пагинация API активностей."""
+
+    def setUp(self):
+        self.client = Client()
+        self.volunteer = User.objects.create_user(
+            username="volunteer",
+            password="volpass",
+            role="volunteer",
+        )
+        for i in range(5):
+            Activity.objects.create(
+                title=f"Новость {i}",
+                description="Описание",
+                activity_type="news",
+                created_by=self.volunteer,
+            )
+        self.client.login(username="volunteer", password="volpass")
+
+    def test_cursor_walks_forward_and_back(self):
+        """Проход по страницам вперёд и назад без пропусков и повторов."""
+        url = reverse("api_activities")
+        first = self.client.get(url, {"page_size": 2}).json()
+        self.assertIsNone(first["previous"])
+        titles = [a["title"] for a in first["results"]]
+
+        page = first
+        while page["next"]:
+            page = self.client.get(page["next"]).json()
+            titles += [a["title"] for a in page["results"]]
+        self.assertEqual(titles, [f"Новость {i}" for i in range(4, -1, -1)])
+
+        back = self.client.get(page["previous"]).json()
+        self.assertEqual([a["title"] for a in back["results"]], ["Новость 2", "Новость 1"])
+
+    def test_renamed_author_changes_list_etag(self):
+        """Имя автора входит в ответ: после переименования ETag списка другой."""
+        url = reverse("api_activities")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.volunteer.username = "helper"
+        self.volunteer.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["created_by_username"], "helper")
+
+    def test_invalid_cursor_returns_404(self):
+        """Испорченный курсор отклоняется."""
+        response = self.client.get(reverse("api_activities"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ActivityFeedTests(TestCase):
+    """Постраничная лента активностей и фрагменты для бесконечной прокрутки."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        authors = [
+            User.objects.create_user(username=f"volunteer{i}", role="volunteer")
+            for i in range(3)
+        ]
+        for i in range(25):
+            Activity.objects.create(
+                title=f"Новость {i}",
+                description="Описание",
+                activity_type="medical" if i % 5 == 0 else "news",
+                created_by=authors[i % 3],
+            )
+
+    def test_feed_is_paginated_and_fragment_continues(self):
+        """Первая страница - 20 записей, фрагмент по ссылке отдаёт остаток."""
+        response = self.client.get(reverse("activity_feed"))
+        self.assertEqual(len(response.context["activities"]), 20)
+        next_url = response.context["next_items_url"]
+        self.assertTrue(next_url.startswith(reverse("activity_feed_items")))
+
+        fragment = self.client.get(next_url)
+        self.assertEqual(len(fragment.context["activities"]), 5)
+        self.assertIsNone(fragment.context["next_items_url"])
+        self.assertNotContains(fragment, "feed-sentinel")
+
+    def test_authors_are_joined(self):
+        """Число запросов не зависит от числа авторов на странице."""
+        # Анонимный запрос: один SELECT с JOIN на авторов
+        with self.assertNumQueries(1):
+            self.client.get(reverse("activity_feed_items"))
+
+    def test_filter_by_type(self):
+        """Фильтр по типу сохраняется в ссылке на следующий фрагмент."""
+        response = self.client.get(reverse("activity_feed"), {"activity_type": "medical", "page_size": 3})
+        self.assertEqual(len(response.context["activities"]), 3)
+        self.assertTrue(all(a.activity_type == "medical" for a in response.context["activities"]))
+        self.assertIn("activity_type=medical", response.context["next_items_url"])
+
+    def test_cached_feed_shows_staff_buttons_per_user(self):
+        """Лента кэшируется общей, кнопки сотрудников подставляются по пользователю."""
+        self.assertNotContains(self.client.get(reverse("activity_feed")), "Редактировать")
+        self.client.force_login(User.objects.get(username="volunteer0"))
+        response = self.client.get(reverse("activity_feed"))
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Редактировать", count=20)
+
+
+class ActivityAuthorTests(TestCase):
+    """Автор активности в общей БД - внешний ключ с ограничением и каскадом."""
+
+    def setUp(self):
+        self.volunteer = User.objects.create_user(username="volunteer", role="volunteer")
+        Activity.objects.create(
+            title="Кормление", description="Утро", activity_type="feeding", created_by=self.volunteer
+        )
+
+    def test_author_foreign_key_is_constrained(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Activity._meta.db_table)
+        self.assertIn(
+            (User._meta.db_table, "id"),
+            [constraint["foreign_key"] for constraint in constraints.values()],
+        )
+
+    def test_queryset_delete_of_users_removes_their_activities(self):
+        User.objects.filter(pk=self.volunteer.pk).delete()
+        self.assertFalse(Activity.objects.exists())
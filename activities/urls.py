@@ -1,13 +1,16 @@
 # activities/urls.py
 from django.urls import path
-from .views import home, activity_feed, create_activity, edit_activity, delete_activity, ActivityListAPI, ActivityDetailAPI
+from config.export import ExportAPI
+from .views import home, activity_feed, activity_feed_items, create_activity, edit_activity, delete_activity, ActivityListAPI, ActivityDetailAPI
 
 urlpatterns = [
     path("", home, name="home"),  # Главная страница
     path("feed/", activity_feed, name="activity_feed"),  # Полная лента активностей
+    path("feed/items/", activity_feed_items, name="activity_feed_items"),  # Фрагмент ленты для подгрузки
     path("activities/create/", create_activity, name="create_activity"),  # Создание активности
     path("activities/<int:pk>/edit/", edit_activity, name="edit_activity"),  # Редактирование активности
     path("activities/<int:pk>/delete/", delete_activity, name="delete_activity"),  # Удаление активности
     path("api/activities/", ActivityListAPI.as_view(), name="api_activities"),  # для API
     path("api/activities/<int:pk>/", ActivityDetailAPI.as_view(), name="api_activity_detail"),  # для API
+    path("api/activities/export.<str:extension>", ExportAPI.as_view(dataset="activities"), name="api_activities_export"),
 ]
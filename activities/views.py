@@ -1,27 +1,32 @@
 # activities/views.py
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from config.conditional import detail_validators, list_validators, not_modified, set_validators
+from config.page_cache import cached_page
+from config.instrumentation import query_budget
+from config.pagination import KeysetPagination
+from config.query_plan import QueryPlanMixin
+from config.routers import replica_reads
+from config.sqlite import serialized_write
 from .models import Activity
 from .serializers import ActivitySerializer
 
 
+@query_budget(4)
+@replica_reads
 def home(request):
     """Главная страница с лентой активностей и карточками животных"""
-    from animals.models import Animal, AnimalPhoto
+    from animals.models import Animal
     
-    activities = Activity.objects.order_by('-created_at')[:10]  # Последние 10 активностей
-    animals = Animal.objects.exclude(slug='').order_by('-created_at')[:6]  # Последние 6 животных с slug (все статусы)
-    
-    # Добавляем фотографии для каждого животного
-    for animal in animals:
-        photos = AnimalPhoto.objects.filter(animal=animal)
-        animal.photos_list = list(photos)
-        animal.first_photo = photos.first() if photos.exists() else None
+    activities = Activity.objects.with_author().order_by('-created_at')[:10]  # Последние 10 активностей
+    # Последние 6 животных с slug (все статусы); карточки берутся из кэша
+    animals = Animal.objects.exclude(slug='').order_by('-created_at').only('id', 'updated_at')[:6]
     
     return render(request, 'activities/home.html', {
         'activities': activities,
@@ -29,12 +34,53 @@ def home(request):
     })
 
 
+FEED_PAGE_SIZE = 20
+
+
+def _feed_page(request):
+    """Одна страница ленты (keyset) с необязательным фильтром по типу."""
+    activities = Activity.objects.with_author()
+    activity_type = request.GET.get('activity_type', '')
+    if activity_type:
+        activities = activities.filter(activity_type=activity_type)
+
+    paginator = KeysetPagination('created_at', page_size=FEED_PAGE_SIZE)
+    page = paginator.paginate_page(activities, request)
+
+    # Ссылка на следующий HTML-фрагмент для бесконечной прокрутки
+    next_items_url = None
+    if paginator.next_cursor:
+        params = request.GET.copy()
+        params[paginator.cursor_query_param] = paginator.next_cursor
+        next_items_url = f"{reverse('activity_feed_items')}?{params.urlencode()}"
+
+    return {
+        'activities': page,
+        'paginator': paginator,
+        'next_items_url': next_items_url,
+        'activity_type': activity_type,
+    }
+
+
+@query_budget(3)
+@replica_reads
+@cached_page('activities')
 def activity_feed(request):
     """Представление для отображения ленты активностей (шаблон)"""
-    activities = Activity.objects.order_by('-created_at')
-    return render(request, 'activities/feed.html', {'activities': activities})
+    context = _feed_page(request)
+    context['activity_types'] = Activity.ACTIVITY_TYPES
+    return render(request, 'activities/feed.html', context)
+
 
+@query_budget(3)
+@replica_reads
+@cached_page('activities')
+def activity_feed_items(request):
+    """HTML-фрагмент следующей страницы ленты (для бесконечной прокрутки)"""
+    return render(request, 'activities/feed_items.html', _feed_page(request))
 
+
+@query_budget(3)
 @login_required
 def delete_activity(request, pk):
     """Удаление активности"""
@@ -52,6 +98,7 @@ def delete_activity(request, pk):
     return render(request, 'activities/delete_confirm.html', {'activity': activity})
 
 
+@query_budget(2)
 @login_required
 def create_activity(request):
     """Создание новой активности"""
@@ -83,6 +130,7 @@ def create_activity(request):
     })
 
 
+@query_budget(3)
 @login_required
 def edit_activity(request, pk):
     """Редактирование активности"""
@@ -105,7 +153,7 @@ def edit_activity(request, pk):
         if not activity.title or not activity.description or not activity.activity_type:
             messages.error(request, 'Заполните все обязательные поля')
         else:
-            activity.save()
+            serialized_write(activity.save)()
             messages.success(request, 'Активность успешно обновлена!')
             return redirect('home')
     
@@ -114,8 +162,11 @@ def edit_activity(request, pk):
         'activity_types': Activity.ACTIVITY_TYPES
     })
 
-class ActivityListAPI(APIView):
+@query_budget(4)
+@replica_reads
+class ActivityListAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = ActivitySerializer
     
     def get(self, request):
         # Все пользователи могут просматривать активности
@@ -126,8 +177,15 @@ class ActivityListAPI(APIView):
         if activity_type:
             activities = activities.filter(activity_type=activity_type)
         
-        serializer = ActivitySerializer(activities, many=True)
-        return Response(serializer.data)
+        validators = list_validators(activities, request.get_full_path())
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+        
+        paginator = KeysetPagination('created_at')
+        page = paginator.paginate_queryset(self.optimize_queryset(activities), request)
+        serializer = ActivitySerializer(page, many=True)
+        return set_validators(paginator.get_paginated_response(serializer.data), validators)
     
     def post(self, request):
         # Только администраторы и волонтёры могут создавать активности
@@ -145,16 +203,23 @@ class ActivityListAPI(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ActivityDetailAPI(APIView):
+@query_budget(4)
+class ActivityDetailAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = ActivitySerializer
     
     def get_object(self, pk):
         try:
-            return Activity.objects.get(pk=pk)
+            return self.optimize_queryset(Activity.objects.all()).get(pk=pk)
         except Activity.DoesNotExist:
             return None
     
     def get(self, request, pk):
+        validators = detail_validators(Activity.objects.all(), pk)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+        
         activity = self.get_object(pk)
         if not activity:
             return Response(
@@ -163,7 +228,7 @@ class ActivityDetailAPI(APIView):
             )
         
         serializer = ActivitySerializer(activity)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), validators)
     
     def put(self, request, pk):
         # Только администраторы и волонтёры могут редактировать активности
@@ -1,5 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import Adoption, Return
+from . import services
+
+# Причина для отклонения из списка в админке (там нет поля для ввода)
+ADMIN_REJECTION_REASON = 'Заявка отклонена администратором'
+
 
 @admin.register(Adoption)
 class AdoptionAdmin(admin.ModelAdmin):
@@ -8,6 +13,31 @@ class AdoptionAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'animal__name']
     fields = ['user', 'animal', 'status', 'submitted_at', 'rejection_reason']
     readonly_fields = ['submitted_at']
+    actions = ['approve_selected', 'reject_selected']
+
+    def _decide(self, request, queryset, action, reason=''):
+        # Все выбранные заявки - одной пачкой services.decide_batch
+        decisions = [(pk, action, reason) for pk in queryset.order_by('submitted_at', 'id').values_list('pk', flat=True)]
+        try:
+            results = services.decide_batch(decisions)
+        except services.AdoptionTransitionError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        done = [result for result in results if 'status' in result]
+        failed = [result for result in results if 'error' in result]
+        if done:
+            self.message_user(request, f"Обработано заявок: {len(done)}", messages.SUCCESS)
+        for result in failed:
+            self.message_user(request, f"Заявка #{result['id']}: {result['error']}", messages.WARNING)
+
+    @admin.action(description="Одобрить выбранные заявки")
+    def approve_selected(self, request, queryset):
+        self._decide(request, queryset, 'approve')
+
+    @admin.action(description="Отклонить выбранные заявки")
+    def reject_selected(self, request, queryset):
+        self._decide(request, queryset, 'reject', ADMIN_REJECTION_REASON)
+
 
 @admin.register(Return)
 class ReturnAdmin(admin.ModelAdmin):
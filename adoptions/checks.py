@@ -0,0 +1,64 @@
+"""
+Проверка планов горячих запросов по заявкам через EXPLAIN QUERY PLAN.
+
+Запускается как системная проверка с тегом database:
+
+    python manage.py check --database default
+
+и предупреждает, если какой-то из запросов читает таблицу полным сканированием.
+"""
+from django.core.checks import Tags, Warning, register
+from django.db import DatabaseError, connections
+
+
+def hot_queries():
+    """Запросы, которые выполняются на каждом переходе/странице заявок."""
+    from .models import Adoption
+
+    return {
+        # services.approve: отклонение конкурирующих заявок
+        'competing_pending': Adoption.objects.filter(animal_id=0, status='pending'),
+        # AdoptionCreateSerializer.validate: активная заявка пользователя на животное
+        'active_for_user_animal': Adoption.objects.filter(
+            user_id=0, animal_id=0, status__in=['pending', 'approved']
+        ).order_by('pk')[:1],
+        # return_list: одобренные заявки пользователя без возврата
+        'approved_without_return': Adoption.objects.filter(user_id=0, status='approved').exclude(
+            return_record__isnull=False
+        ).order_by('-submitted_at'),
+        # adoption_list: "Мои заявки" и страница сотрудника с фильтром по статусу
+        'user_page': Adoption.objects.filter(user_id=0).order_by('-submitted_at', '-id')[:26],
+        'status_page': Adoption.objects.filter(status='pending').order_by('-submitted_at', '-id')[:26],
+    }
+
+
+def full_scans(plan):
+    """Строки плана SQLite с полным сканированием таблицы (SCAN без индекса)."""
+    return [
+        line.strip() for line in plan.splitlines()
+        if ' SCAN ' in f' {line} ' and 'USING' not in line and 'CONSTANT ROW' not in line
+    ]
+
+
+@register(Tags.database)
+def check_adoption_query_plans(app_configs=None, databases=None, **kwargs):
+    warnings = []
+    for alias in databases or []:
+        if connections[alias].vendor != 'sqlite':
+            continue
+        for name, queryset in hot_queries().items():
+            try:
+                plan = queryset.using(alias).explain()
+            except DatabaseError as e:
+                warnings.append(Warning(
+                    f"Не удалось получить план запроса {name}: {e}",
+                    id='adoptions.W002',
+                ))
+                continue
+            for line in full_scans(plan):
+                warnings.append(Warning(
+                    f"Запрос {name} выполняет полное сканирование: {line}",
+                    hint="Проверьте составные индексы Adoption.Meta.indexes и примените миграции.",
+                    id='adoptions.W001',
+                ))
+    return warnings
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("adoptions", "0003_alter_adoption_options_alter_return_options_and_more"),
+        ("animals", "0004_keyset_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="adoption",
+            index=models.Index(
+                fields=["submitted_at", "id"], name="adoption_submitted_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="return",
+            index=models.Index(
+                fields=["returned_at", "id"], name="return_returned_id_idx"
+            ),
+        ),
+    ]
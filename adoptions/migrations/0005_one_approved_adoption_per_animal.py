@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("adoptions", "0004_keyset_pagination_indexes"),
+        ("animals", "0006_photo_derivatives"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="adoption",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "approved")),
+                fields=("animal",),
+                name="adoption_one_approved_per_animal",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("adoptions", "0005_one_approved_adoption_per_animal"),
+        ("animals", "0006_photo_derivatives"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="adoption",
+            index=models.Index(
+                fields=["status", "submitted_at", "id"],
+                name="adoption_status_submitted_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("adoptions", "0006_adoption_status_submitted_index"),
+        ("animals", "0006_photo_derivatives"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="adoption",
+            index=models.Index(
+                fields=["animal", "status"], name="adoption_animal_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="adoption",
+            index=models.Index(
+                fields=["user", "status", "submitted_at"],
+                name="adoption_user_status_sub_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="adoption",
+            index=models.Index(
+                fields=["user", "submitted_at", "id"],
+                name="adoption_user_submitted_idx",
+            ),
+        ),
+    ]
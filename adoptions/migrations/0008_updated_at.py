@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:46
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    # Существующие записи считаются не менявшимися с момента создания
+    Adoption = apps.get_model("adoptions", "Adoption")
+    Adoption.objects.update(updated_at=F("submitted_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("adoptions", "0007_adoption_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adoption",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Дата изменения"),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
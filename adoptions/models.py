@@ -14,12 +14,33 @@ class Adoption(models.Model):
     animal = models.ForeignKey(Animal, verbose_name="Животное", related_name='adoptions', on_delete=models.CASCADE)
     status = models.CharField("Статус", max_length=20, choices=STATUS_CHOICES, default='pending')
     submitted_at = models.DateTimeField("Дата подачи заявки", auto_now_add=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
     rejection_reason = models.TextField("Причина отклонения", blank=False)  # обязательно
 
     class Meta:
         verbose_name = "Заявка на усыновление"
         verbose_name_plural = "Заявки на усыновление"
+        # Уникальный индекс (user, animal) обслуживает и проверку активной заявки
+        # в AdoptionCreateSerializer: по нему находится не больше одной строки
         unique_together = ('user', 'animal')
+        indexes = [
+            # Keyset-пагинация API по (submitted_at, id)
+            models.Index(fields=['submitted_at', 'id'], name='adoption_submitted_id_idx'),
+            # Список заявок для сотрудников с фильтром по статусу
+            models.Index(fields=['status', 'submitted_at', 'id'], name='adoption_status_submitted_idx'),
+            # Отклонение конкурирующих заявок: animal + status='pending'
+            models.Index(fields=['animal', 'status'], name='adoption_animal_status_idx'),
+            # Одобренные заявки пользователя в return_list и "Мои заявки"
+            models.Index(fields=['user', 'status', 'submitted_at'], name='adoption_user_status_sub_idx'),
+            models.Index(fields=['user', 'submitted_at', 'id'], name='adoption_user_submitted_idx'),
+        ]
+        constraints = [
+            # Не более одной одобренной заявки на животное (см. services.approve)
+            models.UniqueConstraint(
+                fields=['animal'], condition=models.Q(status='approved'),
+                name='adoption_one_approved_per_animal'
+            ),
+        ]
 
     def __str__(self):
         return f"Заявка: {self.user.username} → {self.animal.name} ({self.status})"
@@ -34,6 +55,10 @@ class Return(models.Model):
     class Meta:
         verbose_name = "Возврат животного"
         verbose_name_plural = "Возвраты животных"
+        indexes = [
+            # Keyset-пагинация API по (returned_at, id)
+            models.Index(fields=['returned_at', 'id'], name='return_returned_id_idx'),
+        ]
 
     def __str__(self):
         return f"Возврат {self.adoption.animal.name} ({self.returned_at.date()})"
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Adoption, Return
+from . import services
 from users.models import CustomUser
 from animals.models import Animal
 
@@ -67,6 +68,23 @@ class AdoptionCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class AdoptionDecisionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+    reason = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class AdoptionBatchSerializer(serializers.Serializer):
+    # Ограничение размера пачки: одна транзакция не должна держать блокировку долго
+    decisions = AdoptionDecisionSerializer(many=True, allow_empty=False, max_length=500)
+
+    def save(self):
+        return services.decide_batch([
+            (decision['id'], decision['action'], decision['reason'])
+            for decision in self.validated_data['decisions']
+        ])
+
+
 class ReturnSerializer(serializers.ModelSerializer):
     adoption_id = serializers.IntegerField(source='adoption.id', read_only=True)
     animal_name = serializers.CharField(source='adoption.animal.name', read_only=True)
@@ -103,17 +121,13 @@ class ReturnCreateSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        validated_data['processed_by'] = self.context['request'].user
-        return_obj = super().create(validated_data)
-        
-        # Обновляем статус заявки и животного
-        adoption = validated_data['adoption']
-        adoption.status = 'returned'
-        adoption.save()
-        
-        animal = adoption.animal
-        animal.status = 'in_shelter'
-        animal.save()
-        
-        return return_obj
+        # Возврат, статус заявки и статус животного меняются одной транзакцией
+        try:
+            return services.return_animal(
+                validated_data['adoption'],
+                validated_data['reason'],
+                processed_by=self.context['request'].user
+            )
+        except services.AdoptionTransitionError as e:
+            raise serializers.ValidationError(str(e))
 
@@ -0,0 +1,263 @@
+"""
+Переходы заявки на усыновление между статусами.
+
+Все изменения статусов заявок и животных выполняются здесь, а не во views:
+каждый переход - одна транзакция из минимального числа условных UPDATE.
+Условие в WHERE (например, status='in_shelter' у животного) одновременно
+проверяет состояние и блокирует строку (на PostgreSQL - блокировка строки,
+на SQLite - блокировка записи БД), поэтому две параллельные операции не
+могут обе пройти проверку. Дополнительно частичный уникальный индекс
+гарантирует не более одной одобренной заявки на животное.
+
+UPDATE обходит auto_now и сигналы, поэтому updated_at (валидатор условных
+GET) выставляется в каждом из них явно, а кэш страниц каталога
+инвалидируется вручную.
+
+decide_batch применяет пачку решений тем же способом, но одним набором
+UPDATE на всю пачку, а не по несколько запросов на каждую заявку.
+
+В рабочем профиле SQLite переходы выполняются через очередь записи
+(config/sqlite.py): параллельные решения ждут своей очереди, а не падают
+с "database is locked".
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, TextField, Value, When
+from django.utils import timezone
+
+from animals.models import Animal
+from config import page_cache
+from config.sqlite import serialized_write
+from .models import Adoption, Return
+
+REJECTED_BY_OTHER_REASON = 'Заявка отклонена: животное было усыновлено другим пользователем'
+
+
+class AdoptionTransitionError(Exception):
+    """Переход недопустим в текущем состоянии заявки или животного."""
+
+
+def _set_adoption_status(adoption, from_statuses, **fields):
+    fields['updated_at'] = timezone.now()
+    updated = Adoption.objects.filter(pk=adoption.pk, status__in=from_statuses).update(**fields)
+    if not updated:
+        raise AdoptionTransitionError('Статус заявки уже изменился, обновите страницу')
+    for name, value in fields.items():
+        setattr(adoption, name, value)
+
+
+def _set_animal_status(adoption, status):
+    Animal.objects.filter(pk=adoption.animal_id).update(status=status, updated_at=timezone.now())
+    page_cache.invalidate('animals')
+    if Adoption.animal.is_cached(adoption):
+        adoption.animal.status = status
+
+
+@serialized_write
+def approve(adoption):
+    """Одобряет заявку, усыновляет животное и отклоняет конкурирующие заявки."""
+    try:
+        with transaction.atomic():
+            # Условный UPDATE - и проверка, и блокировка строки животного
+            now = timezone.now()
+            locked = Animal.objects.filter(pk=adoption.animal_id, status='in_shelter').update(
+                status='adopted', updated_at=now
+            )
+            if not locked:
+                raise AdoptionTransitionError('Это животное уже усыновлено')
+            _set_adoption_status(adoption, ['pending', 'rejected'], status='approved')
+            # Одобренная заявка уже не pending, поэтому exclude не нужен
+            Adoption.objects.filter(animal_id=adoption.animal_id, status='pending').update(
+                status='rejected', rejection_reason=REJECTED_BY_OTHER_REASON, updated_at=now
+            )
+    except IntegrityError:
+        # Сработал частичный уникальный индекс: одобренная заявка уже есть
+        raise AdoptionTransitionError('Это животное уже усыновлено')
+    page_cache.invalidate('animals')
+    if Adoption.animal.is_cached(adoption):
+        adoption.animal.status = 'adopted'
+    return adoption
+
+
+@serialized_write
+def reject(adoption, reason):
+    """Отклоняет заявку; если она была одобрена, животное возвращается в приют."""
+    if not reason:
+        raise AdoptionTransitionError('Необходимо указать причину отклонения')
+    if adoption.status not in ('pending', 'approved'):
+        raise AdoptionTransitionError('Отклонить можно только ожидающую или одобренную заявку')
+    was_approved = adoption.status == 'approved'
+    with transaction.atomic():
+        # Условие по прочитанному статусу защищает от параллельного изменения
+        _set_adoption_status(adoption, [adoption.status], status='rejected', rejection_reason=reason)
+        if was_approved:
+            _set_animal_status(adoption, 'in_shelter')
+    return adoption
+
+
+@serialized_write
+def reopen(adoption):
+    """Возвращает заявку в ожидание (из отклонённой или одобренной)."""
+    if adoption.status not in ('rejected', 'approved'):
+        raise AdoptionTransitionError('Вернуть в ожидание можно только отклонённую или одобренную заявку')
+    was_approved = adoption.status == 'approved'
+    with transaction.atomic():
+        _set_adoption_status(adoption, [adoption.status], status='pending')
+        if was_approved:
+            _set_animal_status(adoption, 'in_shelter')
+    return adoption
+
+
+@serialized_write
+def return_animal(adoption, reason, processed_by=None):
+    """Оформляет возврат по одобренной заявке; животное снова в приюте."""
+    if not reason:
+        raise AdoptionTransitionError('Необходимо указать причину возврата')
+    try:
+        with transaction.atomic():
+            _set_adoption_status(adoption, ['approved'], status='returned')
+            return_obj = Return.objects.create(adoption=adoption, reason=reason, processed_by=processed_by)
+            _set_animal_status(adoption, 'in_shelter')
+    except IntegrityError:
+        raise AdoptionTransitionError('Возврат для этой заявки уже был оформлен')
+    return return_obj
+
+
+@serialized_write
+def change_status(adoption, new_status, rejection_reason=''):
+    """Переводит заявку в new_status через соответствующий переход."""
+    if new_status == adoption.status:
+        if new_status == 'rejected' and rejection_reason:
+            adoption.updated_at = timezone.now()
+            Adoption.objects.filter(pk=adoption.pk).update(
+                rejection_reason=rejection_reason, updated_at=adoption.updated_at
+            )
+            adoption.rejection_reason = rejection_reason
+        return adoption
+    if new_status == 'approved':
+        return approve(adoption)
+    if new_status == 'rejected':
+        return reject(adoption, rejection_reason)
+    if new_status == 'pending':
+        return reopen(adoption)
+    raise AdoptionTransitionError('Недопустимый статус заявки')
+
+
+def _update_ids(model, condition, ids, **fields):
+    """Условный UPDATE строк ids; возвращает множество id, которые он изменил.
+
+    Если изменены все строки, лишнего запроса нет; иначе изменённые строки
+    узнаются по только что выставленным status и updated_at.
+    """
+    if not ids:
+        return set()
+    updated = model.objects.filter(condition).update(**fields)
+    if updated == len(ids):
+        return set(ids)
+    return set(model.objects.filter(
+        pk__in=ids, status=fields['status'], updated_at=fields['updated_at']
+    ).values_list('pk', flat=True))
+
+
+@serialized_write
+def decide_batch(decisions):
+    """Применяет решения [(id заявки, 'approve' | 'reject', причина), ...] одной транзакцией.
+
+    Возвращает результаты в том же порядке: {'id', 'status'} для применённых
+    решений и {'id', 'error'} для остальных - ошибка одной заявки не мешает
+    другим. Сначала выполняются отклонения (одобренная заявка освобождает
+    животное для другой заявки из той же пачки), затем одобрения, затем
+    отклоняются конкурирующие ожидающие заявки на усыновлённых животных.
+    """
+    results = [{'id': pk} for pk, _, _ in decisions]
+
+    def fail(index, message):
+        results[index]['error'] = message
+
+    try:
+        with transaction.atomic():
+            current = {
+                row['id']: row for row in Adoption.objects.filter(
+                    pk__in={pk for pk, _, _ in decisions}
+                ).values('id', 'status', 'animal_id')
+            }
+            approvals, rejections, approved_animals, seen = {}, {}, set(), set()
+            for index, (pk, action, reason) in enumerate(decisions):
+                adoption = current.get(pk)
+                if pk in seen:
+                    fail(index, 'Заявка повторяется в пакете')
+                elif adoption is None:
+                    fail(index, 'Заявка не найдена')
+                elif action == 'approve':
+                    if adoption['status'] not in ('pending', 'rejected'):
+                        fail(index, 'Одобрить можно только ожидающую или отклонённую заявку')
+                    elif adoption['animal_id'] in approved_animals:
+                        fail(index, 'В пакете уже одобрена другая заявка на это животное')
+                    else:
+                        approvals[pk] = index
+                        approved_animals.add(adoption['animal_id'])
+                elif not reason:
+                    fail(index, 'Необходимо указать причину отклонения')
+                elif adoption['status'] not in ('pending', 'approved'):
+                    fail(index, 'Отклонить можно только ожидающую или одобренную заявку')
+                else:
+                    rejections[pk] = (index, reason)
+                seen.add(pk)
+
+            now = timezone.now()
+            # Условие по прочитанному статусу защищает от параллельного изменения
+            was_approved = [pk for pk in rejections if current[pk]['status'] == 'approved']
+            rejected = _update_ids(
+                Adoption,
+                Q(pk__in=[pk for pk in rejections if pk not in was_approved], status='pending')
+                | Q(pk__in=was_approved, status='approved'),
+                list(rejections),
+                status='rejected',
+                rejection_reason=Case(
+                    *[When(pk=pk, then=Value(reason)) for pk, (_, reason) in rejections.items()],
+                    default=F('rejection_reason'),
+                    output_field=TextField(),
+                ),
+                updated_at=now,
+            )
+            freed = [current[pk]['animal_id'] for pk in was_approved if pk in rejected]
+            if freed:
+                Animal.objects.filter(pk__in=freed).update(status='in_shelter', updated_at=now)
+
+            # Условный UPDATE животных - и проверка, и блокировка строк
+            animal_ids = [current[pk]['animal_id'] for pk in approvals]
+            locked = _update_ids(
+                Animal, Q(pk__in=animal_ids, status='in_shelter'), animal_ids,
+                status='adopted', updated_at=now,
+            )
+            ready = [pk for pk in approvals if current[pk]['animal_id'] in locked]
+            approved = _update_ids(
+                Adoption, Q(pk__in=ready, status__in=['pending', 'rejected']), ready,
+                status='approved', updated_at=now,
+            )
+            # Животные, чья заявка успела измениться, остаются в приюте
+            unlocked = [current[pk]['animal_id'] for pk in ready if pk not in approved]
+            if unlocked:
+                Animal.objects.filter(pk__in=unlocked).update(status='in_shelter', updated_at=now)
+            if approved:
+                Adoption.objects.filter(
+                    animal_id__in=[current[pk]['animal_id'] for pk in approved], status='pending'
+                ).update(status='rejected', rejection_reason=REJECTED_BY_OTHER_REASON, updated_at=now)
+    except IntegrityError:
+        # Частичный уникальный индекс: у одного из животных уже есть одобренная заявка
+        raise AdoptionTransitionError('Одно из животных уже усыновлено')
+
+    for pk, (index, _) in rejections.items():
+        if pk in rejected:
+            results[index]['status'] = 'rejected'
+        else:
+            fail(index, 'Статус заявки уже изменился, обновите страницу')
+    for pk, index in approvals.items():
+        if pk in approved:
+            results[index]['status'] = 'approved'
+        elif pk in ready:
+            fail(index, 'Статус заявки уже изменился, обновите страницу')
+        else:
+            fail(index, 'Это животное уже усыновлено')
+    if rejected or approved:
+        page_cache.invalidate('animals')
+    return results
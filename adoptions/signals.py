@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from animals.models import Animal
+from users.models import CustomUser
+from .models import Adoption
+
+
+def _changed(created, update_fields, field):
+    # Новая запись ещё не входит в заявки; сохранение других полей (last_login) ответ не меняет
+    return not created and (update_fields is None or field in update_fields)
+
+
+@receiver(post_save, sender=Animal)
+def touch_animal_adoptions(sender, instance, created, update_fields=None, **kwargs):
+    """Кличка животного входит в ответ API заявок: меняем updated_at его заявок (ETag списка)."""
+    if _changed(created, update_fields, 'name'):
+        Adoption.objects.filter(animal=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=CustomUser)
+def touch_user_adoptions(sender, instance, created, update_fields=None, **kwargs):
+    """Имя пользователя входит в ответ API заявок: меняем updated_at его заявок."""
+    if _changed(created, update_fields, 'username'):
+        Adoption.objects.filter(user=instance).update(updated_at=timezone.now())
@@ -1,8 +1,20 @@
+import csv
+import gzip
+import io
+import json
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import StreamingHttpResponse
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from animals.models import Animal
 from .models import Adoption, Return
+from . import services
+from .admin import ADMIN_REJECTION_REASON
+from .checks import check_adoption_query_plans, full_scans
 
 User = get_user_model()
 
@@ -149,3 +161,308 @@ class AdoptionPermissionsTests(TestCase):
         messages = list(response.context["messages"])
         self.assertTrue(any("+7 000 0000 0000" in str(m) for m in messages))
 
+
+
+class AdoptionTransitionsTests(TestCase):
+    """Переходы статусов заявки через adoptions.services."""
+
+    def setUp(self):
+        self.animal = Animal.objects.create(name="Мурка", species="Кошка", health_status="Здорова")
+        self.first = Adoption.objects.create(
+            user=User.objects.create_user(username="first"), animal=self.animal, rejection_reason=""
+        )
+        self.second = Adoption.objects.create(
+            user=User.objects.create_user(username="second"), animal=self.animal, rejection_reason=""
+        )
+
+    def test_approve_rejects_competing_applications(self):
+        """Одобрение: животное усыновлено, конкурирующая заявка отклонена - тремя UPDATE."""
+        # SAVEPOINT + UPDATE животного + UPDATE заявки + UPDATE конкурентов + RELEASE
+        with self.assertNumQueries(5):
+            services.approve(self.first)
+        self.animal.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.animal.status, "adopted")
+        self.assertEqual(self.second.status, "rejected")
+        self.assertEqual(self.second.rejection_reason, services.REJECTED_BY_OTHER_REASON)
+
+    def test_second_approval_fails(self):
+        """Вторая одобренная заявка на то же животное невозможна."""
+        stale_second = Adoption.objects.get(pk=self.second.pk)
+        services.approve(self.first)
+        with self.assertRaises(services.AdoptionTransitionError):
+            services.approve(stale_second)
+        self.assertEqual(Adoption.objects.filter(animal=self.animal, status="approved").count(), 1)
+
+    def test_rejecting_approved_adoption_returns_animal_to_shelter(self):
+        """Отклонение одобренной заявки возвращает животное в приют."""
+        services.approve(self.first)
+        services.reject(self.first, "Передумали")
+        self.animal.refresh_from_db()
+        self.assertEqual(self.animal.status, "in_shelter")
+
+    def test_transitions_bump_updated_at(self):
+        """UPDATE в переходах выставляют updated_at - иначе условные GET отдали бы 304."""
+        animal_before, second_before = self.animal.updated_at, self.second.updated_at
+        services.approve(self.first)
+        self.animal.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertGreater(self.animal.updated_at, animal_before)
+        self.assertGreater(self.second.updated_at, second_before)
+
+
+
+class AdoptionBatchTests(TestCase):
+    """Пакетные решения по заявкам: одна транзакция, ошибки по каждой заявке."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", role="admin")
+        self.animals = [
+            Animal.objects.create(name=f"Кот {index}", species="Кот", health_status="Здоров")
+            for index in range(4)
+        ]
+        self.adoptions = [
+            Adoption.objects.create(
+                user=User.objects.create_user(username=f"user{index}"),
+                animal=self.animals[index % 2 if index < 4 else index - 2],
+                rejection_reason="",
+            )
+            for index in range(6)
+        ]
+
+    def _post(self, decisions):
+        self.client.force_login(self.admin)
+        return self.client.post(
+            reverse("api_adoptions_batch"), {"decisions": decisions}, content_type="application/json"
+        )
+
+    def test_mixed_decisions(self):
+        first, second, third, fourth, fifth, sixth = self.adoptions
+        Animal.objects.filter(pk=self.animals[3].pk).update(status="adopted")
+        response = self._post([
+            {"id": first.pk, "action": "approve"},
+            {"id": third.pk, "action": "approve"},
+            {"id": fifth.pk, "action": "reject", "reason": "Нет условий"},
+            {"id": sixth.pk, "action": "approve"},
+            {"id": fourth.pk, "action": "reject"},
+            {"id": 999999, "action": "approve"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(results[0], {"id": first.pk, "status": "approved"})
+        self.assertIn("В пакете уже одобрена", results[1]["error"])
+        self.assertEqual(results[2], {"id": fifth.pk, "status": "rejected"})
+        self.assertEqual(results[3]["error"], "Это животное уже усыновлено")
+        self.assertIn("причину", results[4]["error"])
+        self.assertEqual(results[5]["error"], "Заявка не найдена")
+
+        third.refresh_from_db()
+        fifth.refresh_from_db()
+        self.assertEqual(third.status, "rejected")
+        self.assertEqual(third.rejection_reason, services.REJECTED_BY_OTHER_REASON)
+        self.assertEqual(fifth.rejection_reason, "Нет условий")
+        self.animals[0].refresh_from_db()
+        self.assertEqual(self.animals[0].status, "adopted")
+
+    def test_reject_frees_animal_for_approval_in_same_batch(self):
+        first, _, third, *_ = self.adoptions
+        services.approve(first)
+        third.refresh_from_db()
+        results = self._post([
+            {"id": third.pk, "action": "approve"},
+            {"id": first.pk, "action": "reject", "reason": "Передумали"},
+        ]).json()["results"]
+        self.assertEqual([result.get("status") for result in results], ["approved", "rejected"])
+        self.assertEqual(Adoption.objects.get(animal=self.animals[0], status="approved"), third)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def run(adoptions):
+            with CaptureQueriesContext(connection) as queries:
+                results = services.decide_batch([(a.pk, "approve", "") for a in adoptions])
+            self.assertTrue(all(result.get("status") == "approved" for result in results))
+            return len(queries)
+
+        self.assertEqual(run(self.adoptions[:1]), run(self.adoptions[4:6]))
+
+    def test_admin_action(self):
+        self.admin.is_staff = self.admin.is_superuser = True
+        self.admin.save()
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse("admin:adoptions_adoption_changelist"), {
+            "action": "reject_selected",
+            "_selected_action": [self.adoptions[0].pk, self.adoptions[1].pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Adoption.objects.filter(status="rejected", rejection_reason=ADMIN_REJECTION_REASON).count(), 2
+        )
+
+    def test_only_admin(self):
+        self.admin.role = "volunteer"
+        self.admin.save()
+        response = self._post([{"id": self.adoptions[0].pk, "action": "approve"}])
+        self.assertEqual(response.status_code, 403)
+
+class ReturnListQueriesTests(TestCase):
+    """Связи, которые читает ReturnSerializer, подгружаются JOIN-ом."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", role="admin")
+
+    def _add_return(self, index):
+        animal = Animal.objects.create(name=f"Пёс {index}", species="Собака", health_status="Здоров")
+        adoption = Adoption.objects.create(
+            user=User.objects.create_user(username=f"owner{index}"),
+            animal=animal,
+            status="approved",
+            rejection_reason="",
+        )
+        services.return_animal(adoption, "Переезд", processed_by=self.admin)
+
+    def _count_queries(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("api_returns"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._add_return(0)
+        single = self._count_queries()
+        for index in range(1, 5):
+            self._add_return(index)
+        self.assertEqual(self._count_queries(), single)
+
+
+class StaffAdoptionListTests(TestCase):
+    """Страница заявок для сотрудников: пагинация, фильтры и JOIN."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", role="admin")
+        adopter = User.objects.create_user(username="adopter")
+        for index in range(30):
+            animal = Animal.objects.create(name=f"Кот {index}", species="Кот", health_status="Здоров")
+            Adoption.objects.create(user=adopter, animal=animal, rejection_reason="")
+        self.client.force_login(self.admin)
+
+    def test_pages_are_joined_and_bounded(self):
+        """Страница ограничена по размеру, а число запросов не зависит от числа строк."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("adoption_list"))
+        self.assertEqual(len(response.context["adoptions"]), 25)
+        next_link = response.context["paginator"].next_link
+        self.assertIsNotNone(next_link)
+
+        with CaptureQueriesContext(connection) as next_queries:
+            response = self.client.get(next_link)
+        self.assertEqual(len(response.context["adoptions"]), 5)
+        self.assertEqual(len(next_queries), len(queries))
+
+    def test_date_filter(self):
+        """Фильтр по дате подачи."""
+        response = self.client.get(reverse("adoption_list"), {"date_to": "2000-01-01"})
+        self.assertEqual(list(response.context["adoptions"]), [])
+
+
+class AdoptionExportTests(TestCase):
+    """Потоковая выгрузка заявок в NDJSON и CSV."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", role="admin")
+        self.adopter = User.objects.create_user(username="adopter")
+        for index in range(5):
+            animal = Animal.objects.create(name=f"Кот {index}", species="Кот", health_status="Здоров")
+            Adoption.objects.create(
+                user=self.adopter, animal=animal,
+                status="rejected" if index % 2 else "pending", rejection_reason="",
+            )
+
+    def _export(self, extension, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse("api_adoptions_export", kwargs={"extension": extension}), params
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self._export("ndjson").decode().splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["animal__name"], "Кот 0")
+        self.assertEqual(rows[0]["user__username"], "adopter")
+
+    def test_gzipped_csv_with_filter(self):
+        content = gzip.decompress(self._export("csv.gz", status="rejected")).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row["animal__name"] for row in rows], ["Кот 1", "Кот 3"])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Строки читаются одним запросом с JOIN, без запросов на каждую запись."""
+        with CaptureQueriesContext(connection) as queries:
+            self._export("csv")
+        self.assertLessEqual(
+            len([q for q in queries if "adoptions_adoption" in q["sql"]]), 1
+        )
+
+    def test_adopter_forbidden_and_unknown_format(self):
+        self.client.force_login(self.adopter)
+        url = reverse("api_adoptions_export", kwargs={"extension": "csv"})
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.admin)
+        url = reverse("api_adoptions_export", kwargs={"extension": "xml"})
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_filter_values_are_validated(self):
+        """Значение фильтра не того типа - 400 в API и ошибка команды, а не 500."""
+        content = self._export("csv", user_id=str(self.adopter.pk))
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(content.decode())))), 5)
+        self.client.force_login(self.admin)
+        url = reverse("api_adoptions_export", kwargs={"extension": "csv"})
+        response = self.client.get(url, {"user_id": "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("user_id", response.json()["error"])
+        with self.assertRaisesMessage(CommandError, "user_id"):
+            call_command("export_data", "adoptions", "--filter", "user_id=abc", stdout=io.StringIO())
+
+
+class AdoptionConditionalGetTests(TestCase):
+    """ETag списка заявок меняется вместе с кличкой животного и именем пользователя."""
+
+    def setUp(self):
+        self.adopter = User.objects.create_user(username="adopter")
+        self.animal = Animal.objects.create(name="Мурка", species="Кошка", health_status="Здорова")
+        Adoption.objects.create(user=self.adopter, animal=self.animal, rejection_reason="")
+        self.client.force_login(self.adopter)
+
+    def test_renamed_animal_changes_list_etag(self):
+        url = reverse("api_adoptions")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.animal.name = "Мурёна"
+        self.animal.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["animal_name"], "Мурёна")
+
+    def test_renamed_user_changes_list_etag(self):
+        url = reverse("api_adoptions")
+        etag = self.client.get(url)["ETag"]
+        self.adopter.username = "alice"
+        self.adopter.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["user_username"], "alice")
+
+
+class AdoptionQueryPlanTests(TestCase):
+    """Горячие запросы по заявкам идут по индексам."""
+
+    def test_hot_queries_do_not_scan_full_table(self):
+        self.assertEqual(check_adoption_query_plans(databases=["default"]), [])
+
+    def test_full_scan_is_detected(self):
+        plan = "2 0 0 SCAN adoptions_adoption\n5 0 0 SEARCH adoptions_return USING INDEX x (adoption_id=?)"
+        self.assertEqual(full_scans(plan), ["2 0 0 SCAN adoptions_adoption"])
@@ -1,6 +1,7 @@
 from django.urls import path
+from config.export import ExportAPI
 from .views import (
-    AdoptionListAPI, AdoptionDetailAPI,
+    AdoptionListAPI, AdoptionDetailAPI, AdoptionBatchAPI,
     ReturnListAPI, ReturnDetailAPI,
     adoption_list, adoption_detail, return_list
 )
@@ -8,9 +9,12 @@ from .views import (
 urlpatterns = [
     # API endpoints
     path("api/adoptions/", AdoptionListAPI.as_view(), name="api_adoptions"),
+    path("api/adoptions/batch/", AdoptionBatchAPI.as_view(), name="api_adoptions_batch"),
     path("api/adoptions/<int:pk>/", AdoptionDetailAPI.as_view(), name="api_adoption_detail"),
     path("api/returns/", ReturnListAPI.as_view(), name="api_returns"),
     path("api/returns/<int:pk>/", ReturnDetailAPI.as_view(), name="api_return_detail"),
+    path("api/adoptions/export.<str:extension>", ExportAPI.as_view(dataset="adoptions"), name="api_adoptions_export"),
+    path("api/returns/export.<str:extension>", ExportAPI.as_view(dataset="returns"), name="api_returns_export"),
     # Template views
     path("adoptions/", adoption_list, name="adoption_list"),
     path("adoptions/<int:pk>/", adoption_detail, name="adoption_detail"),
@@ -1,31 +1,72 @@
+from datetime import datetime, time, timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from config.conditional import detail_validators, list_validators, not_modified, set_validators
+from config.instrumentation import query_budget
+from config.pagination import KeysetPagination
+from config.query_plan import QueryPlanMixin
+from config.routers import replica_reads
 from .models import Adoption, Return
+from . import services
+from .services import AdoptionTransitionError
 from .serializers import (
-    AdoptionSerializer, AdoptionCreateSerializer,
+    AdoptionSerializer, AdoptionCreateSerializer, AdoptionBatchSerializer,
     ReturnSerializer, ReturnCreateSerializer
 )
 
 
+# Сколько заявок/возвратов показывать на одной странице
+HTML_PAGE_SIZE = 25
+
+
+def _parse_date_param(request, name):
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
+def filter_by_date(queryset, field, request):
+    """Фильтр ?date_from=&date_to= (ГГГГ-ММ-ДД, включительно).
+
+    Границы переводятся в datetime, чтобы условие шло по индексу на field,
+    а не через функцию DATE() над колонкой.
+    """
+    date_from = _parse_date_param(request, 'date_from')
+    date_to = _parse_date_param(request, 'date_to')
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset, date_from, date_to
+
+
 # Views для шаблонов
+@query_budget(3)
 @login_required
 def adoption_list(request):
     """Список заявок для администраторов, волонтёров и пользователей (свои заявки)"""
     # Администраторы и волонтёры видят все заявки, остальные - только свои
-    if request.user.role in ['admin', 'volunteer']:
-        adoptions = Adoption.objects.all().order_by('-submitted_at')
-    else:
-        adoptions = Adoption.objects.filter(user=request.user).order_by('-submitted_at')
+    adoptions = Adoption.objects.select_related('user', 'animal')
+    if request.user.role not in ['admin', 'volunteer']:
+        adoptions = adoptions.filter(user=request.user)
     
-    # Фильтрация по статусу
+    # Фильтрация по статусу и дате подачи
     status_filter = request.GET.get('status', '')
     if status_filter:
         adoptions = adoptions.filter(status=status_filter)
+    adoptions, date_from, date_to = filter_by_date(adoptions, 'submitted_at', request)
     
     # Быстрое изменение статуса для админов
     if request.method == 'POST' and request.user.role == 'admin':
@@ -35,43 +76,35 @@ def adoption_list(request):
         
         try:
             adoption = Adoption.objects.get(pk=adoption_id)
-            old_status = adoption.status
             
             if new_status == 'rejected' and not rejection_reason:
                 messages.error(request, 'При отклонении заявки необходимо указать причину')
             else:
-                adoption.status = new_status
-                if new_status == 'rejected':
-                    adoption.rejection_reason = rejection_reason
-                adoption.save()
-                
-                # Если заявка одобрена, обновляем статус животного
-                if new_status == 'approved' and old_status != 'approved':
-                    adoption.animal.status = 'adopted'
-                    adoption.animal.save()
-                    # Отклоняем остальные активные заявки
-                    Adoption.objects.filter(
-                        animal=adoption.animal,
-                        status='pending'
-                    ).exclude(id=adoption.id).update(
-                        status='rejected',
-                        rejection_reason='Заявка отклонена: животное было усыновлено другим пользователем'
-                    )
-                
+                # Одобрение также усыновляет животное и отклоняет остальные заявки
+                services.change_status(adoption, new_status, rejection_reason)
                 messages.success(request, 'Статус заявки успешно изменён')
-        except Adoption.DoesNotExist:
+        except AdoptionTransitionError as e:
+            messages.error(request, str(e))
+        except (Adoption.DoesNotExist, ValueError):
             messages.error(request, 'Заявка не найдена')
         
         return redirect('adoption_list')
     
+    # Keyset-пагинация: страница стоит одинаково при любой глубине истории
+    paginator = KeysetPagination('submitted_at', page_size=HTML_PAGE_SIZE)
+    
     return render(request, 'adoptions/list.html', {
-        'adoptions': adoptions,
+        'adoptions': paginator.paginate_page(adoptions, request),
+        'paginator': paginator,
         'selected_status': status_filter,
+        'date_from': date_from,
+        'date_to': date_to,
         'is_admin': request.user.role == 'admin',
         'is_admin_or_volunteer': request.user.role in ['admin', 'volunteer']
     })
 
 
+@query_budget(6)
 @login_required
 def adoption_detail(request, pk):
     """Детальная страница заявки"""
@@ -86,25 +119,12 @@ def adoption_detail(request, pk):
         action = request.POST.get('action')
         
         if action == 'approve':
-            # Одобрение заявки
-            old_status = adoption.status
-            adoption.status = 'approved'
-            adoption.save()
-            
-            # Обновляем статус животного
-            adoption.animal.status = 'adopted'
-            adoption.animal.save()
-            
-            # Отклоняем остальные активные заявки
-            Adoption.objects.filter(
-                animal=adoption.animal,
-                status='pending'
-            ).exclude(id=adoption.id).update(
-                status='rejected',
-                rejection_reason='Заявка отклонена: животное было усыновлено другим пользователем'
-            )
-            
-            messages.success(request, f'Заявка одобрена. Животное {adoption.animal.name} теперь усыновлено.')
+            # Одобрение заявки: животное усыновлено, остальные заявки отклонены
+            try:
+                services.approve(adoption)
+                messages.success(request, f'Заявка одобрена. Животное {adoption.animal.name} теперь усыновлено.')
+            except AdoptionTransitionError as e:
+                messages.error(request, str(e))
             
         elif action == 'reject':
             # Отклонение заявки
@@ -112,10 +132,11 @@ def adoption_detail(request, pk):
             if not rejection_reason:
                 messages.error(request, 'Необходимо указать причину отклонения')
             else:
-                adoption.status = 'rejected'
-                adoption.rejection_reason = rejection_reason
-                adoption.save()
-                messages.success(request, 'Заявка отклонена')
+                try:
+                    services.reject(adoption, rejection_reason)
+                    messages.success(request, 'Заявка отклонена')
+                except AdoptionTransitionError as e:
+                    messages.error(request, str(e))
         
         elif action == 'return':
             # Оформление возврата
@@ -129,19 +150,14 @@ def adoption_detail(request, pk):
             elif hasattr(adoption, 'return_record'):
                 messages.error(request, 'Возврат для этой заявки уже был оформлен')
             else:
-                Return.objects.create(
-                    adoption=adoption,
-                    reason=reason,
-                    processed_by=request.user
-                )
-                adoption.status = 'returned'
-                adoption.save()
-                adoption.animal.status = 'in_shelter'
-                adoption.animal.save()
-                messages.success(
-                    request,
-                    'Возврат успешно оформлен. Для всех деталей свяжитесь с нами по номеру +7 000 0000 0000'
-                )
+                try:
+                    services.return_animal(adoption, reason, processed_by=request.user)
+                    messages.success(
+                        request,
+                        'Возврат успешно оформлен. Для всех деталей свяжитесь с нами по номеру +7 000 0000 0000'
+                    )
+                except AdoptionTransitionError as e:
+                    messages.error(request, str(e))
         
         return redirect('adoption_detail', pk=pk)
     
@@ -156,18 +172,19 @@ def adoption_detail(request, pk):
     })
 
 
+@query_budget(4)
 @login_required
 def return_list(request):
     """Список возвратов для всех пользователей"""
     # Администраторы и волонтёры видят все возвраты, остальные - только свои
-    if request.user.role in ['admin', 'volunteer']:
-        returns = Return.objects.all().order_by('-returned_at')
-    else:
-        returns = Return.objects.filter(adoption__user=request.user).order_by('-returned_at')
+    returns = Return.objects.select_related('adoption__user', 'adoption__animal', 'processed_by')
+    if request.user.role not in ['admin', 'volunteer']:
+        returns = returns.filter(adoption__user=request.user)
+    returns, date_from, date_to = filter_by_date(returns, 'returned_at', request)
 
     # Для оформления возврата всегда показываем только одобренные заявки текущего пользователя,
     # чтобы никто не мог оформить возврат по чужой заявке
-    approved_adoptions = Adoption.objects.filter(
+    approved_adoptions = Adoption.objects.select_related('user', 'animal').filter(
         user=request.user,
         status='approved'
     ).exclude(return_record__isnull=False).order_by('-submitted_at')
@@ -191,27 +208,26 @@ def return_list(request):
                 elif hasattr(adoption, 'return_record'):
                     messages.error(request, 'Возврат для этой заявки уже был оформлен')
                 else:
-                    Return.objects.create(
-                        adoption=adoption,
-                        reason=reason,
-                        # processed_by заполняется сотрудником приюта при необходимости
-                        processed_by=None
-                    )
-                    adoption.status = 'returned'
-                    adoption.save()
-                    adoption.animal.status = 'in_shelter'
-                    adoption.animal.save()
+                    # processed_by заполняется сотрудником приюта при необходимости
+                    services.return_animal(adoption, reason, processed_by=None)
                     messages.success(
                         request,
                         'Возврат успешно оформлен. Для всех деталей свяжитесь с нами по номеру +7 000 0000 0000'
                     )
-            except Adoption.DoesNotExist:
+            except AdoptionTransitionError as e:
+                messages.error(request, str(e))
+            except (Adoption.DoesNotExist, ValueError):
                 messages.error(request, 'Заявка не найдена')
         
         return redirect('return_list')
     
+    paginator = KeysetPagination('returned_at', page_size=HTML_PAGE_SIZE)
+    
     return render(request, 'adoptions/returns.html', {
-        'returns': returns,
+        'returns': paginator.paginate_page(returns, request),
+        'paginator': paginator,
+        'date_from': date_from,
+        'date_to': date_to,
         'approved_adoptions': approved_adoptions,
         'is_admin_or_volunteer': request.user.role in ['admin', 'volunteer'],
         'can_create_return': True  # Все пользователи могут оформить возврат для своих одобренных заявок
@@ -219,8 +235,11 @@ def return_list(request):
 
 
 # API Views
-class AdoptionListAPI(APIView):
+@query_budget(4)
+@replica_reads
+class AdoptionListAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = AdoptionSerializer
     
     def get(self, request):
         # Администраторы и волонтёры видят все заявки, остальные - только свои
@@ -234,8 +253,16 @@ class AdoptionListAPI(APIView):
         if status_filter:
             adoptions = adoptions.filter(status=status_filter)
         
-        serializer = AdoptionSerializer(adoptions, many=True)
-        return Response(serializer.data)
+        # Список зависит от пользователя: сотрудники видят все заявки
+        validators = list_validators(adoptions, request.user.pk, request.get_full_path())
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+        
+        paginator = KeysetPagination('submitted_at')
+        page = paginator.paginate_queryset(self.optimize_queryset(adoptions), request)
+        serializer = AdoptionSerializer(page, many=True)
+        return set_validators(paginator.get_paginated_response(serializer.data), validators)
     
     def post(self, request):
         # Все авторизованные пользователи могут подавать заявки
@@ -247,16 +274,27 @@ class AdoptionListAPI(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class AdoptionDetailAPI(APIView):
+@query_budget(4)
+class AdoptionDetailAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = AdoptionSerializer
     
     def get_object(self, pk):
         try:
-            return Adoption.objects.get(pk=pk)
+            return self.optimize_queryset(Adoption.objects.all()).get(pk=pk)
         except Adoption.DoesNotExist:
             return None
     
     def get(self, request, pk):
+        # Валидаторы только для доступной пользователю заявки; иначе обычные 403/404
+        visible = Adoption.objects.all()
+        if request.user.role not in ['admin', 'volunteer']:
+            visible = visible.filter(user=request.user)
+        validators = detail_validators(visible, pk)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+        
         adoption = self.get_object(pk)
         if not adoption:
             return Response(
@@ -272,7 +310,7 @@ class AdoptionDetailAPI(APIView):
             )
         
         serializer = AdoptionSerializer(adoption)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), validators)
     
     def put(self, request, pk):
         # Только администраторы могут изменять статус заявок
@@ -289,8 +327,6 @@ class AdoptionDetailAPI(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        old_status = adoption.status
-        
         # Если статус меняется на rejected, проверяем наличие rejection_reason
         if 'status' in request.data and request.data['status'] == 'rejected':
             if 'rejection_reason' not in request.data or not request.data['rejection_reason']:
@@ -301,25 +337,24 @@ class AdoptionDetailAPI(APIView):
         
         serializer = AdoptionSerializer(adoption, data=request.data, partial=True)
         if serializer.is_valid():
-            adoption = serializer.save()
-            
-            # Если заявка одобрена, обновляем статус животного и отклоняем другие заявки
-            if adoption.status == 'approved' and old_status != 'approved':
-                # Обновляем статус животного
-                adoption.animal.status = 'adopted'
-                adoption.animal.save()
-                
-                # Отклоняем все остальные активные заявки на это животное
-                Adoption.objects.filter(
-                    animal=adoption.animal,
-                    status='pending'
-                ).exclude(id=adoption.id).update(status='rejected', rejection_reason='Заявка отклонена: животное было усыновлено другим пользователем')
-            
-            # Если заявка отклонена, животное остается доступным
-            elif adoption.status == 'rejected' and old_status == 'approved':
-                # Если была одобрена, но теперь отклонена, возвращаем животное в приют
-                adoption.animal.status = 'in_shelter'
-                adoption.animal.save()
+            # Статус меняется только через переходы services (вместе с животным
+            # и конкурирующими заявками), остальные поля - обычным сохранением
+            new_status = serializer.validated_data.pop('status', None)
+            rejection_reason = serializer.validated_data.pop('rejection_reason', adoption.rejection_reason)
+            try:
+                with transaction.atomic():
+                    if serializer.validated_data:
+                        adoption = serializer.save()
+                    if new_status is not None:
+                        services.change_status(adoption, new_status, rejection_reason)
+                    elif rejection_reason != adoption.rejection_reason:
+                        adoption.updated_at = timezone.now()
+                        Adoption.objects.filter(pk=adoption.pk).update(
+                            rejection_reason=rejection_reason, updated_at=adoption.updated_at
+                        )
+                        adoption.rejection_reason = rejection_reason
+            except AdoptionTransitionError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
             response_serializer = AdoptionSerializer(adoption)
             return Response(response_serializer.data)
@@ -344,8 +379,33 @@ class AdoptionDetailAPI(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ReturnListAPI(APIView):
+@query_budget(2)
+class AdoptionBatchAPI(APIView):
     permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Пачка решений {"decisions": [{"id", "action": approve|reject, "reason"}]}."""
+        if request.user.role != 'admin':
+            return Response(
+                {"error": "Только администраторы могут изменять статус заявок"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = AdoptionBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = serializer.save()
+        except AdoptionTransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results})
+
+
+@query_budget(3)
+@replica_reads
+class ReturnListAPI(QueryPlanMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReturnSerializer
     
     def get(self, request):
         # Администраторы и волонтёры видят все возвраты, остальные - только свои
@@ -354,8 +414,10 @@ class ReturnListAPI(APIView):
         else:
             returns = Return.objects.filter(adoption__user=request.user)
         
-        serializer = ReturnSerializer(returns, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination('returned_at')
+        page = paginator.paginate_queryset(self.optimize_queryset(returns), request)
+        serializer = ReturnSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     def post(self, request):
         # Только администраторы могут оформлять возвраты
@@ -373,12 +435,14 @@ class ReturnListAPI(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReturnDetailAPI(APIView):
+@query_budget(3)
+class ReturnDetailAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = ReturnSerializer
     
     def get_object(self, pk):
         try:
-            return Return.objects.get(pk=pk)
+            return self.optimize_queryset(Return.objects.all()).get(pk=pk)
         except Return.DoesNotExist:
             return None
     
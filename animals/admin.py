@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Animal, AnimalPhoto
+from .search import filter_animals
 
 class AnimalPhotoInline(admin.TabularInline):
     model = AnimalPhoto
@@ -17,4 +18,10 @@ class AnimalAdmin(admin.ModelAdmin):
     fields = ['name', 'species', 'breed', 'age_years', 'age_months', 'health_status', 'description', 'status', 'slug', 'created_at']
     readonly_fields = ['slug', 'created_at']
 
-    inlines = [AnimalPhotoInline]
\ No newline at end of file
+    inlines = [AnimalPhotoInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE по search_fields ищем через полнотекстовый индекс
+        if not search_term.strip():
+            return queryset, False
+        return filter_animals(queryset, search_term), False
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Кэш HTML-фрагментов карточек животных.
+
+Ключ фрагмента - id животного и версия карточки. Версия - updated_at
+животного: сигналы (signals.py) и переходы adoptions.services меняют его
+при любом изменении Animal или AnimalPhoto (включая построение миниатюр),
+поэтому старые фрагменты просто перестают запрашиваться и вытесняются
+по таймауту, а отдельное хранение версий в кэше не нужно.
+
+Страница списка читает только id и updated_at животных, одним get_many
+берёт готовые фрагменты и догружает (with_cards) и рендерит лишь
+промахи. Счётчики попаданий/промахов хранятся в том же кэше.
+"""
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from config.metrics import CACHE_REQUESTS
+from .models import Animal
+
+CARD_TEMPLATE = 'animals/card.html'
+# Меняется вместе с разметкой card.html, чтобы не отдавать старую вёрстку
+CARD_CACHE_PREFIX = 'animal-card:v1'
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+HITS_KEY = f'{CARD_CACHE_PREFIX}:stats:hits'
+MISSES_KEY = f'{CARD_CACHE_PREFIX}:stats:misses'
+
+
+def card_key(animal):
+    return f'{CARD_CACHE_PREFIX}:{animal.pk}:{animal.updated_at.timestamp()}'
+
+
+def _count(key, delta):
+    if not delta:
+        return
+    # incr не создаёт отсутствующий ключ
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
+
+
+def render_cards(animals):
+    """HTML карточек в порядке animals (нужны только pk и updated_at)."""
+    keys = {animal.pk: card_key(animal) for animal in animals}
+    fragments = cache.get_many(keys.values())
+
+    missing = [pk for pk, key in keys.items() if key not in fragments]
+    if missing:
+        rendered = {}
+        for animal in Animal.objects.filter(pk__in=missing).with_cards():
+            html = render_to_string(CARD_TEMPLATE, {'animal': animal})
+            # Ключ - по свежей версии; если карточка изменилась после выборки
+            # списка, на странице всё равно окажется свежая разметка
+            rendered[card_key(animal)] = html
+            fragments[keys[animal.pk]] = html
+        cache.set_many(rendered, timeout=CARD_CACHE_TIMEOUT)
+
+    _count(HITS_KEY, len(keys) - len(missing))
+    _count(MISSES_KEY, len(missing))
+    CACHE_REQUESTS.inc(len(keys) - len(missing), cache='card', result='hit')
+    CACHE_REQUESTS.inc(len(missing), cache='card', result='miss')
+    # Удалённые за это время животные просто пропускаются
+    return [mark_safe(fragments[key]) for key in keys.values() if key in fragments]
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,25 @@
+"""Пользовательские фрагменты страниц животных и общего шаблона base.html."""
+from django.template.loader import render_to_string
+
+from adoptions.models import Adoption
+from config.page_cache import register_hole
+from .models import Animal
+
+register_hole('navbar', 'animals/holes/navbar.html')
+register_hole('messages', 'animals/holes/messages.html')
+register_hole('animal_actions', 'animals/holes/animal_actions.html', arg_names=['slug'])
+
+
+@register_hole('adoption_box')
+def adoption_box(request, animal_id):
+    """Блок заявки: форма, статус своей заявки или приглашение войти."""
+    animal = None
+    existing_adoption = None
+    if request.user.is_authenticated and request.user.role == 'adopter':
+        animal = Animal.objects.only('id', 'name', 'status').get(pk=animal_id)
+        existing_adoption = Adoption.objects.filter(user=request.user, animal_id=animal_id).first()
+    return render_to_string('animals/holes/adoption_box.html', {
+        'animal': animal,
+        'has_adoption': existing_adoption is not None,
+        'existing_adoption': existing_adoption,
+    }, request=request)
@@ -0,0 +1,217 @@
+"""
+Массовый импорт животных из CSV/JSON с архивом фотографий.
+
+Строки обрабатываются пачками по IMPORT_CHUNK_SIZE:
+1. каждая строка проверяется AnimalCreateUpdateSerializer (без запросов к БД);
+   ошибки записываются в отчёт с номером строки, а сама пачка продолжается;
+2. фотографии строк из zip-архива проверяются Pillow и сохраняются
+   в хранилище пулом потоков;
+3. slug всей пачке выдаются одним запросом (config.slugs.allocate_slugs),
+   а животные и фотографии вставляются bulk_create в одной транзакции.
+
+bulk_create не вызывает save() и сигналы, поэтому всё, что для одиночного
+создания делают сигналы (signals.py), здесь выполняется явно: обложка,
+полнотекстовый индекс, построение миниатюр и инвалидация кэша страниц.
+"""
+import csv
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from PIL import Image
+
+from config import page_cache
+from config.images import schedule_derivatives
+from config.slugs import MAX_ATTEMPTS, allocate_slugs
+from . import search
+from .models import Animal, AnimalPhoto
+from .serializers import AnimalCreateUpdateSerializer
+
+IMPORT_CHUNK_SIZE = 200
+IMPORT_PHOTO_WORKERS = 4
+IMPORT_FORMATS = ('csv', 'json')
+# В CSV несколько фотографий одной строки перечисляются через ';'
+PHOTO_SEPARATOR = ';'
+
+
+class AnimalImportError(Exception):
+    """Файл импорта нельзя прочитать целиком (формат, кодировка, структура)."""
+
+
+def import_format(filename):
+    """'intake.CSV' -> 'csv'; None, если расширение не поддерживается."""
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return ext if ext in IMPORT_FORMATS else None
+
+
+def read_rows(file, fmt):
+    """Итератор строк-словарей из бинарного файла CSV или JSON (список объектов)."""
+    if fmt == 'csv':
+        return _csv_rows(file)
+    try:
+        rows = json.load(file)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise AnimalImportError(f"Некорректный JSON: {exc}")
+    if not isinstance(rows, list):
+        raise AnimalImportError("JSON должен быть списком объектов")
+    return iter(rows)
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise AnimalImportError(f"Некорректный CSV: {exc}")
+
+
+def _split_row(raw):
+    """Данные для сериализатора (пустые значения отбрасываются) и имена фото."""
+    data = {}
+    for key, value in raw.items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in ('', None):
+            data[key] = value
+    photos = data.pop('photos', [])
+    if isinstance(photos, str):
+        photos = [name.strip() for name in photos.split(PHOTO_SEPARATOR) if name.strip()]
+    return data, photos
+
+
+def _store_photo(archive, name):
+    """Проверяет фото из архива и сохраняет его в хранилище; возвращает имя файла."""
+    data = archive.read(name)
+    try:
+        Image.open(io.BytesIO(data)).verify()
+    except Exception:
+        raise ValueError(f"{name}: файл не является изображением")
+    field = AnimalPhoto._meta.get_field('photo_url')
+    filename = field.generate_filename(None, os.path.basename(name))
+    return field.storage.save(filename, ContentFile(data))
+
+
+def _delete_files(names):
+    storage = AnimalPhoto._meta.get_field('photo_url').storage
+    for name in names:
+        storage.delete(name)
+
+
+def _validate(chunk, archive, report):
+    """Строки пачки, прошедшие проверку: (номер, validated_data, имена фото)."""
+    archive_names = set(archive.namelist()) if archive else set()
+    valid = []
+    for number, raw in chunk:
+        if not isinstance(raw, dict):
+            report['errors'].append({'row': number, 'errors': {'non_field_errors': ["Строка должна быть объектом"]}})
+            continue
+        data, photos = _split_row(raw)
+        serializer = AnimalCreateUpdateSerializer(data=data)
+        errors = {} if serializer.is_valid() else {
+            field: [str(error) for error in field_errors] for field, field_errors in serializer.errors.items()
+        }
+        missing = [name for name in photos if name not in archive_names]
+        if missing:
+            errors['photos'] = [f"Нет в архиве фотографий: {', '.join(missing)}"]
+        if errors:
+            report['errors'].append({'row': number, 'errors': errors})
+        else:
+            valid.append((number, serializer.validated_data, photos))
+    return valid
+
+
+def _store_photos(valid, archive, pool, report):
+    """Сохраняет фото пулом потоков; строки с битыми фото переносит в ошибки."""
+    futures = [[pool.submit(_store_photo, archive, name) for name in photos] for _, _, photos in valid]
+    stored = []
+    for (number, data, _), row_futures in zip(valid, futures):
+        names, errors = [], []
+        for future in row_futures:
+            try:
+                names.append(future.result())
+            except (ValueError, OSError, zipfile.BadZipFile) as exc:
+                errors.append(str(exc))
+        if errors:
+            _delete_files(names)
+            report['errors'].append({'row': number, 'errors': {'photos': errors}})
+        else:
+            stored.append((number, data, names))
+    return stored
+
+
+def _insert(rows):
+    """Вставляет пачку в одной транзакции; при занятом slug выдаёт их заново."""
+    for attempt in range(MAX_ATTEMPTS):
+        slugs = allocate_slugs(Animal, [data['name'] for _, data, _ in rows], 'animal')
+        animals = [Animal(slug=slug, **data) for (_, data, _), slug in zip(rows, slugs)]
+        try:
+            with transaction.atomic():
+                Animal.objects.bulk_create(animals)
+                photos = [
+                    AnimalPhoto(animal=animal, photo_url=name)
+                    for animal, (_, _, names) in zip(animals, rows) for name in names
+                ]
+                AnimalPhoto.objects.bulk_create(photos)
+                if photos:
+                    first_photo = AnimalPhoto.objects.filter(animal=OuterRef('pk')).order_by('id').values('id')[:1]
+                    Animal.objects.filter(pk__in=[photo.animal_id for photo in photos]).update(
+                        cover_photo=Subquery(first_photo)
+                    )
+                search.index_animals(animals)
+        except IntegrityError:
+            # Повторяем, только если slug успела занять параллельная вставка
+            if attempt == MAX_ATTEMPTS - 1 or not Animal.objects.filter(slug__in=slugs).exists():
+                raise
+            continue
+        for photo in photos:
+            schedule_derivatives(photo)
+        page_cache.invalidate('animals')
+        return animals
+
+
+def import_animals(rows, photos_zip=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Импортирует строки rows; возвращает отчёт {'created': [...], 'errors': [...]}.
+
+    photos_zip - файл zip-архива, на файлы которого ссылается поле photos строк.
+    Номера строк в отчёте начинаются с 1 (для CSV - без строки заголовка).
+    """
+    report = {'created': [], 'errors': []}
+    try:
+        archive = zipfile.ZipFile(photos_zip) if photos_zip else None
+    except zipfile.BadZipFile:
+        raise AnimalImportError("Фотографии должны быть zip-архивом")
+    with ThreadPoolExecutor(max_workers=IMPORT_PHOTO_WORKERS, thread_name_prefix='import-photos') as pool:
+        chunk = []
+        for item in enumerate(rows, start=1):
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                _import_chunk(chunk, archive, pool, report)
+                chunk = []
+        if chunk:
+            _import_chunk(chunk, archive, pool, report)
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
+
+
+def _import_chunk(chunk, archive, pool, report):
+    valid = _validate(chunk, archive, report)
+    if not valid:
+        return
+    rows = _store_photos(valid, archive, pool, report) if archive else valid
+    if not rows:
+        return
+    try:
+        animals = _insert(rows)
+    except DatabaseError as exc:
+        # Пачка не сохранилась: её строки - в ошибки, импорт продолжается
+        _delete_files([name for _, _, names in rows for name in names])
+        for number, _, _ in rows:
+            report['errors'].append({'row': number, 'errors': {'non_field_errors': [f"Ошибка сохранения: {exc}"]}})
+        return
+    for (number, _, _), animal in zip(rows, animals):
+        report['created'].append({'row': number, 'id': animal.pk, 'slug': animal.slug})
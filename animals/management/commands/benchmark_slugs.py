@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from animals.models import Animal
+
+
+class Command(BaseCommand):
+    help = "Замеряет выдачу slug: вставляет много животных с одинаковым именем (изменения откатываются)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help="Сколько животных вставить")
+        parser.add_argument('--name', default="Барсик", help="Имя всех вставляемых животных")
+
+    def handle(self, *args, **options):
+        count, name = options['count'], options['name']
+        if count < 1:
+            raise CommandError("--count должен быть не меньше 1")
+        executed = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            executed[0] += 1
+            return execute(sql, params, many, context)
+
+        with transaction.atomic(), connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            for i in range(count):
+                before = executed[0]
+                animal = Animal(name=name, species="Кошка", health_status="Здоров")
+                animal.save()
+                if i == 0:
+                    first_queries = executed[0] - before
+            last_queries = executed[0] - before
+            elapsed = time.perf_counter() - started
+            last_slug = animal.slug
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Вставлено: {count} за {elapsed:.2f} с ({count / elapsed:.0f} в секунду)")
+        self.stdout.write(f"Последний slug: {last_slug}")
+        self.stdout.write(f"Запросов на вставку: первая - {first_queries}, последняя - {last_queries}")
+        self.stdout.write(self.style.SUCCESS("Изменения откатаны"))
@@ -0,0 +1,62 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from config.export import DATASETS, EXPORT_CHUNK_SIZE, FORMATS, clean_filters, export_stream
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка набора данных в NDJSON или CSV (по желанию сжатого gzip)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS), help="Что выгружать")
+        parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help="Сжать вывод gzip")
+        parser.add_argument('-o', '--output', help="Файл для записи (по умолчанию stdout)")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help="Сколько строк читать из БД за раз")
+        parser.add_argument('--background', action='store_true',
+                            help="Поставить выгрузку в очередь фоновых задач (файл появится в media/exports)")
+        parser.add_argument('--filter', action='append', default=[], metavar='ПОЛЕ=ЗНАЧЕНИЕ',
+                            help="Фильтр выгрузки, например --filter status=approved")
+
+    def handle(self, *args, **options):
+        filters = {}
+        for item in options['filter']:
+            key, sep, value = item.partition('=')
+            if not sep or key not in DATASETS[options['dataset']].filters:
+                raise CommandError(f"Недопустимый фильтр: {item}")
+            filters[key] = value
+        try:
+            clean_filters(options['dataset'], filters)
+        except ValidationError as error:
+            raise CommandError(error.messages[0])
+
+        if options['background']:
+            extension = options['fmt'] + ('.gz' if options['gzip'] else '')
+            name = f"exports/{options['dataset']}-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+            job = enqueue('exports.write_file', {
+                'dataset': options['dataset'], 'fmt': options['fmt'],
+                'gzip': options['gzip'], 'name': name, 'filters': filters,
+            })
+            self.stdout.write(self.style.SUCCESS(f"Задача #{job.pk} в очереди, файл: {name}"))
+            return
+
+        stream = export_stream(
+            options['dataset'], options['fmt'], options['gzip'],
+            filters=filters, chunk_size=options['chunk_size'],
+        )
+        written = 0
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in stream:
+                    output.write(chunk)
+                    written += len(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Записано {written} байт в {options['output']}"))
+        else:
+            for chunk in stream:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
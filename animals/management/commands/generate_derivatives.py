@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from activities.models import Activity
+from animals.models import AnimalPhoto
+from config.images import generate_derivatives
+
+
+class Command(BaseCommand):
+    help = "Строит миниатюры (thumb/card/full, WebP и JPEG) для фото без производных"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Перестроить и уже готовые производные")
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for model in (AnimalPhoto, Activity):
+            queryset = model.objects.exclude(photo_url='').exclude(photo_url__isnull=True)
+            for pk, name, ready_name in queryset.values_list('pk', 'photo_url', 'derivatives_name').iterator():
+                if ready_name == name and not options['force']:
+                    continue
+                if generate_derivatives(model, pk, name):
+                    built += 1
+                else:
+                    failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Построено: {built}, ошибок: {failed}"))
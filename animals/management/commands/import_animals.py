@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from animals.imports import (
+    IMPORT_CHUNK_SIZE, AnimalImportError, import_animals, import_format, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Массовый импорт животных из CSV/JSON (с zip-архивом фотографий)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл .csv или .json со строками животных")
+        parser.add_argument('--photos', help="zip-архив с фотографиями из поля photos")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+                            help="Сколько строк вставлять одной транзакцией")
+
+    def handle(self, *args, **options):
+        fmt = import_format(options['path'])
+        if fmt is None:
+            raise CommandError("Поддерживаются файлы .csv и .json")
+
+        photos = open(options['photos'], 'rb') if options['photos'] else None
+        try:
+            with open(options['path'], 'rb') as source:
+                report = import_animals(read_rows(source, fmt), photos, options['chunk_size'])
+        except AnimalImportError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if photos:
+                photos.close()
+
+        for error in report['errors']:
+            details = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in error['errors'].items())
+            self.stderr.write(f"Строка {error['row']}: {details}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Добавлено: {len(report['created'])}, с ошибками: {len(report['errors'])}"
+        ))
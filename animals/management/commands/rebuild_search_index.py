@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from animals.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс каталога животных"
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING("FTS5 доступен только для SQLite, индекс не используется"))
+            return
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс пересобран"))
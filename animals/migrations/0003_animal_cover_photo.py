@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_cover_photo(apps, schema_editor):
+    Animal = apps.get_model("animals", "Animal")
+    AnimalPhoto = apps.get_model("animals", "AnimalPhoto")
+    first_photo = (
+        AnimalPhoto.objects.filter(animal=OuterRef("pk")).order_by("id").values("id")[:1]
+    )
+    Animal.objects.update(cover_photo=Subquery(first_photo))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("animals", "0002_alter_animal_options_animal_description_animal_slug_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="animal",
+            name="cover_photo",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="animals.animalphoto",
+                verbose_name="Обложка",
+            ),
+        ),
+        migrations.RunPython(fill_cover_photo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("animals", "0003_animal_cover_photo"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="animal",
+            index=models.Index(
+                fields=["created_at", "id"], name="animal_created_id_idx"
+            ),
+        ),
+    ]
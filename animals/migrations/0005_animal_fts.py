@@ -0,0 +1,34 @@
+from django.db import migrations
+
+FTS_COLUMNS = "name, species, breed, description, health_status"
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS animals_animal_fts USING fts5("
+        f"{FTS_COLUMNS}, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO animals_animal_fts (rowid, {FTS_COLUMNS}) "
+        "SELECT id, COALESCE(name, ''), COALESCE(species, ''), COALESCE(breed, ''), "
+        "COALESCE(description, ''), COALESCE(health_status, '') FROM animals_animal"
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS animals_animal_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("animals", "0004_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("animals", "0005_animal_fts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="animalphoto",
+            name="derivatives_name",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+    ]
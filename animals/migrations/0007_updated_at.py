@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:46
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    # Существующие записи считаются не менявшимися с момента создания
+    Animal = apps.get_model("animals", "Animal")
+    Animal.objects.update(updated_at=F("created_at"))
+    AnimalPhoto = apps.get_model("animals", "AnimalPhoto")
+    AnimalPhoto.objects.update(updated_at=F("uploaded_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("animals", "0006_photo_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="animal",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Дата изменения"),
+        ),
+        migrations.AddField(
+            model_name="animalphoto",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
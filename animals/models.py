@@ -1,7 +1,23 @@
 from django.db import models
-from django.utils.text import slugify
+from django.db.models import Count, Prefetch
+from config.slugs import save_with_slug
 from users.models import CustomUser
 
+
+class AnimalQuerySet(models.QuerySet):
+    def with_cards(self):
+        """Всё, что нужно карточке животного, за фиксированное число запросов.
+
+        Обложка подтягивается JOIN-ом, количество фото считается аннотацией,
+        а сами фотографии загружаются одним prefetch-запросом на всю выборку.
+        """
+        return self.select_related('cover_photo').annotate(
+            photo_count=Count('photos'),
+        ).prefetch_related(
+            Prefetch('photos', queryset=AnimalPhoto.objects.order_by('id')),
+        )
+
+
 class Animal(models.Model):
     STATUS_CHOICES = [
         ('in_shelter', 'В приюте'),
@@ -17,31 +33,32 @@ class Animal(models.Model):
     description = models.TextField("Описание/характер", blank=True, null=True)
     status = models.CharField("Статус", max_length=20, choices=STATUS_CHOICES, default='in_shelter')
     created_at = models.DateTimeField("Дата добавления", auto_now_add=True)
+    # Меняется и при изменении фотографий (см. signals.py) - валидатор для условных GET
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
     slug = models.SlugField("Ссылка (slug)", max_length=120, unique=True, blank=True)
+    # Денормализованная ссылка на первое фото (обновляется сигналами AnimalPhoto)
+    cover_photo = models.ForeignKey(
+        'AnimalPhoto', verbose_name="Обложка", related_name='+',
+        on_delete=models.SET_NULL, null=True, blank=True, editable=False
+    )
+
+    objects = AnimalQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Животное"
         verbose_name_plural = "Животные"
         ordering = ['name']
+        indexes = [
+            # Keyset-пагинация API по (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='animal_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.species})"
 
     def save(self, *args, **kwargs):
-        # Автоматически создаём slug из имени, если не указан
-        if not self.slug:
-            base_slug = slugify(self.name)
-            # Если slugify вернул пустую строку, используем хэш имени
-            if not base_slug:
-                base_slug = f"animal-{abs(hash(self.name)) % 10000}"
-            slug = base_slug
-            counter = 1
-            # Проверяем уникальность slug, исключая текущий объект (если он уже существует)
-            while Animal.objects.filter(slug=slug).exclude(pk=self.pk if self.pk else None).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        # Автоматически создаём slug из имени (с транслитерацией), если не указан
+        save_with_slug(self, self.name, 'animal', lambda: super(Animal, self).save(*args, **kwargs))
 
 
 
@@ -49,6 +66,9 @@ class AnimalPhoto(models.Model):
     animal = models.ForeignKey(Animal, related_name='photos', on_delete=models.CASCADE)
     photo_url = models.ImageField(upload_to='animals/%Y/%m/%d')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Файл, для которого построены миниатюры (см. config/images.py)
+    derivatives_name = models.CharField(max_length=255, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"Фото {self.animal.name} ({self.id})"
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Полнотекстовый поиск по каталогу животных (SQLite FTS5).
+
+Индекс - виртуальная таблица animals_animal_fts, rowid которой совпадает
+с id животного. Таблица создаётся миграцией и поддерживается сигналами
+Animal (см. signals.py). На других СУБД поиск деградирует до icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'animals_animal_fts'
+# Поля индекса и их веса в bm25 (имя важнее описания)
+FTS_FIELDS = ['name', 'species', 'breed', 'description', 'health_status']
+FTS_WEIGHTS = [10.0, 5.0, 5.0, 1.0, 1.0]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Превращает пользовательский ввод в безопасный MATCH: все слова, по префиксу."""
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_animals(animals):
+    """Добавляет или обновляет записи индекса для переданных животных."""
+    if not fts_available():
+        return
+    rows = [
+        (animal.pk, *[getattr(animal, field) or '' for field in FTS_FIELDS])
+        for animal in animals
+    ]
+    if not rows:
+        return
+    columns = ', '.join(FTS_FIELDS)
+    placeholders = ', '.join(['%s'] * (len(FTS_FIELDS) + 1))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES ({placeholders})', rows
+        )
+
+
+def remove_animals(pks):
+    if not fts_available() or not pks:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def rebuild_index():
+    """Полностью пересобирает индекс из таблицы животных."""
+    if not fts_available():
+        return
+    columns = ', '.join(FTS_FIELDS)
+    source = ', '.join(f"COALESCE({field}, '')" for field in FTS_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {source} FROM animals_animal'
+        )
+
+
+def _fallback_condition(text):
+    condition = Q()
+    for field in FTS_FIELDS:
+        condition |= Q(**{f'{field}__icontains': text})
+    return condition
+
+
+def filter_animals(queryset, text):
+    """Фильтр по запросу без ранжирования (подзапрос к индексу, без списка id)."""
+    if not fts_available():
+        return queryset.filter(_fallback_condition(text))
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+    )
+
+
+def rank_expression(queryset, match):
+    """Релевантность строки queryset для MATCH match (больше - релевантнее).
+
+    Подзапрос ranked выполняется один раз на запрос: LIMIT -1 не даёт
+    SQLite встроить его в коррелированный подзапрос (тогда MATCH
+    повторялся бы для каждой строки), и ранги берутся по автоматическому
+    индексу по id - только для строк, прошедших фильтры queryset.
+    """
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    return RawSQL(
+        f'SELECT ranked.rank FROM (SELECT rowid AS id, -bm25({FTS_TABLE}, {weights}) AS rank '
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT -1) AS ranked WHERE ranked.id = {table}.id',
+        [match],
+        output_field=FloatField(),
+    )
+
+
+def search_animals(queryset, text, limit=None):
+    """Отфильтровывает queryset по запросу и упорядочивает по релевантности.
+
+    Сначала применяются фильтры queryset, потом ранжирование и limit,
+    поэтому отфильтрованные более релевантные животные не вытесняют
+    подходящих. Релевантность - аннотация search_rank (для
+    KeysetPagination('search_rank')), при равенстве - новые id выше.
+    """
+    if fts_available():
+        match = build_match_query(text)
+        if not match:
+            return queryset.none()
+        queryset = filter_animals(queryset, text).annotate(search_rank=rank_expression(queryset, match))
+    else:
+        # Запасной вариант для СУБД без FTS5: без ранжирования
+        queryset = filter_animals(queryset, text).annotate(search_rank=Value(0.0, output_field=FloatField()))
+    queryset = queryset.order_by('-search_rank', '-id')
+    return queryset[:limit] if limit is not None else queryset
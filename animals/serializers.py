@@ -1,23 +1,31 @@
 from rest_framework import serializers
+from config.images import derivative_urls
 from .models import Animal, AnimalPhoto
 
 
 class AnimalPhotoSerializer(serializers.ModelSerializer):
+    # Миниатюры {thumb|card|full: {webp, jpg}}; пока их нет - ссылки на оригинал
+    derivatives = serializers.SerializerMethodField()
+    
     class Meta:
         model = AnimalPhoto
-        fields = ['id', 'photo_url', 'uploaded_at']
+        fields = ['id', 'photo_url', 'derivatives', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at']
+    
+    def get_derivatives(self, obj):
+        return derivative_urls(obj)
 
 
 class AnimalSerializer(serializers.ModelSerializer):
     photos = AnimalPhotoSerializer(many=True, read_only=True)
+    cover_photo = AnimalPhotoSerializer(read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     
     class Meta:
         model = Animal
         fields = ['id', 'name', 'species', 'breed', 'age_years', 'age_months', 
                   'health_status', 'description', 'status', 'status_display', 
-                  'slug', 'created_at', 'photos']
+                  'slug', 'created_at', 'cover_photo', 'photos']
         read_only_fields = ['id', 'slug', 'created_at']
 
 
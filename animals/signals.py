@@ -0,0 +1,70 @@
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Animal, AnimalPhoto
+from config import page_cache
+from config.images import derivatives_ready, schedule_derivatives, schedule_file_cleanup
+from . import search
+
+
+@receiver(post_save, sender=AnimalPhoto)
+def set_cover_photo(sender, instance, created, **kwargs):
+    """Первое загруженное фото становится обложкой животного."""
+    if created:
+        Animal.objects.filter(pk=instance.animal_id, cover_photo__isnull=True).update(cover_photo=instance)
+
+
+@receiver(post_save, sender=AnimalPhoto)
+def build_photo_derivatives(sender, instance, **kwargs):
+    schedule_derivatives(instance)
+
+
+@receiver(post_delete, sender=AnimalPhoto)
+def delete_photo_files(sender, instance, **kwargs):
+    """Файлы фото и миниатюр удаляются фоновой задачей (в т.ч. при удалении животного)."""
+    schedule_file_cleanup(instance)
+
+
+@receiver(post_delete, sender=AnimalPhoto)
+def reassign_cover_photo(sender, instance, **kwargs):
+    """После удаления обложки (FK обнулён через SET_NULL) выбираем следующее фото."""
+    next_photo = AnimalPhoto.objects.filter(animal=OuterRef('pk')).order_by('id').values('id')[:1]
+    Animal.objects.filter(pk=instance.animal_id, cover_photo__isnull=True).update(
+        cover_photo=Subquery(next_photo)
+    )
+
+
+@receiver(post_save, sender=AnimalPhoto)
+@receiver(post_delete, sender=AnimalPhoto)
+def touch_animal(sender, instance, **kwargs):
+    """Фотографии входят в карточку животного: меняем updated_at животного."""
+    Animal.objects.filter(pk=instance.animal_id).update(updated_at=timezone.now())
+
+
+@receiver(derivatives_ready, sender=AnimalPhoto)
+def touch_animal_after_derivatives(sender, pk, **kwargs):
+    Animal.objects.filter(photos=pk).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Animal)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Синхронизирует полнотекстовый индекс с карточкой животного."""
+    if update_fields is not None and not set(update_fields) & set(search.FTS_FIELDS):
+        return
+    search.index_animals([instance])
+
+
+@receiver(post_delete, sender=Animal)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_animals([instance.pk])
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+@receiver(post_save, sender=AnimalPhoto)
+@receiver(post_delete, sender=AnimalPhoto)
+@receiver(derivatives_ready, sender=AnimalPhoto)
+def invalidate_pages(sender, **kwargs):
+    """Кэш страниц каталога (config/page_cache.py) становится несвежим."""
+    page_cache.invalidate('animals')
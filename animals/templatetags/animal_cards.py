@@ -0,0 +1,12 @@
+from django import template
+from django.utils.html import mark_safe
+
+from animals.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def animal_cards(animals):
+    """Склеивает закэшированные HTML-фрагменты карточек (см. animals/cards.py)."""
+    return mark_safe(''.join(render_cards(animals)))
@@ -0,0 +1,44 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from config.images import DERIVATIVE_SIZES, derivative_urls, has_derivatives
+
+register = template.Library()
+
+# Какие производные попадают в srcset и для какой ширины вёрстки
+SRCSET_SIZES = {
+    'thumb': (['thumb'], '160px'),
+    'card': (['card', 'full'], '(max-width: 600px) 100vw, 400px'),
+    'full': (['card', 'full'], '(max-width: 900px) 100vw, 800px'),
+}
+
+
+def _attrs(attrs):
+    # css_class -> class, data_index -> data-index
+    items = []
+    for key, value in attrs.items():
+        name = 'class' if key == 'css_class' else key.replace('_', '-')
+        items.append((name, value))
+    return format_html_join('', ' {}="{}"', items)
+
+
+@register.simple_tag
+def responsive_image(instance, size='card', field_name='photo_url', **attrs):
+    """<picture> с WebP и JPEG-запасным вариантом; без производных - обычный <img>."""
+    field_file = getattr(instance, field_name, None)
+    if not field_file:
+        return ''
+    urls = derivative_urls(instance, field_name)
+    if not has_derivatives(instance, field_name):
+        return format_html('<img src="{}" loading="lazy"{}>', field_file.url, _attrs(attrs))
+
+    names, sizes = SRCSET_SIZES[size]
+
+    def srcset(ext):
+        return ', '.join(f'{urls[name][ext]} {DERIVATIVE_SIZES[name][0]}w' for name in names)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" loading="lazy"{}></picture>',
+        srcset('webp'), sizes, urls[size]['jpg'], srcset('jpg'), sizes, _attrs(attrs),
+    )
@@ -0,0 +1,20 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from config.page_cache import hole_placeholder, is_shared_render, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, *args):
+    """Пользовательский фрагмент страницы (см. config/page_cache.py).
+
+    В общей версии страницы для кэша выводится метка, иначе - сам фрагмент.
+    """
+    request = context.get('request')
+    if request is None:
+        return ''
+    if is_shared_render(request):
+        return mark_safe(hole_placeholder(name, args))
+    return mark_safe(render_hole(request, name, args))
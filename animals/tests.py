@@ -1,7 +1,26 @@
-from django.test import TestCase, Client
+import json
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from config import page_cache, slugs
+from config.images import generate_derivatives
+from .cards import cache_stats
+from .imports import import_animals
 from .models import Animal, AnimalPhoto
+from .search import search_animals
+from .serializers import AnimalSerializer
 
 User = get_user_model()
 
@@ -97,3 +116,365 @@ class AnimalsPermissionsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertFalse(AnimalPhoto.objects.filter(id=photo.id).exists())
 
+
+
+class AnimalCardsQueryTests(TestCase):
+    """Карточки животных строятся за фиксированное число запросов."""
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+        for i in range(5):
+            animal = Animal.objects.create(
+                name=f"Кот {i}",
+                species="Кот",
+                health_status="Здоров",
+            )
+            AnimalPhoto.objects.create(animal=animal, photo_url=f"cat{i}_1.jpg")
+            AnimalPhoto.objects.create(animal=animal, photo_url=f"cat{i}_2.jpg")
+
+    def test_animal_list_queries_do_not_depend_on_animal_count(self):
+        """Пустой кэш: список, карточки промахов и их фото; дальше - только список."""
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("animal_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "cat4_2.jpg")
+        # Страница перерисовывается, но карточки берутся из кэша фрагментов
+        page_cache.invalidate("animals")
+        with self.assertNumQueries(1):
+            cached = self.client.get(reverse("animal_list"))
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cache_stats(), {"hits": 5, "misses": 5, "hit_ratio": 0.5})
+
+    def test_changes_bump_card_version(self):
+        """Изменение животного или его фото даёт новую версию карточки."""
+        self.client.get(reverse("animal_list"))
+        animal = Animal.objects.get(name="Кот 0")
+        animal.name = "Кот Нулевой"
+        animal.save()
+        self.assertContains(self.client.get(reverse("animal_list")), "Кот Нулевой")
+        AnimalPhoto.objects.create(animal=animal, photo_url="cat0_3.jpg")
+        self.assertContains(self.client.get(reverse("animal_list")), "cat0_3.jpg")
+        # Смена статуса через adoptions.services идёт UPDATE-ом, минуя save()
+        Animal.objects.filter(pk=animal.pk).update(status="adopted", updated_at=timezone.now())
+        self.assertContains(self.client.get(reverse("home")), "🏠 Усыновлено")
+
+    def test_cover_photo_follows_first_photo(self):
+        """Обложка — первое фото; после его удаления обложкой становится следующее."""
+        animal = Animal.objects.get(name="Кот 0")
+        first, second = AnimalPhoto.objects.filter(animal=animal).order_by("id")
+        self.assertEqual(animal.cover_photo_id, first.id)
+        AnimalPhoto.objects.filter(id=first.id).delete()
+        animal.refresh_from_db()
+        self.assertEqual(animal.cover_photo_id, second.id)
+
+
+class AnimalSearchTests(TestCase):
+    """Полнотекстовый поиск по каталогу."""
+
+    def setUp(self):
+        self.client = Client()
+        self.barsik = Animal.objects.create(
+            name="Барсик",
+            species="Кот",
+            breed="Сиамский",
+            health_status="Здоров",
+        )
+        self.sharik = Animal.objects.create(
+            name="Шарик",
+            species="Собака",
+            health_status="Здоров",
+            description="Любит барсучьи норы",
+        )
+
+    def test_search_ranks_name_matches_first(self):
+        """Совпадение по имени выше совпадения по описанию; поиск по префиксу."""
+        response = self.client.get(reverse("animal_list"), {"q": "барс"})
+        self.assertEqual(list(response.context["animals"]), [self.barsik, self.sharik])
+
+    def test_index_follows_save_and_delete(self):
+        """Индекс обновляется при изменении и удалении животного."""
+        self.barsik.breed = "Мейн-кун"
+        self.barsik.save()
+        response = self.client.get(reverse("animal_list"), {"q": "мейн"})
+        self.assertEqual(list(response.context["animals"]), [self.barsik])
+
+        self.barsik.delete()
+        response = self.client.get(reverse("animal_list"), {"q": "мейн"})
+        self.assertEqual(list(response.context["animals"]), [])
+
+    def test_filters_apply_before_ranking_and_limit(self):
+        """Более релевантное, но отфильтрованное животное не вытесняет подходящее."""
+        self.barsik.status = "adopted"
+        self.barsik.save()
+        page = search_animals(Animal.objects.filter(status="in_shelter"), "барс", limit=1)
+        self.assertEqual(list(page), [self.sharik])
+
+    def test_api_search_results_are_paginated_by_relevance(self):
+        """?q= в API листается курсором: сначала самые релевантные."""
+        user = User.objects.create(username="searcher", role="adopter")
+        self.client.force_login(user)
+        first = self.client.get(reverse("api_animals"), {"q": "барс", "page_size": 1}).json()
+        self.assertEqual([row["id"] for row in first["results"]], [self.barsik.pk])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([row["id"] for row in second["results"]], [self.sharik.pk])
+        self.assertIsNone(second["next"])
+        self.assertIsNotNone(second["previous"])
+
+
+class PhotoDerivativesTests(TestCase):
+    """Миниатюры фотографий и запасной вариант с оригиналом."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        buffer = BytesIO()
+        Image.new("RGB", (900, 600), "orange").save(buffer, "JPEG")
+        self.animal = Animal.objects.create(name="Рыжик", species="Кот", health_status="Здоров")
+        self.photo = AnimalPhoto.objects.create(
+            animal=self.animal,
+            photo_url=SimpleUploadedFile("ryzhik.jpg", buffer.getvalue(), content_type="image/jpeg"),
+        )
+
+    def test_card_uses_original_until_derivatives_are_built(self):
+        """Без производных карточка ссылается на оригинал, после генерации - на srcset."""
+        response = self.client.get(reverse("animal_list"))
+        self.assertContains(response, f'src="{self.photo.photo_url.url}"')
+        self.assertNotContains(response, "<picture>")
+
+        self.assertTrue(generate_derivatives(AnimalPhoto, self.photo.pk, self.photo.photo_url.name))
+        self.photo.refresh_from_db()
+        storage = self.photo.photo_url.storage
+        root = self.photo.photo_url.name.rsplit(".", 1)[0]
+        with storage.open(f"{root}.card.webp") as card:
+            self.assertEqual(Image.open(card).size, (480, 320))
+
+        response = self.client.get(reverse("animal_list"))
+        self.assertContains(response, "<picture>")
+        self.assertContains(response, f"{root}.card.webp 480w")
+
+
+class AnimalSlugTests(TestCase):
+    """Выдача slug: транслитерация, суффиксы и повтор при конфликте."""
+
+    def create(self, name="Барсик"):
+        return Animal.objects.create(name=name, species="Кот", health_status="Здоров")
+
+    def test_cyrillic_names_get_transliterated_suffixed_slugs(self):
+        """Одинаковые имена получают barsik, barsik-1, barsik-2..."""
+        self.create("Барсик-пёс")
+        created = [self.create().slug for _ in range(3)]
+        self.assertEqual(created, ["barsik", "barsik-1", "barsik-2"])
+        self.assertEqual(self.create("Щенок Ёжик").slug, "shchenok-ezhik")
+        self.assertEqual(self.create("🐾").slug, "animal")
+
+    def test_suffix_lookup_is_a_single_query(self):
+        """Число запросов на вставку не растёт с числом однофамильцев."""
+        with CaptureQueriesContext(connection) as first:
+            self.create()
+        for _ in range(20):
+            self.create()
+        with CaptureQueriesContext(connection) as last:
+            animal = self.create()
+        self.assertEqual(len(first), len(last))
+        self.assertEqual(animal.slug, "barsik-21")
+
+    def test_slug_taken_concurrently_is_reallocated(self):
+        """Если выданный slug успели занять, он выдаётся заново после IntegrityError."""
+        self.create()
+        # Первая попытка "не видит" уже занятый slug, как при гонке двух вставок
+        with mock.patch.object(slugs, "next_free_slug", side_effect=["barsik", "barsik-1"]) as allocate:
+            animal = self.create()
+        self.assertEqual(animal.slug, "barsik-1")
+        self.assertEqual(allocate.call_count, 2)
+
+    def test_bulk_allocation_continues_after_existing_suffixes(self):
+        """Пачка получает свободные slug одним запросом, в том числе после пропусков."""
+        self.create()
+        self.create()
+        # Освободился barsik, но barsik-1 занят: следующий суффикс - 2
+        Animal.objects.filter(slug="barsik").delete()
+        with CaptureQueriesContext(connection) as queries:
+            allocated = slugs.allocate_slugs(Animal, ["Барсик", "Мурка", "Барсик"], "animal")
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(allocated, ["barsik", "murka", "barsik-2"])
+
+    def test_bulk_allocation_skips_slugs_issued_in_same_batch(self):
+        """Суффикс одного имени не совпадает с base другого имени той же пачки."""
+        allocated = slugs.allocate_slugs(Animal, ["Барсик", "Барсик", "Барсик 1"], "animal")
+        self.assertEqual(allocated, ["barsik", "barsik-1", "barsik-1-1"])
+        allocated = slugs.allocate_slugs(Animal, ["Барсик 1", "Барсик", "Барсик"], "animal")
+        self.assertEqual(len(set(allocated)), 3)
+
+
+class AnimalImportTests(TestCase):
+    """Массовый импорт: пакетная вставка, фото из архива и ошибки по строкам."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.volunteer = User.objects.create_user(username="volunteer", role="volunteer")
+        Animal.objects.create(name="Барсик", species="Кот", health_status="Здоров")
+
+    def _photos_zip(self):
+        image = BytesIO()
+        Image.new("RGB", (40, 30), "gray").save(image, "JPEG")
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as photos:
+            photos.writestr("barsik.jpg", image.getvalue())
+            photos.writestr("broken.jpg", b"not an image")
+        archive.seek(0)
+        return SimpleUploadedFile("photos.zip", archive.getvalue(), content_type="application/zip")
+
+    def test_csv_import_reports_row_errors(self):
+        rows = (
+            "name,species,health_status,age_years,photos\n"
+            "Барсик,Кот,Здоров,2,barsik.jpg\n"
+            "Без здоровья,Кот,,1,\n"
+            "Барсик,Кот,Здоров,-1,\n"
+            "Мурка,Кошка,Здорова,3,broken.jpg\n"
+            "Барсик,Кот,Здоров,4,\n"
+        )
+        self.client.force_login(self.volunteer)
+        response = self.client.post(reverse("api_animals_import"), {
+            "file": SimpleUploadedFile("intake.csv", rows.encode("utf-8")),
+            "photos": self._photos_zip(),
+        })
+        self.assertEqual(response.status_code, 201)
+        report = response.json()
+        self.assertEqual([item["slug"] for item in report["created"]], ["barsik-1", "barsik-2"])
+        self.assertEqual([item["row"] for item in report["created"]], [1, 5])
+        errors = {error["row"]: error["errors"] for error in report["errors"]}
+        self.assertEqual(sorted(errors), [2, 3, 4])
+        self.assertIn("health_status", errors[2])
+        self.assertIn("age_years", errors[3])
+        self.assertIn("photos", errors[4])
+
+        imported = Animal.objects.get(slug="barsik-1")
+        self.assertIsNotNone(imported.cover_photo_id)
+        self.assertEqual(imported.cover_photo.animal_id, imported.pk)
+        self.assertIn(imported, search_animals(Animal.objects.all(), "барсик"))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Пачка вставляется фиксированным числом запросов."""
+        def run(count):
+            rows = [
+                {"name": f"Кот {index}", "species": "Кот", "health_status": "Здоров"}
+                for index in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                report = import_animals(iter(rows))
+            self.assertEqual(len(report["created"]), count)
+            return len(queries)
+
+        self.assertEqual(run(2), run(30))
+
+    def test_adopter_forbidden(self):
+        self.client.force_login(User.objects.create_user(username="adopter"))
+        rows = json.dumps([{"name": "Кот", "species": "Кот", "health_status": "Здоров"}])
+        response = self.client.post(reverse("api_animals_import"), {
+            "file": SimpleUploadedFile("intake.json", rows.encode("utf-8")),
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Animal.objects.count(), 1)
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified: неизменённые ресурсы отдаются ответом 304."""
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(User.objects.create_user(username="kiosk"))
+        self.animal = Animal.objects.create(name="Мурка", species="Кошка", health_status="Здорова")
+
+    def test_unchanged_detail_returns_304_without_serializer(self):
+        """Повтор с If-None-Match не доходит до сериализатора."""
+        url = reverse("api_animal_detail", args=[self.animal.pk])
+        response = self.client.get(url)
+        self.assertTrue(response.has_header("Last-Modified"))
+        with mock.patch.object(AnimalSerializer, "to_representation") as serialize:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], response["ETag"])
+        serialize.assert_not_called()
+
+    def test_new_photo_changes_animal_validators(self):
+        """Фото входит в карточку: после загрузки ETag животного другой."""
+        url = reverse("api_animal_detail", args=[self.animal.pk])
+        etag = self.client.get(url)["ETag"]
+        AnimalPhoto.objects.create(animal=self.animal, photo_url="murka.jpg")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_follows_filters_and_deletions(self):
+        """ETag списка зависит от фильтров и меняется при удалении записи."""
+        other = Animal.objects.create(name="Шарик", species="Собака", health_status="Здоров")
+        url = reverse("api_animals")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(url, {"species": "Кошка"})["ETag"], etag)
+        other.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_page_validators_depend_on_user(self):
+        """HTML-страница животного: 304 для того же пользователя, 200 для другого."""
+        url = reverse("animal_detail", args=[self.animal.slug])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.force_login(User.objects.create_user(username="other"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PageCacheTests(TestCase):
+    """Общий кэш публичных страниц с пользовательскими фрагментами."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.animal = Animal.objects.create(name="Мурка", species="Кошка", health_status="Здорова")
+        self.adopter = User.objects.create_user(username="alice", role="adopter")
+
+    def test_shared_page_is_filled_per_user(self):
+        """Один рендер на всех: приветствие и форма заявки подставляются при ответе."""
+        url = reverse("animal_detail", args=[self.animal.slug])
+        anonymous = self.client.get(url)
+        self.assertEqual(anonymous["X-Page-Cache"], "miss")
+        self.assertContains(anonymous, "необходимо <a")
+        self.assertNotContains(anonymous, "<!--hole:")
+
+        self.client.force_login(self.adopter)
+        # ETag (животное, заявка), сессия, пользователь и блок заявки - без рендера страницы
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Привет, alice!")
+        self.assertContains(response, "csrfmiddlewaretoken")
+        self.assertNotContains(response, "необходимо <a")
+
+    def test_model_changes_invalidate_pages(self):
+        """Изменение животного делает закэшированный список несвежим."""
+        self.client.get(reverse("animal_list"))
+        self.animal.name = "Мурёна"
+        self.animal.save()
+        response = self.client.get(reverse("animal_list"))
+        self.assertEqual(response["X-Page-Cache"], "revalidate")
+        self.assertContains(response, "Мурёна")
+
+    def test_stale_copy_is_served_while_another_request_revalidates(self):
+        """Пока страницу перерисовывает другой запрос, отдаётся несвежая копия без запросов к БД."""
+        url = reverse("animal_list")
+        self.client.get(url)
+        Animal.objects.create(name="Шарик", species="Собака", health_status="Здоров")
+        cache.add(f"{page_cache.PAGE_CACHE_PREFIX}:{url}:lock", True)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "stale")
+        self.assertNotContains(response, "Шарик")
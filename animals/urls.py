@@ -1,6 +1,7 @@
 from django.urls import path
+from config.export import ExportAPI
 from .views import (
-    AnimalListAPI, AnimalDetailAPI,
+    AnimalListAPI, AnimalDetailAPI, AnimalCardCacheStatsAPI, AnimalImportAPI,
     AnimalPhotoListAPI, AnimalPhotoDetailAPI,
     animal_list, animal_detail, create_animal, edit_animal, delete_animal
 )
@@ -9,6 +10,9 @@ urlpatterns = [
     # API endpoints
     path("api/animals/", AnimalListAPI.as_view(), name="api_animals"),
     path("api/animals/<int:pk>/", AnimalDetailAPI.as_view(), name="api_animal_detail"),
+    path("api/animals/card-cache/", AnimalCardCacheStatsAPI.as_view(), name="api_animal_card_cache"),
+    path("api/animals/import/", AnimalImportAPI.as_view(), name="api_animals_import"),
+    path("api/animals/export.<str:extension>", ExportAPI.as_view(dataset="animals"), name="api_animals_export"),
     path("api/animals/<int:animal_id>/photos/", AnimalPhotoListAPI.as_view(), name="api_animal_photos"),
     path("api/photos/<int:pk>/", AnimalPhotoDetailAPI.as_view(), name="api_photo_detail"),
     # Template views
@@ -1,22 +1,41 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.middleware.csrf import get_token
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from config.conditional import detail_validators, list_validators, not_modified, object_validators, set_validators
+from config.instrumentation import query_budget
+from config.page_cache import cached_page
+from config.pagination import KeysetPagination
+from config.query_plan import QueryPlanMixin
+from config.routers import replica_reads
+from config.sqlite import serialized_write
 from .models import Animal, AnimalPhoto
 from .serializers import AnimalSerializer, AnimalCreateUpdateSerializer, AnimalPhotoSerializer
+from .search import filter_animals, search_animals
+from .cards import cache_stats
+from .imports import AnimalImportError, import_animals, import_format, read_rows
 from adoptions.models import Adoption
 
 
-class AnimalListAPI(APIView):
+# Сколько самых релевантных результатов поиска показывать в каталоге
+SEARCH_RESULTS_LIMIT = 200
+
+
+@query_budget(5)
+@replica_reads
+class AnimalListAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = AnimalSerializer
     
     def get(self, request):
         # Фильтрация по виду животного
         species = request.query_params.get('species', None)
         status_filter = request.query_params.get('status', None)
+        query = request.query_params.get('q', '').strip()
         
         animals = Animal.objects.all()
         
@@ -25,8 +44,24 @@ class AnimalListAPI(APIView):
         if status_filter:
             animals = animals.filter(status=status_filter)
         
-        serializer = AnimalSerializer(animals, many=True)
-        return Response(serializer.data)
+        # Неизменившийся список - 304 без загрузки карточек и сериализации
+        matching = filter_animals(animals, query) if query else animals
+        validators = list_validators(matching, request.get_full_path())
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+        
+        animals = self.optimize_queryset(animals.with_cards())
+        if query:
+            # Результаты поиска листаются курсором по (релевантность, id)
+            animals = search_animals(animals, query)
+            paginator = KeysetPagination('search_rank')
+        else:
+            paginator = KeysetPagination('created_at')
+        page = paginator.paginate_queryset(animals, request)
+        serializer = AnimalSerializer(page, many=True)
+        response = paginator.get_paginated_response(serializer.data)
+        return set_validators(response, validators)
     
     def post(self, request):
         # Только администраторы и волонтёры могут создавать животных
@@ -44,16 +79,23 @@ class AnimalListAPI(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class AnimalDetailAPI(APIView):
+@query_budget(5)
+class AnimalDetailAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = AnimalSerializer
     
     def get_object(self, pk):
         try:
-            return Animal.objects.get(pk=pk)
+            return self.optimize_queryset(Animal.objects.with_cards()).get(pk=pk)
         except Animal.DoesNotExist:
             return None
     
     def get(self, request, pk):
+        validators = detail_validators(Animal.objects.all(), pk)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+        
         animal = self.get_object(pk)
         if not animal:
             return Response(
@@ -62,7 +104,7 @@ class AnimalDetailAPI(APIView):
             )
         
         serializer = AnimalSerializer(animal)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), validators)
     
     def put(self, request, pk):
         # Только администраторы и волонтёры могут редактировать животных
@@ -105,11 +147,56 @@ class AnimalDetailAPI(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class AnimalPhotoListAPI(APIView):
+@query_budget(2)
+class AnimalCardCacheStatsAPI(APIView):
     permission_classes = [IsAuthenticated]
     
+    def get(self, request):
+        # Счётчики кэша карточек видят только администраторы
+        if request.user.role != 'admin':
+            return Response(
+                {"error": "Только администраторы могут просматривать статистику кэша"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(cache_stats())
+
+
+@query_budget(2)
+class AnimalImportAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Массовый импорт: file - CSV/JSON со строками животных, photos - zip с фото."""
+        if request.user.role not in ['admin', 'volunteer']:
+            return Response(
+                {"error": "Только администраторы и волонтёры могут добавлять животных"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get('file')
+        fmt = import_format(upload.name) if upload else None
+        if fmt is None:
+            return Response(
+                {"error": "Передайте файл .csv или .json в поле file"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            report = import_animals(read_rows(upload, fmt), request.FILES.get('photos'))
+        except AnimalImportError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        )
+
+
+@query_budget(3)
+class AnimalPhotoListAPI(QueryPlanMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = AnimalPhotoSerializer
+    
     def get(self, request, animal_id):
-        photos = AnimalPhoto.objects.filter(animal_id=animal_id)
+        photos = self.optimize_queryset(AnimalPhoto.objects.filter(animal_id=animal_id))
         serializer = AnimalPhotoSerializer(photos, many=True)
         return Response(serializer.data)
     
@@ -145,12 +232,14 @@ class AnimalPhotoListAPI(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class AnimalPhotoDetailAPI(APIView):
+@query_budget(3)
+class AnimalPhotoDetailAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = AnimalPhotoSerializer
     
     def get_object(self, pk):
         try:
-            return AnimalPhoto.objects.get(pk=pk)
+            return self.optimize_queryset(AnimalPhoto.objects.all()).get(pk=pk)
         except AnimalPhoto.DoesNotExist:
             return None
     
@@ -185,6 +274,9 @@ class AnimalPhotoDetailAPI(APIView):
 
 
 # Views для шаблонов
+@query_budget(5)
+@replica_reads
+@cached_page('animals')
 def animal_list(request):
     """Список всех животных с карточками"""
     animals = Animal.objects.exclude(slug='').order_by('-created_at')
@@ -199,20 +291,44 @@ def animal_list(request):
     if status_filter:
         animals = animals.filter(status=status_filter)
     
-    # Добавляем фотографии для каждого животного
-    for animal in animals:
-        photos = AnimalPhoto.objects.filter(animal=animal)
-        animal.photos_list = list(photos)
-        animal.first_photo = photos.first() if photos.exists() else None
+    # Для склейки карточек из кэша нужны только id и версия (см. cards.py)
+    animals = animals.only('id', 'updated_at')
+    
+    # Полнотекстовый поиск: самые релевантные среди отфильтрованных
+    query = request.GET.get('q', '').strip()
+    if query:
+        animals = search_animals(animals, query, limit=SEARCH_RESULTS_LIMIT)
     
     return render(request, 'animals/list.html', {
         'animals': animals,
         'selected_species': species,
         'selected_status': status_filter,
+        'query': query,
         'status_choices': Animal.STATUS_CHOICES
     })
 
 
+def _animal_detail_validators(request, slug):
+    """ETag страницы: животное, пользователь, его заявка и CSRF-секрет формы."""
+    animal = Animal.objects.filter(slug=slug).only('id', 'updated_at').first()
+    if animal is None:
+        return None
+    adoption_updated_at = None
+    if request.user.is_authenticated:
+        adoption_updated_at = Adoption.objects.filter(
+            user=request.user, animal=animal
+        ).values_list('updated_at', flat=True).first()
+    get_token(request)  # выдаёт секрет, если у клиента его ещё нет
+    return object_validators(
+        animal,
+        request.user.pk,
+        adoption_updated_at.isoformat() if adoption_updated_at else None,
+        request.META.get('CSRF_COOKIE'),
+    )
+
+
+@query_budget(8)
+@cached_page('animals', validators=_animal_detail_validators)
 def animal_detail(request, slug):
     """Детальная страница животного с формой заявки"""
     animal = get_object_or_404(Animal, slug=slug)
@@ -261,14 +377,14 @@ def animal_detail(request, slug):
             messages.success(request, 'Заявка успешно подана!')
             return redirect('animal_detail', slug=slug)
     
+    # Блок заявки и кнопки сотрудников - фрагменты animals/holes.py
     return render(request, 'animals/detail.html', {
         'animal': animal,
         'photos': photos,
-        'has_adoption': has_adoption,
-        'existing_adoption': existing_adoption
     })
 
 
+@query_budget(2)
 @login_required
 def create_animal(request):
     """Создание нового животного"""
@@ -324,6 +440,21 @@ def create_animal(request):
     })
 
 
+@serialized_write
+def _save_animal_edit(animal, delete_photo_ids, new_photos):
+    """Сохраняет правку животного вместе с фотографиями (через очередь записи)."""
+    animal.save()
+    
+    # Удаляем отмеченные фотографии
+    if delete_photo_ids:
+        AnimalPhoto.objects.filter(id__in=delete_photo_ids, animal=animal).delete()
+    
+    # Загружаем новые фотографии (можно добавить сразу несколько)
+    for photo in new_photos:
+        AnimalPhoto.objects.create(animal=animal, photo_url=photo)
+
+
+@query_budget(4)
 @login_required
 def edit_animal(request, slug):
     """Редактирование животного"""
@@ -350,15 +481,7 @@ def edit_animal(request, slug):
         else:
             animal.breed = animal.breed if animal.breed else None
             animal.description = animal.description if animal.description else None
-            animal.save()
-            
-            # Удаляем отмеченные фотографии
-            if delete_photo_ids:
-                AnimalPhoto.objects.filter(id__in=delete_photo_ids, animal=animal).delete()
-            
-            # Загружаем новые фотографии (можно добавить сразу несколько)
-            for photo in new_photos:
-                AnimalPhoto.objects.create(animal=animal, photo_url=photo)
+            _save_animal_edit(animal, delete_photo_ids, new_photos)
             
             messages.success(request, f'Животное {animal.name} успешно обновлено!')
             return redirect('animal_detail', slug=animal.slug)
@@ -371,6 +494,7 @@ def edit_animal(request, slug):
     })
 
 
+@query_budget(3)
 @login_required
 def delete_animal(request, slug):
     """Удаление животного"""
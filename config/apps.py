@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ConfigConfig(AppConfig):
+    name = "config"
+    verbose_name = "Настройки проекта"
+
+    def ready(self):
+        from . import sqlite  # noqa: F401
@@ -0,0 +1,227 @@
+"""
+Микробенчмарки горячих участков: сериализаторы API, шаблоны страниц со
+списками карточек и сохранение животного с выдачей slug.
+
+Каждый бенчмарк регистрируется декоратором benchmark: функция получает
+размер набора (сколько животных, заявок, карточек), создаёт данные и
+возвращает вызываемый объект без аргументов - именно он и замеряется.
+Всё, что не относится к участку (выборка из БД для сериализаторов,
+заполнение кэша карточек), делается до замера. Число вызовов в серии
+подбирается как в timeit (не меньше MIN_SERIES_SECONDS на серию), в
+результат идёт лучшее время одного вызова по сериям - оно меньше всего
+зависит от фоновой нагрузки машины.
+
+Команда benchmark запускает бенчмарки на временной тестовой БД,
+сохраняет результаты базовой линией (--save) и падает, если какой-то
+участок стал медленнее базовой линии больше чем на порог.
+"""
+import platform
+import statistics
+import time
+import timeit
+
+import django
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from activities.models import Activity
+from adoptions.models import Adoption, Return
+from adoptions.serializers import ReturnSerializer
+from animals.models import Animal, AnimalPhoto
+from animals.serializers import AnimalSerializer
+from users.models import CustomUser
+from .slugs import allocate_slugs
+
+BENCHMARK_SIZE = 50
+BENCHMARK_REPEAT = 5
+# Допустимое замедление относительно базовой линии (0.2 - на 20%)
+BENCHMARK_THRESHOLD = 0.2
+MIN_SERIES_SECONDS = 0.2
+PHOTOS_PER_ANIMAL = 3
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Регистрирует бенчмарк: setup(size) -> вызываемый объект для замера."""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def _users(count, role='adopter'):
+    offset = CustomUser.objects.count()
+    usernames = [f'bench_{role}_{offset + index}' for index in range(count)]
+    slugs = allocate_slugs(CustomUser, usernames, 'user')
+    return CustomUser.objects.bulk_create([
+        CustomUser(username=username, slug=slug, role=role) for username, slug in zip(usernames, slugs)
+    ])
+
+
+def _animals(count, status='in_shelter'):
+    """Животные с фотографиями; у фото уже есть миниатюры (как в рабочем режиме)."""
+    names = ['Барсик', 'Мурка', 'Шарик', 'Рекс', 'Пушок'] * (count // 5 + 1)
+    names = names[:count]
+    animals = Animal.objects.bulk_create([
+        Animal(
+            name=name, slug=slug, species='Кошка', breed='Беспородная', age_years=2, age_months=3,
+            health_status='Здоров', description=f'{name} ждёт новую семью. ' * 4, status=status,
+        )
+        for name, slug in zip(names, allocate_slugs(Animal, names, 'animal'))
+    ])
+    AnimalPhoto.objects.bulk_create([
+        AnimalPhoto(animal=animal, photo_url=f'animals/bench/{animal.pk}-{index}.jpg',
+                    derivatives_name=f'animals/bench/{animal.pk}-{index}.jpg')
+        for animal in animals
+        for index in range(PHOTOS_PER_ANIMAL)
+    ])
+    for animal in animals:
+        animal.cover_photo = animal.photos.order_by('id').first()
+    Animal.objects.bulk_update(animals, ['cover_photo'])
+    return animals
+
+
+def _request(path):
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    return request
+
+
+@benchmark('serializer.animals')
+def animal_serializer(size):
+    """AnimalSerializer(many=True) с вложенными photos и cover_photo."""
+    ids = [animal.pk for animal in _animals(size)]
+    animals = list(Animal.objects.filter(pk__in=ids).select_related('cover_photo').prefetch_related('photos'))
+    return lambda: AnimalSerializer(animals, many=True).data
+
+
+@benchmark('serializer.returns')
+def return_serializer(size):
+    """ReturnSerializer: поля через adoption.animal.name и adoption.user.username."""
+    users = _users(size)
+    staff = _users(1, role='admin')[0]
+    adoptions = Adoption.objects.bulk_create([
+        Adoption(user=user, animal=animal, status='returned')
+        for user, animal in zip(users, _animals(size))
+    ])
+    Return.objects.bulk_create([
+        Return(adoption=adoption, reason='Переезд', processed_by=staff) for adoption in adoptions
+    ])
+    returns = list(Return.objects.filter(adoption__in=adoptions).select_related(
+        'adoption__animal', 'adoption__user', 'processed_by',
+    ))
+    return lambda: ReturnSerializer(returns, many=True).data
+
+
+def _animal_list(size):
+    ids = [animal.pk for animal in _animals(size)]
+    animals = Animal.objects.filter(pk__in=ids).order_by('-created_at').only('id', 'updated_at')
+    context = {
+        'animals': animals,
+        'selected_species': '',
+        'selected_status': '',
+        'query': '',
+        'status_choices': Animal.STATUS_CHOICES,
+    }
+    request = _request('/animals/')
+    return lambda: render_to_string('animals/list.html', context, request=request)
+
+
+@benchmark('template.animal_list.cold')
+def animal_list_cold(size):
+    """animals/list.html с size карточками, кэш карточек пуст."""
+    render = _animal_list(size)
+
+    def run():
+        cache.clear()
+        return render()
+    return run
+
+
+@benchmark('template.animal_list.warm')
+def animal_list_warm(size):
+    """animals/list.html с size карточками из кэша."""
+    render = _animal_list(size)
+    render()
+    return render
+
+
+@benchmark('template.home')
+def home(size):
+    """activities/home.html: size записей ленты и size карточек из кэша."""
+    author = _users(1, role='volunteer')[0]
+    now = timezone.now()
+    Activity.objects.bulk_create([
+        Activity(title=f'Новость {index}', description='Запись о жизни приюта. ' * 3,
+                 activity_type='news', created_by=author, created_at=now)
+        for index in range(size)
+    ])
+    ids = [animal.pk for animal in _animals(size)]
+    context = {
+        'activities': list(Activity.objects.with_author().order_by('-created_at')[:size]),
+        'animals': list(Animal.objects.filter(pk__in=ids).only('id', 'updated_at')),
+    }
+    request = _request('/')
+    render_to_string('activities/home.html', context, request=request)
+    return lambda: render_to_string('activities/home.html', context, request=request)
+
+
+@benchmark('model.animal_save_slug')
+def animal_save_slug(size):
+    """Animal.save нового животного, чьё имя уже занято size животными."""
+    _animals(size)
+
+    def run():
+        # Вставка откатывается: каждый вызов видит ровно size совпадающих имён,
+        # сколько бы раз timeit его ни повторил
+        with transaction.atomic():
+            Animal(name='Барсик', species='Кошка', health_status='Здоров').save()
+            transaction.set_rollback(True)
+    return run
+
+
+def measure(func, repeat=BENCHMARK_REPEAT):
+    """Лучшее и медианное время одного вызова (мкс) по repeat сериям."""
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < MIN_SERIES_SECONDS and number < 10 ** 6:
+        number *= 2
+    series = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {'best_us': round(min(series) * 1e6, 2), 'median_us': round(statistics.median(series) * 1e6, 2),
+            'calls': number * repeat}
+
+
+def run_benchmarks(names=None, size=BENCHMARK_SIZE, repeat=BENCHMARK_REPEAT, log=None):
+    """Запускает бенчмарки (все или names) и возвращает отчёт для базовой линии."""
+    results = {}
+    for name in names or sorted(BENCHMARKS):
+        func = BENCHMARKS[name](size)
+        results[name] = measure(func, repeat)
+        if log:
+            log(name, results[name])
+    return {
+        'size': size,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.node(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'benchmarks': results,
+    }
+
+
+def compare(baseline, report, threshold=BENCHMARK_THRESHOLD):
+    """Строки (имя, было мкс, стало мкс, изменение доли, регрессия ли) по лучшему времени."""
+    rows = []
+    for name, result in report['benchmarks'].items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if old is None:
+            rows.append((name, None, result['best_us'], None, False))
+            continue
+        change = result['best_us'] / old['best_us'] - 1
+        rows.append((name, old['best_us'], result['best_us'], change, change > threshold))
+    return rows
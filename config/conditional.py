@@ -0,0 +1,80 @@
+"""
+Условные GET-запросы (ETag / Last-Modified).
+
+Валидаторы вычисляются лёгкими запросами до загрузки и сериализации
+данных: для одной записи - её updated_at, для отфильтрованного списка -
+Max(updated_at) и Count. Поэтому если копия клиента актуальна, ответ 304
+отдаётся без работы сериализатора.
+
+Поля связанных записей в ответе (кличка животного в заявке, имя автора
+активности) валидаторы не читают: при их изменении сигналы обновляют
+updated_at зависимых записей (adoptions/signals.py, activities/signals.py).
+
+Для списков отдаётся только ETag: удаление записи не меняет
+Max(updated_at), и проверка по одному Last-Modified его бы пропустила.
+"""
+import hashlib
+from typing import NamedTuple, Optional
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[object] = None
+
+
+def make_etag(*parts):
+    data = ':'.join('' if part is None else str(part) for part in parts)
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+
+def object_validators(obj, *extra):
+    """Валидаторы уже загруженной записи; extra - всё, от чего ещё зависит ответ."""
+    return Validators(
+        make_etag(obj._meta.label, obj.pk, obj.updated_at.isoformat(), *extra),
+        obj.updated_at,
+    )
+
+
+def detail_validators(queryset, pk, *extra):
+    """Валидаторы записи pk из queryset или None, если её там нет."""
+    updated_at = queryset.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return Validators(
+        make_etag(queryset.model._meta.label, pk, updated_at.isoformat(), *extra),
+        updated_at,
+    )
+
+
+def list_validators(queryset, *extra):
+    """ETag отфильтрованного списка: Max(updated_at) + Count одним агрегатом."""
+    stats = queryset.order_by().aggregate(last=Max('updated_at'), count=Count('pk'))
+    last = stats['last'].isoformat() if stats['last'] else None
+    return Validators(make_etag(queryset.model._meta.label, stats['count'], last, *extra))
+
+
+def not_modified(request, validators):
+    """Ответ 304 (или 412), если копия клиента актуальна, иначе None."""
+    if validators is None or request.method not in ('GET', 'HEAD'):
+        return None
+    last_modified = validators.last_modified
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(validators.etag),
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, validators)
+    return response
+
+
+def set_validators(response, validators):
+    if validators is not None and response.status_code in (200, 304):
+        response['ETag'] = quote_etag(validators.etag)
+        if validators.last_modified:
+            response['Last-Modified'] = http_date(validators.last_modified.timestamp())
+    return response
@@ -0,0 +1,252 @@
+"""
+Потоковая выгрузка данных для отчётов (NDJSON / CSV, по желанию в gzip).
+
+Списочные API собирают весь serializer.data в памяти, поэтому для
+выгрузки всей истории они не годятся. Здесь строки читаются проекцией
+.values() (без создания объектов моделей и сериализаторов) через
+.iterator(chunk_size=...), сразу кодируются и отдаются кусками:
+StreamingHttpResponse в API и запись в файл в команде export_data.
+В памяти одновременно находятся только одна пачка строк из БД и один
+буфер вывода, поэтому потребление памяти не зависит от объёма таблицы.
+"""
+import csv
+import json
+import tempfile
+import zlib
+from itertools import islice
+from typing import NamedTuple
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from jobs.queue import register
+from .instrumentation import query_budget
+from .routers import same_database
+
+# Сколько строк забирать из БД за один fetchmany
+EXPORT_CHUNK_SIZE = 2000
+# Размер куска, который отдаётся клиенту / пишется в файл
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Dataset(NamedTuple):
+    model: str
+    # Проекция .values(): поля связанных моделей через __, без JOIN-ов сверх нужного
+    fields: tuple
+    # Параметры запроса, по которым можно отфильтровать выгрузку
+    filters: tuple = ()
+
+
+DATASETS = {
+    'animals': Dataset(
+        'animals.Animal',
+        ('id', 'slug', 'name', 'species', 'breed', 'age_years', 'age_months',
+         'health_status', 'description', 'status', 'created_at', 'updated_at'),
+        filters=('status', 'species'),
+    ),
+    'adoptions': Dataset(
+        'adoptions.Adoption',
+        ('id', 'user_id', 'user__username', 'animal_id', 'animal__name', 'status',
+         'submitted_at', 'updated_at', 'rejection_reason'),
+        filters=('status', 'user_id', 'animal_id'),
+    ),
+    'returns': Dataset(
+        'adoptions.Return',
+        ('id', 'adoption_id', 'adoption__user__username', 'adoption__animal_id',
+         'adoption__animal__name', 'reason', 'processed_by__username', 'returned_at'),
+    ),
+    'activities': Dataset(
+        'activities.Activity',
+        ('id', 'title', 'activity_type', 'description', 'created_by_id',
+         'created_by__username', 'created_at', 'updated_at'),
+        filters=('activity_type',),
+    ),
+}
+
+
+def _split_fields(model, fields):
+    """Делит проекцию на поля этой БД и поля через FK в другую БД (config/routers.py).
+
+    Вторые - {поле: (столбец FK, связанная модель, атрибут)}: их нельзя
+    получить JOIN-ом, они подставляются отдельным запросом на пачку строк.
+    """
+    local, remote = [], {}
+    for name in fields:
+        relation, sep, attr = name.partition('__')
+        if sep:
+            field = model._meta.get_field(relation)
+            if not same_database(model, field.related_model):
+                remote[name] = (field.attname, field.related_model, attr)
+                continue
+        local.append(name)
+    for attname, _, _ in remote.values():
+        if attname not in local:
+            local.append(attname)
+    return local, remote
+
+
+def _join_remote(rows, fields, remote, chunk_size):
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        for name, (attname, model, attr) in remote.items():
+            keys = {row[attname] for row in chunk}
+            values = dict(model._default_manager.filter(pk__in=keys).values_list('pk', attr))
+            for row in chunk:
+                row[name] = values.get(row[attname])
+        for row in chunk:
+            yield {field: row[field] for field in fields}
+
+
+def clean_filters(name, filters):
+    """Фильтры набора name, приведённые к типам полей (to_python).
+
+    Параметры вне dataset.filters и пустые значения отбрасываются;
+    значение не того типа (?user_id=abc) - ValidationError.
+    """
+    dataset = DATASETS[name]
+    model = apps.get_model(dataset.model)
+    lookups = {}
+    for key, value in (filters or {}).items():
+        if key not in dataset.filters or not value:
+            continue
+        try:
+            lookups[key] = model._meta.get_field(key).to_python(value)
+        except ValidationError:
+            raise ValidationError(f"Недопустимое значение фильтра {key}: {value}")
+    return lookups
+
+
+def export_rows(name, filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Итератор словарей-строк набора name (по возрастанию id)."""
+    dataset = DATASETS[name]
+    model = apps.get_model(dataset.model)
+    local, remote = _split_fields(model, dataset.fields)
+    lookups = clean_filters(name, filters)
+    rows = model._default_manager.filter(**lookups).order_by('id').values(*local).iterator(chunk_size=chunk_size)
+    return _join_remote(rows, dataset.fields, remote, chunk_size) if remote else rows
+
+
+def _plain(value):
+    # Даты в ISO 8601, как и в JSON
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: writerow возвращает готовую строку."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_plain(row[field]) for field in fields])
+
+
+def _buffered(lines, size=EXPORT_BUFFER_SIZE):
+    """Склеивает строки в куски байт около size, чтобы не писать по строчке."""
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(name, fmt='ndjson', gzip=False, filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Итератор кусков байт выгрузки набора name в формате fmt."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    rows = export_rows(name, filters, chunk_size)
+    lines = ndjson_lines(rows) if fmt == 'ndjson' else csv_lines(rows, DATASETS[name].fields)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if gzip else chunks
+
+
+@register('exports.write_file')
+def write_export_file(dataset, fmt, gzip, name, filters=None):
+    """Фоновая выгрузка в файл хранилища (media) name; см. export_data --background."""
+    with tempfile.TemporaryFile() as output:
+        for chunk in export_stream(dataset, fmt, gzip, filters=filters):
+            output.write(chunk)
+        output.seek(0)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, File(output))
+
+
+def parse_extension(extension):
+    """'csv.gz' -> ('csv', True); None, если формат не поддерживается."""
+    fmt, _, compression = extension.partition('.')
+    if fmt not in FORMATS or compression not in ('', 'gz'):
+        return None
+    return fmt, compression == 'gz'
+
+
+@query_budget(2)
+class ExportAPI(APIView):
+    """GET /api/<набор>/export.<ndjson|csv>[.gz] - потоковая выгрузка для отчётов."""
+    permission_classes = [IsAuthenticated]
+    dataset = None
+
+    def get(self, request, extension):
+        if request.user.role not in ['admin', 'volunteer']:
+            return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
+        parsed = parse_extension(extension)
+        if parsed is None:
+            return Response(
+                {"error": f"Поддерживаемые форматы: {', '.join(FORMATS)} (с .gz - сжатый)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        fmt, gzip = parsed
+        try:
+            filters = clean_filters(self.dataset, request.query_params.dict())
+        except ValidationError as error:
+            return Response({"error": error.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = export_stream(self.dataset, fmt, gzip, filters=filters)
+        response = StreamingHttpResponse(
+            stream, content_type='application/gzip' if gzip else FORMATS[fmt]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.dataset}.{extension}"'
+        # Выгрузка всегда актуальна и не должна оседать в промежуточных кэшах
+        response['Cache-Control'] = 'no-store'
+        return response
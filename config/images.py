@@ -0,0 +1,170 @@
+"""
+Производные изображения (миниатюры) для фотографий животных и активностей.
+
+Для каждого оригинала строятся размеры thumb/card/full в WebP и JPEG и
+сохраняются рядом с ним: animals/2025/12/18/abc.card.webp и т.д.
+Генерация выполняется фоновой задачей (очередь jobs, команда runworker),
+а пока производных нет, везде отдаётся оригинал. Файлы удалённых
+изображений вместе с производными тоже удаляются фоновой задачей.
+
+Модель с изображением хранит в поле derivatives_name имя файла, для
+которого производные уже построены; если имя не совпадает с текущим
+файлом, производные считаются отсутствующими.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import router
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from jobs.queue import enqueue, register
+
+logger = logging.getLogger(__name__)
+
+# имя: (ширина, высота, обрезать ли до точного размера)
+DERIVATIVE_SIZES = {
+    'thumb': (160, 160, True),
+    'card': (480, 320, True),
+    'full': (1600, 1600, False),
+}
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Отправляется после построения производных: sender - модель, pk - запись, using - её БД
+derivatives_ready = Signal()
+
+# Как долго не ставить повторно задачу для того же файла (ленивые вызовы из derivative_urls)
+DERIVATIVES_REQUEUE_SECONDS = 10 * 60
+
+
+def derivative_name(name, size, ext):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}.{ext}'
+
+
+def has_derivatives(instance, field_name='photo_url'):
+    field_file = getattr(instance, field_name)
+    return bool(field_file) and instance.derivatives_name == field_file.name
+
+
+def derivative_urls(instance, field_name='photo_url'):
+    """Словарь {размер: {формат: url}}; без производных все url - оригинал.
+
+    Отсутствующие производные лениво ставятся в очередь на генерацию.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    if not has_derivatives(instance, field_name):
+        schedule_derivatives(instance, field_name)
+        original = field_file.url
+        return {size: {ext: original for ext in DERIVATIVE_FORMATS} for size in DERIVATIVE_SIZES}
+    storage = field_file.storage
+    return {
+        size: {ext: storage.url(derivative_name(field_file.name, size, ext)) for ext in DERIVATIVE_FORMATS}
+        for size in DERIVATIVE_SIZES
+    }
+
+
+def _render(image, width, height, crop, fmt, options):
+    if crop:
+        resized = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    else:
+        resized = image.copy()
+        resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    resized.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def build_derivatives(storage, name):
+    """Сохраняет в storage все производные файла name; False, если файл не открылся."""
+    try:
+        with storage.open(name, 'rb') as source:
+            image = Image.open(source)
+            image = ImageOps.exif_transpose(image).convert('RGB')
+    except (OSError, ValueError):
+        logger.warning("Не удалось открыть изображение %s для построения производных", name)
+        return False
+
+    for size, (width, height, crop) in DERIVATIVE_SIZES.items():
+        for ext, (fmt, options) in DERIVATIVE_FORMATS.items():
+            target = derivative_name(name, size, ext)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(_render(image, width, height, crop, fmt, options)))
+    return True
+
+
+def generate_derivatives(model, pk, name, field_name='photo_url'):
+    """Строит все производные для файла name и отмечает это в записи pk."""
+    if not build_derivatives(model._meta.get_field(field_name).storage, name):
+        return False
+
+    # Условие по имени файла: если за это время фото заменили, отметка не ставится.
+    # Ссылки на производные меняют ответ API, поэтому обновляется и updated_at
+    using = router.db_for_write(model)
+    marked = model._default_manager.using(using).filter(pk=pk, **{field_name: name}).update(
+        derivatives_name=name, updated_at=timezone.now()
+    )
+    if marked:
+        derivatives_ready.send(sender=model, pk=pk, using=using)
+    return True
+
+
+@register('images.generate_derivatives')
+def generate_derivatives_job(model, pk, name, field_name='photo_url'):
+    generate_derivatives(apps.get_model(model), pk, name, field_name)
+
+
+def schedule_derivatives(instance, field_name='photo_url'):
+    """Ставит генерацию производных в очередь фоновых задач.
+
+    Задача добавляется в текущей транзакции: откат отменяет и её.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file or has_derivatives(instance, field_name):
+        return
+    label, pk, name = instance._meta.label, instance.pk, field_file.name
+    key = f'derivatives:{label}:{pk}:{name}'
+    # derivative_urls вызывает это при каждом показе: не пишем в БД каждый раз
+    marker = f'images:queued:{hashlib.md5(key.encode("utf-8")).hexdigest()}'
+    if not cache.add(marker, True, timeout=DERIVATIVES_REQUEUE_SECONDS):
+        return
+    enqueue(
+        'images.generate_derivatives',
+        {'model': label, 'pk': pk, 'name': name, 'field_name': field_name},
+        dedupe_key=key,
+    )
+
+
+@register('images.delete_files')
+def delete_image_files(model, name, field_name='photo_url'):
+    """Удаляет файл изображения и все его производные."""
+    storage = apps.get_model(model)._meta.get_field(field_name).storage
+    names = [name] + [
+        derivative_name(name, size, ext) for size in DERIVATIVE_SIZES for ext in DERIVATIVE_FORMATS
+    ]
+    for target in names:
+        if storage.exists(target):
+            storage.delete(target)
+
+
+def schedule_file_cleanup(instance, field_name='photo_url'):
+    """После удаления записи её изображение удаляется фоновой задачей."""
+    field_file = getattr(instance, field_name)
+    if field_file:
+        enqueue(
+            'images.delete_files',
+            {'model': instance._meta.label, 'name': field_file.name, 'field_name': field_name},
+            dedupe_key=f'delete:{field_file.name}',
+        )
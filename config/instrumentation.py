@@ -0,0 +1,120 @@
+"""
+Учёт SQL-запросов каждого HTTP-запроса и бюджеты запросов представлений.
+
+QueryInstrumentationMiddleware через connection.execute_wrapper считает
+запросы ко всем БД, их суммарное время и повторы одного и того же SQL
+(отпечаток - текст запроса с плейсхолдерами, списки IN (...) свёрнуты,
+поэтому N+1 виден как один отпечаток, выполненный много раз). Итог
+отдаётся в заголовке Server-Timing (виден во вкладке Network браузера) и
+пишется в лог config.instrumentation одной JSON-строкой на запрос.
+
+Представление объявляет бюджет декоратором query_budget(n) - число
+запросов на GET (чтение, где и появляются N+1; запись зависит от данных
+формы и в бюджет не входит). Превышение пишется в лог предупреждением,
+а тест QueryBudgetTests (config/tests.py) проходит все URL приложений и
+падает, если представление вышло из бюджета или не объявило его. Запросы, выполняемые при отдаче тела
+StreamingHttpResponse, в учёт не попадают - они идут уже после ответа.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Сколько самых частых повторов писать в лог
+LOG_DUPLICATES = 5
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def query_budget(limit):
+    """Объявляет бюджет SQL-запросов представления (функции или класса)."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def view_budget(view_func):
+    """Бюджет представления, объявленный query_budget, или None."""
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    budget = getattr(view_func, 'query_budget', None)
+    return budget if budget is not None else getattr(view_class, 'query_budget', None)
+
+
+def fingerprint(sql):
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryStats:
+    """execute_wrapper: считает запросы, их время и одинаковые тексты SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """[(отпечаток, сколько раз)] для SQL, выполненного больше одного раза."""
+        counts = Counter()
+        for sql, count in self.statements.items():
+            counts[fingerprint(sql)] += count
+        return [(sql, count) for sql, count in counts.most_common() if count > 1]
+
+
+class QueryInstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = request.query_stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(stats))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        duplicates = stats.duplicates()
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries, {len(duplicates)} repeated"',
+            f'app;dur={(total - stats.duration) * 1000:.1f}',
+        ])
+
+        budget = getattr(request, 'query_budget', None)
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': stats.count,
+            'budget': budget,
+            'db_ms': round(stats.duration * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'duplicates': [{'sql': sql[:300], 'count': count} for sql, count in duplicates[:LOG_DUPLICATES]],
+        }
+        if budget is not None and stats.count > budget:
+            logger.warning(json.dumps({'event': 'query_budget_exceeded', **record}, ensure_ascii=False))
+        else:
+            logger.info(json.dumps({'event': 'request', **record}, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ('GET', 'HEAD'):
+            request.query_budget = view_budget(view_func)
@@ -0,0 +1,302 @@
+"""
+Нагрузочный тест: параллельные клиенты с сессиями разных ролей.
+
+Каждый клиент - поток с постоянным HTTP-соединением и своей сессией:
+анонимный посетитель или вошедший через форму входа пользователь
+(усыновитель, волонтёр, администратор - из данных seed_shelter). Клиент
+до окончания теста выбирает случайный адрес из сценария своей роли с
+учётом весов: HTML-страницы и REST API только на чтение, поэтому тест
+можно гонять и по копии рабочей БД. Адреса (slug, id заявок своих
+пользователей) берутся из БД выборкой заранее.
+
+По каждому адресу считаются p50/p95/p99 задержки, пропускная способность
+и ошибки; отчёт пишется в JSON, чтобы сравнивать выпуски (compare_reports).
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from http.cookies import SimpleCookie
+from typing import Callable, NamedTuple
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import reverse
+from django.utils import timezone
+
+from activities.models import Activity
+from adoptions.models import Adoption
+from animals.models import Animal
+from users.models import CustomUser
+from .seed import SEED_PASSWORD
+
+# Доля клиентов каждой роли
+ROLE_MIX = {'anonymous': 40, 'adopter': 45, 'volunteer': 10, 'admin': 5}
+# Сколько записей каждого вида выбрать из БД для построения адресов
+SAMPLE_SIZE = 500
+REQUEST_TIMEOUT = 30
+
+
+class Sample(NamedTuple):
+    animal_slugs: list
+    animal_names: list
+    species: list
+    # Роль -> имена пользователей; у усыновителей - только с заявками
+    users: dict
+    # Усыновитель -> id его заявок
+    adoptions_by_user: dict
+    adoption_ids: list
+
+
+class Endpoint(NamedTuple):
+    name: str
+    role: str
+    weight: int
+    # (выборка, генератор случайных чисел, имя пользователя) -> путь
+    path: Callable
+
+
+def _with_query(name, **params):
+    return f'{reverse(name)}?{urlencode(params)}'
+
+
+ENDPOINTS = [
+    Endpoint('home', 'anonymous', 10, lambda s, rng, user: reverse('home')),
+    Endpoint('animal_list', 'anonymous', 10, lambda s, rng, user: reverse('animal_list')),
+    Endpoint('animal_list?species', 'anonymous', 5,
+             lambda s, rng, user: _with_query('animal_list', species=rng.choice(s.species))),
+    Endpoint('animal_detail', 'anonymous', 8,
+             lambda s, rng, user: reverse('animal_detail', kwargs={'slug': rng.choice(s.animal_slugs)})),
+    Endpoint('activity_feed', 'anonymous', 5, lambda s, rng, user: reverse('activity_feed')),
+    Endpoint('activity_feed_items?type', 'anonymous', 3,
+             lambda s, rng, user: _with_query('activity_feed_items', activity_type='news')),
+
+    Endpoint('animal_list', 'adopter', 6, lambda s, rng, user: reverse('animal_list')),
+    Endpoint('animal_detail', 'adopter', 6,
+             lambda s, rng, user: reverse('animal_detail', kwargs={'slug': rng.choice(s.animal_slugs)})),
+    Endpoint('home', 'adopter', 4, lambda s, rng, user: reverse('home')),
+    Endpoint('api_animals', 'adopter', 5, lambda s, rng, user: reverse('api_animals')),
+    Endpoint('api_animals?q', 'adopter', 3,
+             lambda s, rng, user: _with_query('api_animals', q=rng.choice(s.animal_names))),
+    Endpoint('api_activities', 'adopter', 3, lambda s, rng, user: reverse('api_activities')),
+    Endpoint('adoption_list', 'adopter', 4, lambda s, rng, user: reverse('adoption_list')),
+    Endpoint('adoption_detail', 'adopter', 3,
+             lambda s, rng, user: reverse('adoption_detail', kwargs={'pk': rng.choice(s.adoptions_by_user[user])})),
+    Endpoint('api_adoptions', 'adopter', 3, lambda s, rng, user: reverse('api_adoptions')),
+
+    Endpoint('adoption_list', 'volunteer', 5, lambda s, rng, user: reverse('adoption_list')),
+    Endpoint('return_list', 'volunteer', 3, lambda s, rng, user: reverse('return_list')),
+    Endpoint('api_adoptions?status', 'volunteer', 4,
+             lambda s, rng, user: _with_query('api_adoptions', status='pending')),
+    Endpoint('api_returns', 'volunteer', 3, lambda s, rng, user: reverse('api_returns')),
+    Endpoint('edit_animal', 'volunteer', 2,
+             lambda s, rng, user: reverse('edit_animal', kwargs={'slug': rng.choice(s.animal_slugs)})),
+    Endpoint('activity_feed', 'volunteer', 3, lambda s, rng, user: reverse('activity_feed')),
+
+    Endpoint('adoption_list?status', 'admin', 4, lambda s, rng, user: _with_query('adoption_list', status='pending')),
+    Endpoint('adoption_detail', 'admin', 3,
+             lambda s, rng, user: reverse('adoption_detail', kwargs={'pk': rng.choice(s.adoption_ids)})),
+    Endpoint('api_adoptions', 'admin', 4, lambda s, rng, user: reverse('api_adoptions')),
+    Endpoint('api_returns', 'admin', 2, lambda s, rng, user: reverse('api_returns')),
+    Endpoint('api_users', 'admin', 3, lambda s, rng, user: reverse('api_users')),
+]
+
+
+def build_sample(size=SAMPLE_SIZE):
+    """Случайные записи из БД, из которых строятся адреса запросов."""
+    animals = list(Animal.objects.order_by('?').values_list('slug', 'name')[:size])
+    adoptions = list(
+        Adoption.objects.filter(user__role='adopter').order_by('?').values_list('user__username', 'pk')[:size]
+    )
+    adoptions_by_user = defaultdict(list)
+    for username, pk in adoptions:
+        adoptions_by_user[username].append(pk)
+    users = {'adopter': list(adoptions_by_user)}
+    for role in ('volunteer', 'admin'):
+        users[role] = list(CustomUser.objects.filter(role=role).order_by('?').values_list('username', flat=True)[:size])
+    return Sample(
+        animal_slugs=[slug for slug, _ in animals if slug],
+        animal_names=sorted({name for _, name in animals}),
+        species=list(Animal.objects.values_list('species', flat=True).distinct()),
+        users=users,
+        adoptions_by_user=dict(adoptions_by_user),
+        adoption_ids=[pk for _, pk in adoptions],
+    )
+
+
+class Session:
+    """Клиент с постоянным соединением и cookie (сессия, CSRF)."""
+
+    def __init__(self, base_url, timeout=REQUEST_TIMEOUT):
+        url = urlsplit(base_url)
+        self.connection_class = HTTPSConnection if url.scheme == 'https' else HTTPConnection
+        self.netloc = url.netloc
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Выполняет запрос; возвращает (код ответа, тело)."""
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={value}' for key, value in self.cookies.items())
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, OSError):
+                # Сервер закрыл постоянное соединение - переподключаемся один раз
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for key, morsel in SimpleCookie(header).items():
+                self.cookies[key] = morsel.value
+        return response.status, data
+
+    def login(self, username, password):
+        login_path = reverse('login')
+        self.request('GET', login_path)
+        body = urlencode({
+            'username': username, 'password': password,
+            'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+        })
+        status, _ = self.request('POST', login_path, body=body, headers={
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Referer': self.base_url + login_path,
+        })
+        if status != 302 or 'sessionid' not in self.cookies:
+            raise RuntimeError(f"Не удалось войти как {username} (код {status})")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def percentile(values, fraction):
+    """Перцентиль отсортированного списка (метод ближайшего ранга)."""
+    if not values:
+        return None
+    # Ранг - ceil(fraction * n); round убирает хвост вида 7.000000000000001
+    index = max(math.ceil(round(fraction * len(values), 9)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(latencies, errors, elapsed):
+    """Отчёт по адресам: {адрес: {requests, errors, rps, p50_ms, ...}} и итог."""
+    def stats(values, failed):
+        values = sorted(values)
+        return {
+            'requests': len(values),
+            'errors': failed,
+            'rps': round(len(values) / elapsed, 2) if elapsed else 0,
+            'p50_ms': _ms(percentile(values, 0.50)),
+            'p95_ms': _ms(percentile(values, 0.95)),
+            'p99_ms': _ms(percentile(values, 0.99)),
+            'mean_ms': _ms(sum(values) / len(values)) if values else None,
+            'max_ms': _ms(values[-1]) if values else None,
+        }
+
+    endpoints = {name: stats(values, errors.get(name, 0)) for name, values in sorted(latencies.items())}
+    total = stats([value for values in latencies.values() for value in values], sum(errors.values()))
+    return {'endpoints': endpoints, 'total': total}
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def run_load(base_url, clients=16, duration=30.0, sample=None, password=SEED_PASSWORD, seed=None,
+             role_mix=None, log=None):
+    """Гоняет нагрузку duration секунд; возвращает отчёт (см. summarize) с meta."""
+    sample = sample or build_sample()
+    role_mix = dict(role_mix or ROLE_MIX)
+    for role in ('adopter', 'volunteer', 'admin'):
+        if not sample.users.get(role):
+            # Нет пользователей роли - её клиенты не запускаются
+            role_mix.pop(role, None)
+    by_role = defaultdict(list)
+    for endpoint in ENDPOINTS:
+        by_role[endpoint.role].append(endpoint)
+
+    rng = random.Random(seed)
+    latencies, errors = defaultdict(list), defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(client_seed):
+        client_rng = random.Random(client_seed)
+        role = client_rng.choices(list(role_mix), weights=list(role_mix.values()))[0]
+        username = client_rng.choice(sample.users[role]) if role != 'anonymous' else None
+        endpoints = by_role[role]
+        weights = [endpoint.weight for endpoint in endpoints]
+        session = Session(base_url)
+        try:
+            if username:
+                session.login(username, password)
+            while time.monotonic() < deadline:
+                endpoint = client_rng.choices(endpoints, weights=weights)[0]
+                path = endpoint.path(sample, client_rng, username)
+                started = time.perf_counter()
+                try:
+                    status, _ = session.request('GET', path)
+                except OSError as exc:
+                    status = None
+                    if log:
+                        log(f"{endpoint.name}: {exc}")
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies[endpoint.name].append(elapsed)
+                    if status is None or status >= 400:
+                        errors[endpoint.name] += 1
+        finally:
+            session.close()
+
+    started_at = timezone.now()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=clients, thread_name_prefix='load') as pool:
+        futures = [pool.submit(client, rng.random()) for _ in range(clients)]
+        for future in futures:
+            future.result()
+    report = summarize(latencies, errors, time.monotonic() - started)
+    report['meta'] = {
+        'base_url': base_url,
+        'clients': clients,
+        'duration_s': duration,
+        'started_at': started_at.isoformat(),
+        'role_mix': role_mix,
+        'dataset': {
+            'animals': Animal.objects.count(),
+            'adoptions': Adoption.objects.count(),
+            'activities': Activity.objects.count(),
+            'users': CustomUser.objects.count(),
+        },
+    }
+    return report
+
+
+def compare_reports(baseline, current):
+    """Строки сравнения по адресам: (адрес, p95 было, p95 стало, изменение %, rps было, rps стало)."""
+    rows = []
+    names = sorted(set(baseline['endpoints']) | set(current['endpoints']))
+    for name in names + ['total']:
+        old = baseline['total'] if name == 'total' else baseline['endpoints'].get(name, {})
+        new = current['total'] if name == 'total' else current['endpoints'].get(name, {})
+        old_p95, new_p95 = old.get('p95_ms'), new.get('p95_ms')
+        change = round((new_p95 - old_p95) / old_p95 * 100, 1) if old_p95 and new_p95 is not None else None
+        rows.append((name, old_p95, new_p95, change, old.get('rps'), new.get('rps')))
+    return rows
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,78 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from config.benchmarks import (
+    BENCHMARK_REPEAT, BENCHMARK_SIZE, BENCHMARK_THRESHOLD, BENCHMARKS, compare, run_benchmarks,
+)
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks.json'
+
+
+class Command(BaseCommand):
+    help = ("Микробенчмарки сериализаторов, шаблонов и сохранения моделей на временной тестовой БД; "
+            "падает, если участок медленнее базовой линии больше чем на порог")
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Какие бенчмарки запустить (все: {', '.join(sorted(BENCHMARKS))})")
+        parser.add_argument('--size', type=int, default=BENCHMARK_SIZE, help="Размер набора: животных, заявок, карточек")
+        parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT, help="Сколько серий замеров")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Файл базовой линии (JSON)")
+        parser.add_argument('--save', action='store_true', help="Записать результаты как новую базовую линию")
+        parser.add_argument('--threshold', type=float, default=BENCHMARK_THRESHOLD,
+                            help="Допустимое замедление лучшего времени, доля (0.2 - на 20%%)")
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Неизвестные бенчмарки: {', '.join(sorted(unknown))}")
+        baseline_path = Path(options['baseline'])
+        baseline = None
+        if not options['save']:
+            if not baseline_path.exists():
+                raise CommandError(f"Нет базовой линии {baseline_path}: сначала запустите с --save")
+            baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+            if baseline.get('size') != options['size']:
+                raise CommandError(f"Базовая линия снята при --size {baseline.get('size')}")
+
+        def log(name, result):
+            self.stdout.write(f"{name:<30} {result['best_us']:>12.1f} мкс (медиана {result['median_us']:.1f})")
+
+        # Данные создаются во временной БД, кэш карточек - отдельный в памяти процесса,
+        # метрики - во временном каталоге, а не в METRICS_DIR сервера
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with tempfile.TemporaryDirectory() as metrics_dir, override_settings(
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                METRICS_DIR=metrics_dir,
+            ):
+                report = run_benchmarks(options['names'], options['size'], options['repeat'], log=log)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        if options['save']:
+            if baseline_path.exists():
+                saved = json.loads(baseline_path.read_text(encoding='utf-8'))
+                # Запуск части бенчмарков обновляет только их
+                report['benchmarks'] = {**saved.get('benchmarks', {}), **report['benchmarks']}
+            baseline_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Базовая линия записана в {baseline_path}"))
+            return
+
+        regressions = []
+        self.stdout.write(f"\n{'бенчмарк':<30} {'было, мкс':>12} {'стало, мкс':>12} {'изменение':>10}")
+        for name, old, new, change, regressed in compare(baseline, report, options['threshold']):
+            old_text = f'{old:.1f}' if old is not None else '-'
+            change_text = f'{change * 100:+.1f}%' if change is not None else 'новый'
+            line = f"{name:<30} {old_text:>12} {new:>12.1f} {change_text:>10}"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+            if regressed:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"Медленнее базовой линии больше чем на {options['threshold'] * 100:.0f}%: {', '.join(regressions)}"
+            )
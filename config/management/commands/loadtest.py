@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.loadtest import compare_reports, run_load, write_report
+from config.seed import SEED_PASSWORD
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест запущенного сервера: задержки p50/p95/p99 и RPS по адресам, отчёт в JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help="Адрес сервера, например http://127.0.0.1:8000")
+        parser.add_argument('--clients', type=int, default=16, help="Сколько параллельных клиентов")
+        parser.add_argument('--duration', type=float, default=30, help="Длительность, секунд")
+        parser.add_argument('--password', default=SEED_PASSWORD, help="Пароль пользователей (из seed_shelter)")
+        parser.add_argument('--seed', type=int, default=None, help="Зерно для повторяемого выбора адресов")
+        parser.add_argument('-o', '--output', help="Записать отчёт JSON (базовую линию) в файл")
+        parser.add_argument('--compare', help="Сравнить с отчётом JSON прошлого выпуска")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as source:
+                    baseline = json.load(source)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Не удалось прочитать {options['compare']}: {exc}")
+
+        report = run_load(
+            options['base_url'], clients=options['clients'], duration=options['duration'],
+            password=options['password'], seed=options['seed'], log=self.stderr.write,
+        )
+
+        self.stdout.write(f"{'адрес':32} {'запросов':>9} {'ошибок':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for name, row in [*report['endpoints'].items(), ('total', report['total'])]:
+            self.stdout.write(
+                f"{name:32} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8} "
+                f"{row['p50_ms'] or '-':>8} {row['p95_ms'] or '-':>8} {row['p99_ms'] or '-':>8}"
+            )
+
+        if baseline:
+            self.stdout.write("\nСравнение p95 (мс) и rps с базовой линией:")
+            for name, old_p95, new_p95, change, old_rps, new_rps in compare_reports(baseline, report):
+                mark = f"{change:+.1f}%" if change is not None else '-'
+                self.stdout.write(f"{name:32} {old_p95 or '-':>8} -> {new_p95 or '-':>8} {mark:>8}   rps {old_rps} -> {new_rps}")
+
+        if options['output']:
+            write_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Отчёт записан в {options['output']}"))
@@ -0,0 +1,51 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from config import page_cache
+
+
+class Command(BaseCommand):
+    help = "Обновляет реплики SQLite копией основной БД через online backup API (запускать по cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='databases',
+                            help="Основная БД, чью реплику обновить (по умолчанию все из DATABASE_REPLICAS)")
+        parser.add_argument('--pages', type=int, default=1024,
+                            help="Сколько страниц копировать за шаг: между шагами основная БД доступна для записи")
+        parser.add_argument('--sleep', type=float, default=0.005, help="Пауза между шагами, секунд")
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', {})
+        primaries = options['databases'] or list(replicas)
+        if not primaries:
+            raise CommandError("Реплики не настроены (PAWSHELTER_REPLICA_DB)")
+
+        for primary in primaries:
+            if primary not in replicas:
+                raise CommandError(f"У базы {primary} нет реплики")
+            source = connections[primary]
+            if source.vendor != 'sqlite':
+                raise CommandError(f"{primary}: online backup поддерживается только для SQLite")
+            replica = connections[replicas[primary]]
+            # Соединение этого процесса с репликой не должно держать старый снимок
+            replica.close()
+
+            started = time.monotonic()
+            source.ensure_connection()
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                # Копия согласована: если основную БД изменили во время копирования,
+                # backup начинает заново; читатели реплики видят старую копию до конца
+                source.connection.backup(target, pages=options['pages'], sleep=options['sleep'])
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(
+                f"{primary} -> {replicas[primary]}: {time.monotonic() - started:.2f} с"
+            ))
+
+        # Страницы, отрисованные с устаревшей реплики, перерисуются с новой копии
+        page_cache.invalidate('animals', 'activities')
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.seed import DEFAULT_VOLUMES, SEED_BATCH_SIZE, SEED_PASSWORD, seed_shelter
+
+
+class Command(BaseCommand):
+    help = "Заполняет БД большим объёмом правдоподобных данных для нагрузочных тестов (не для рабочей БД!)"
+
+    def add_arguments(self, parser):
+        for kind, count in DEFAULT_VOLUMES.items():
+            parser.add_argument(f'--{kind}', type=int, default=count, help=f"Сколько добавить (по умолчанию {count})")
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help="Множитель всех объёмов, например 0.01 для быстрой проверки")
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+        parser.add_argument('--seed', type=int, default=None, help="Зерно генератора для повторяемых данных")
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0:
+            raise CommandError("--scale должен быть больше нуля")
+        volumes = {kind: int(options[kind] * options['scale']) for kind in DEFAULT_VOLUMES}
+        started = time.monotonic()
+        last = {}
+
+        def report(kind, done, total):
+            # Прогресс примерно по 10%, чтобы не засорять вывод
+            step = max(total // 10, 1)
+            if done == total or done // step != last.get(kind):
+                last[kind] = done // step
+                self.stdout.write(f"{kind}: {done}/{total} ({time.monotonic() - started:.0f} с)")
+
+        seed_shelter(volumes, batch_size=options['batch_size'], seed=options['seed'], report=report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.monotonic() - started:.0f} с; пароль созданных пользователей: {SEED_PASSWORD}"
+        ))
@@ -0,0 +1,448 @@
+"""
+Метрики Prometheus (/metrics), общие для всех процессов сервера.
+
+MetricsMiddleware считает по каждому представлению (имя URL) запросы с
+кодами ответа, гистограммы времени ответа, времени SQL (по
+request.query_stats из config/instrumentation.py) и рендеринга шаблонов
+(бэкенд TimedDjangoTemplates), а также число запросов в обработке.
+Кэш страниц (page_cache) и кэш карточек (animals/cards.py) считают
+попадания и промахи - доля попаданий считается в Prometheus.
+
+Каждый процесс пишет свои значения в файл METRICS_DIR/<pid>.db,
+отображённый в память (MmapValues): запись - это изменение числа в
+памяти, без системных вызовов и блокировок между процессами. /metrics
+в любом процессе читает и складывает файлы всех процессов, поэтому
+Prometheus видит числа всего сервера, к какому бы воркеру ни попал.
+Файлы завершившихся процессов при сборе переносятся в merged.db
+(счётчики и гистограммы; gauge - нет) и удаляются. Общий каталог
+задаётся явно (PAWSHELTER_METRICS_DIR) и очищается при запуске сервера;
+без него у каждого процесса свой временный каталог, удаляемый при
+выходе, и /metrics показывает только этот процесс.
+"""
+import atexit
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+try:
+    import fcntl
+except ImportError:  # Windows: файлы завершившихся процессов не сливаются
+    fcntl = None
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INITIAL_FILE_SIZE = 64 * 1024
+UNRESOLVED_VIEW = '<unresolved>'
+# Прочие методы сводятся в "other": метка не должна расти от произвольных запросов
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+MERGED_FILE = 'merged.db'
+LOCK_FILE = '.lock'
+
+_USED = struct.Struct('<i4x')
+_LENGTH = struct.Struct('<i')
+_VALUE = struct.Struct('<d')
+
+
+_dir_lock = threading.Lock()
+# (pid, каталог) временного каталога процесса, если METRICS_DIR не задан
+_process_dir = None
+
+
+def _remove_process_dir(pid, path):
+    # atexit наследуется при fork: удаляет каталог только его владелец
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def metrics_dir():
+    configured = getattr(settings, 'METRICS_DIR', None)
+    if configured:
+        return Path(configured)
+    global _process_dir
+    with _dir_lock:
+        if _process_dir is None or _process_dir[0] != os.getpid():
+            path = Path(tempfile.mkdtemp(prefix='pawshelter-metrics-'))
+            atexit.register(_remove_process_dir, os.getpid(), path)
+            _process_dir = (os.getpid(), path)
+        return _process_dir[1]
+
+
+def _pack_entry(key, value):
+    encoded = key.encode('utf-8')
+    padding = -(len(encoded) + _LENGTH.size) % 8
+    return struct.pack(f'<i{len(encoded) + padding}sd', len(encoded), encoded + b' ' * padding, value)
+
+
+def _entries(data, used):
+    """(ключ, значение, смещение значения) записей файла до отметки used."""
+    position = _USED.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        position += _LENGTH.size
+        key = bytes(data[position:position + length]).decode('utf-8')
+        position += length + -(length + _LENGTH.size) % 8
+        yield key, _VALUE.unpack_from(data, position)[0], position
+        position += _VALUE.size
+
+
+def read_values(path):
+    """Все значения файла метрик другого (или этого) процесса."""
+    with open(path, 'rb') as source:
+        data = source.read()
+    if len(data) < _USED.size:
+        return
+    yield from ((key, value) for key, value, _ in _entries(data, _USED.unpack_from(data, 0)[0]))
+
+
+def write_values(path, values):
+    """Записывает {ключ: число} в формате MmapValues атомарной заменой файла."""
+    body = b''.join(_pack_entry(key, value) for key, value in values.items())
+    temporary = path.with_suffix('.tmp')
+    temporary.write_bytes(_USED.pack(_USED.size + len(body)) + body)
+    os.replace(temporary, path)
+
+
+class MmapValues:
+    """Числа по строковым ключам в файле, отображённом в память.
+
+    Формат: [занято байт: int32][4 байта выравнивания], дальше записи
+    [длина ключа: int32][ключ, дополненный пробелами до кратности 8][double].
+    Пишет только процесс-владелец; новая запись сначала пишется целиком,
+    и лишь потом сдвигается отметка "занято", поэтому читатели не видят
+    недописанных записей.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        if self._capacity == 0:
+            self._capacity = INITIAL_FILE_SIZE
+            self._file.truncate(self._capacity)
+        self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._used = _USED.unpack_from(self._mmap, 0)[0]
+        if self._used == 0:
+            self._used = _USED.size
+            _USED.pack_into(self._mmap, 0, self._used)
+        self._positions = {key: position for key, _, position in _entries(self._mmap, self._used)}
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is None:
+            entry = _pack_entry(key, 0.0)
+            if self._used + len(entry) > self._capacity:
+                while self._used + len(entry) > self._capacity:
+                    self._capacity *= 2
+                self._mmap.close()
+                self._file.truncate(self._capacity)
+                self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+            self._mmap[self._used:self._used + len(entry)] = entry
+            position = self._positions[key] = self._used + len(entry) - _VALUE.size
+            self._used += len(entry)
+            _USED.pack_into(self._mmap, 0, self._used)
+        return position
+
+    def add(self, key, amount):
+        position = self._position(key)
+        _VALUE.pack_into(self._mmap, position, _VALUE.unpack_from(self._mmap, position)[0] + amount)
+
+
+_lock = threading.Lock()
+# (pid, каталог, файл): после fork или смены каталога файл открывается заново
+_store = None
+
+
+def _add(key, amount):
+    global _store
+    with _lock:
+        pid, directory = os.getpid(), metrics_dir()
+        if _store is None or _store[:2] != (pid, directory):
+            directory.mkdir(parents=True, exist_ok=True)
+            _store = (pid, directory, MmapValues(directory / f'{pid}.db'))
+        _store[2].add(key, amount)
+
+
+@lru_cache(maxsize=4096)
+def _key(metric, sample, labels):
+    return json.dumps([metric, sample, dict(labels)], ensure_ascii=False)
+
+
+# --- Метрики ---
+
+METRICS = {}
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        METRICS[name] = self
+
+    def _labels(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount:
+            _add(_key(self.name, self.name, self._labels(labels)), amount)
+
+
+class Gauge(Metric):
+    """Сумма по работающим процессам (значения завершившихся не учитываются)."""
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        _add(_key(self.name, self.name, self._labels(labels)), amount)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        for bound in self.buckets:
+            if value <= bound:
+                _add(_key(self.name, f'{self.name}_bucket', labels + (('le', _format_number(bound)),)), 1)
+        _add(_key(self.name, f'{self.name}_sum', labels), value)
+        _add(_key(self.name, f'{self.name}_count', labels), 1)
+
+
+REQUESTS = Counter(
+    'pawshelter_http_requests_total', "HTTP-запросы по представлению, методу и коду ответа",
+    ['view', 'method', 'status'],
+)
+REQUEST_DURATION = Histogram(
+    'pawshelter_http_request_duration_seconds', "Время обработки HTTP-запроса", ['view', 'method'],
+)
+DB_DURATION = Histogram(
+    'pawshelter_db_duration_seconds', "Суммарное время SQL-запросов за один HTTP-запрос", ['view'],
+)
+DB_QUERIES = Counter('pawshelter_db_queries_total', "SQL-запросы, выполненные представлением", ['view'])
+TEMPLATE_DURATION = Histogram(
+    'pawshelter_template_render_seconds', "Время рендеринга шаблонов за один HTTP-запрос (если они были)",
+    ['view'],
+)
+CACHE_REQUESTS = Counter(
+    'pawshelter_cache_requests_total', "Обращения к кэшу страниц (page) и карточек (card) по результату",
+    ['cache', 'result'],
+)
+IN_FLIGHT = Gauge('pawshelter_http_requests_in_flight', "HTTP-запросы, обрабатываемые сейчас")
+
+
+# --- Сбор значений всех процессов и вывод в текстовом формате Prometheus ---
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # На Windows os.kill(pid, 0) завершил бы процесс: считаем его живым
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _directory_lock(directory):
+    """Блокировка каталога между процессами; без fcntl - None (слияния нет)."""
+    if fcntl is None:
+        yield None
+        return
+    with open(directory / LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield lock
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _metric_type(key):
+    metric = METRICS.get(json.loads(key)[0])
+    return metric.type if metric else None
+
+
+def merge_dead_processes(directory):
+    """Переносит счётчики и гистограммы завершившихся процессов в merged.db
+    и удаляет их файлы (gauge таких процессов просто отбрасываются).
+
+    Вызывать под _directory_lock: merged.db пишет один процесс за раз.
+    """
+    dead = []
+    for path in directory.glob('*.db'):
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+        if not _pid_alive(pid):
+            dead.append(path)
+    if not dead:
+        return
+    merged_path = directory / MERGED_FILE
+    merged = dict(read_values(merged_path)) if merged_path.exists() else {}
+    for path in dead:
+        for key, value in read_values(path):
+            if _metric_type(key) not in (None, 'gauge'):
+                merged[key] = merged.get(key, 0) + value
+    write_values(merged_path, merged)
+    for path in dead:
+        path.unlink(missing_ok=True)
+
+
+def collect():
+    """Суммы по всем процессам: {метрика: {(имя значения, метки): число}}."""
+    samples = {}
+    directory = metrics_dir()
+    if not directory.exists():
+        return samples
+    with _directory_lock(directory) as lock:
+        if lock is not None:
+            merge_dead_processes(directory)
+        for path in directory.glob('*.db'):
+            try:
+                alive = path.name == MERGED_FILE or _pid_alive(int(path.stem))
+                values = list(read_values(path))
+            except (ValueError, OSError):
+                continue
+            for key, value in values:
+                name, sample, labels = json.loads(key)
+                metric = METRICS.get(name)
+                if metric is None or (metric.type == 'gauge' and not alive):
+                    continue
+                sample_key = (sample, tuple(labels.items()))
+                metric_samples = samples.setdefault(name, {})
+                metric_samples[sample_key] = metric_samples.get(sample_key, 0) + value
+    return samples
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sort_key(item):
+    (sample, labels), _ = item
+    le = dict(labels).get('le')
+    return (
+        tuple(pair for pair in labels if pair[0] != 'le'),
+        sample,
+        float(le) if le is not None else 0.0,
+    )
+
+
+def render_metrics():
+    samples = collect()
+    lines = []
+    for name, metric in sorted(METRICS.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for (sample, labels), value in sorted(samples.get(name, {}).items(), key=_sort_key):
+            label_text = ','.join(f'{label}="{_escape(text)}"' for label, text in labels)
+            lines.append(f'{sample}{{{label_text}}} {_format_number(value)}' if labels else f'{sample} {_format_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Время рендеринга шаблонов ---
+
+class _RequestTiming:
+    def __init__(self):
+        self.template = 0.0
+        self.rendered = False
+        self.depth = 0
+
+
+_request_timing = ContextVar('request_timing', default=None)
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        timing = _request_timing.get()
+        if timing is None:
+            return super().render(context, request)
+        # Вложенный рендер (render_to_string внутри тега) уже учтён внешним
+        timing.depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.depth -= 1
+            if not timing.depth:
+                timing.template += time.perf_counter() - started
+                timing.rendered = True
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, учитывающий время рендеринга в метриках запроса."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# --- Middleware ---
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = _RequestTiming()
+        token = _request_timing.set(timing)
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+            _request_timing.reset(token)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or UNRESOLVED_VIEW
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        REQUESTS.inc(view=view, method=method, status=response.status_code)
+        REQUEST_DURATION.observe(duration, view=view, method=method)
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            DB_DURATION.observe(stats.duration, view=view)
+            DB_QUERIES.inc(stats.count, view=view)
+        if timing.rendered:
+            TEMPLATE_DURATION.observe(timing.template, view=view)
+        return response
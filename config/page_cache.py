@@ -0,0 +1,208 @@
+"""
+Кэш целых публичных страниц с "дырками" под пользовательские фрагменты.
+
+Страница рендерится один раз "общей": от имени анонимного пользователя,
+а каждый тег {% hole %} вместо содержимого выводит метку. Общий HTML
+хранится в кэше, а при каждом ответе метки заменяются фрагментами,
+отрендеренными для текущего пользователя (приветствие в меню, сообщения,
+кнопки сотрудников, форма заявки). Фрагменты не ходят в БД, кроме тех,
+которым это действительно нужно (например, заявка пользователя).
+
+Инвалидация - через поколения: у каждой группы страниц ("animals",
+"activities") есть метка в кэше, которую сигналы моделей меняют при
+изменении данных. Запись с устаревшим поколением или старше
+PAGE_CACHE_FRESH_SECONDS считается несвежей (stale-while-revalidate):
+один запрос, взявший блокировку, перерисовывает страницу, а остальные
+в это время получают несвежую копию и не нагружают БД. Метки и записи
+лежат в кэше default, поэтому он должен быть общим для всех процессов
+сервера (CACHES в config/settings.py), а не в памяти процесса.
+
+Реплика (config/routers.py) может отставать, поэтому общая страница
+всегда рендерится из основной БД: иначе копия без последних правок
+считалась бы свежей до следующей инвалидации. Клиент с cookie db_primary
+только что сам изменил данные - ему страница рендерится мимо кэша.
+"""
+import base64
+import json
+import re
+import time
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from .conditional import not_modified, set_validators
+from .metrics import CACHE_REQUESTS
+from .routers import STICKY_COOKIE, primary_reads
+
+PAGE_CACHE_PREFIX = 'page:v1'
+# Сколько запись считается свежей (сигналы инвалидируют её раньше)
+PAGE_CACHE_FRESH_SECONDS = 10 * 60
+# Сколько несвежая копия ещё может отдаваться, пока страница перерисовывается
+PAGE_CACHE_STALE_SECONDS = 24 * 60 * 60
+# Время жизни блокировки перерисовки (если запрос упал, не держим её вечно)
+PAGE_CACHE_LOCK_SECONDS = 30
+
+HOLE_RE = re.compile(r'<!--hole:([\w.-]+):([\w=-]*)-->')
+
+_holes = {}
+
+
+# --- Фрагменты ("дырки") ---
+
+def register_hole(name, template_name=None, arg_names=()):
+    """Регистрирует фрагмент name.
+
+    С template_name фрагмент - шаблон, аргументы тега передаются в контекст
+    под именами arg_names. Без него - декоратор функции (request, *args) -> str.
+    """
+    if template_name is None:
+        def decorator(func):
+            _holes[name] = func
+            return func
+        return decorator
+
+    def render_template(request, *args):
+        return render_to_string(template_name, dict(zip(arg_names, args)), request=request)
+    _holes[name] = render_template
+    return render_template
+
+
+def render_hole(request, name, args):
+    return _holes[name](request, *args)
+
+
+def is_shared_render(request):
+    return getattr(request, '_page_cache_shared', False)
+
+
+def hole_placeholder(name, args):
+    payload = base64.urlsafe_b64encode(json.dumps(list(args)).encode('utf-8')).decode('ascii')
+    return f'<!--hole:{name}:{payload}-->'
+
+
+def fill_holes(html, request):
+    def replace(match):
+        args = json.loads(base64.urlsafe_b64decode(match.group(2).encode('ascii')))
+        return render_hole(request, match.group(1), args)
+    return HOLE_RE.sub(replace, html)
+
+
+# --- Поколения групп страниц ---
+
+def _generation_key(group):
+    return f'{PAGE_CACHE_PREFIX}:generation:{group}'
+
+
+def current_generations(groups):
+    keys = [_generation_key(group) for group in groups]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # Метку вытеснили: новое значение делает все старые записи несвежими
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return tuple(values[key] for key in keys)
+
+
+def invalidate(*groups):
+    """Делает несвежими все страницы групп: сразу и ещё раз после коммита.
+
+    Повтор после коммита нужен, чтобы страница, перерисованная параллельным
+    запросом по ещё старым данным, не считалась свежей.
+    """
+    def bump():
+        cache.set_many({_generation_key(group): time.time_ns() for group in groups}, timeout=None)
+    bump()
+    transaction.on_commit(bump)
+
+
+# --- Декоратор представления ---
+
+def _render_shared(view, request, args, kwargs):
+    """Рендер общей версии: анонимный пользователь, метки вместо фрагментов."""
+    user = request.user
+    request.user = AnonymousUser()
+    request._page_cache_shared = True
+    try:
+        with primary_reads():
+            return view(request, *args, **kwargs)
+    finally:
+        request.user = user
+        request._page_cache_shared = False
+
+
+def cached_page(*groups, validators=None):
+    """Кэширует GET-ответ представления как общую страницу с фрагментами.
+
+    validators(request, *args, **kwargs) -> config.conditional.Validators или
+    None: если задан, повторный запрос с актуальным ETag получает 304 ещё
+    до обращения к кэшу страниц.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            page_validators = None
+            # Сообщения показываются один раз: такой ответ нельзя подтверждать 304
+            if validators is not None and not len(get_messages(request)):
+                page_validators = validators(request, *args, **kwargs)
+                cached = not_modified(request, page_validators)
+                if cached:
+                    return cached
+
+            if STICKY_COOKIE in request.COOKIES:
+                # Общая копия может не содержать правку этого клиента
+                CACHE_REQUESTS.inc(cache='page', result='bypass')
+                response = view(request, *args, **kwargs)
+                response['X-Page-Cache'] = 'bypass'
+                return set_validators(response, page_validators)
+
+            key = f'{PAGE_CACHE_PREFIX}:{request.get_full_path()}'
+            lock_key = f'{key}:lock'
+            generations = current_generations(groups)
+            entry = cache.get(key)
+            if entry is None:
+                state = 'miss'
+            elif (
+                entry['generations'] == generations
+                and time.time() - entry['created'] < PAGE_CACHE_FRESH_SECONDS
+            ):
+                state = 'hit'
+            elif cache.add(lock_key, True, timeout=PAGE_CACHE_LOCK_SECONDS):
+                state = 'revalidate'
+            else:
+                # Страницу уже перерисовывает другой запрос - отдаём несвежую копию
+                state = 'stale'
+            CACHE_REQUESTS.inc(cache='page', result=state)
+
+            if state in ('miss', 'revalidate'):
+                try:
+                    response = _render_shared(view, request, args, kwargs)
+                finally:
+                    if state == 'revalidate':
+                        cache.delete(lock_key)
+                if response.status_code != 200 or response.cookies:
+                    # Нестандартный ответ не кэшируем, только заполняем фрагменты
+                    if response.get('Content-Type', '').startswith('text/html'):
+                        response.content = fill_holes(response.content.decode(response.charset), request)
+                    return response
+                entry = {
+                    'html': response.content.decode(response.charset),
+                    'content_type': response['Content-Type'],
+                    'generations': generations,
+                    'created': time.time(),
+                }
+                cache.set(key, entry, timeout=PAGE_CACHE_STALE_SECONDS)
+
+            response = HttpResponse(fill_holes(entry['html'], request), content_type=entry['content_type'])
+            response['X-Page-Cache'] = state
+            return set_validators(response, page_validators)
+        return wrapper
+    return decorator
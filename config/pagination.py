@@ -0,0 +1,148 @@
+"""
+Keyset (cursor) пагинация для списочных API.
+
+Страница выбирается условием по паре (поле сортировки, id), а не OFFSET,
+поэтому глубокие страницы стоят столько же, сколько первая.
+Курсор непрозрачен для клиента: это base64 от JSON с ключом последней
+(или первой) записи страницы и направлением перехода.
+
+Работает и с DRF Request, и с обычным HttpRequest (для шаблонных views
+ссылки берутся из next_link/previous_link).
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = "Некорректный курсор"
+
+    def __init__(self, ordering_field='created_at', page_size=None):
+        # Сортировка всегда от новых к старым: (-ordering_field, -id)
+        self.ordering_field = ordering_field
+        if page_size is not None:
+            self.page_size = page_size
+
+    @staticmethod
+    def get_params(request):
+        return getattr(request, 'query_params', request.GET)
+
+    def get_page_size(self, request):
+        try:
+            size = int(self.get_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = self.get_params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value = payload['v']
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise TypeError(value)
+            return (
+                value,
+                int(payload['id']),
+                bool(payload.get('r', False)),
+            )
+        except (ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.ordering_field)
+        payload = {
+            # Даты - строкой ISO, числа (например, релевантность поиска) - как есть
+            'v': value.isoformat() if isinstance(value, datetime) else value,
+            'id': obj.pk,
+        }
+        if reverse:
+            payload['r'] = True
+        data = json.dumps(payload, separators=(',', ':')).encode('ascii')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        field = self.ordering_field
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            value, pk, reverse = None, None, False
+            queryset = queryset.order_by(f'-{field}', '-id')
+        else:
+            value, pk, reverse = cursor
+            if reverse:
+                # Назад: записи "новее" курсора, читаем их в обратном порядке
+                queryset = queryset.filter(**{f'{field}__gte': value}).filter(
+                    Q(**{f'{field}__gt': value}) | Q(id__gt=pk)
+                ).order_by(field, 'id')
+            else:
+                # Вперёд: записи "старше" курсора. Условие <= по полю сортировки
+                # даёт диапазонный поиск по индексу (field, id).
+                queryset = queryset.filter(**{f'{field}__lte': value}).filter(
+                    Q(**{f'{field}__lt': value}) | Q(id__lt=pk)
+                ).order_by(f'-{field}', '-id')
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows:
+            if reverse:
+                # Пришли назад с более старой страницы - она точно есть
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+                if has_more:
+                    self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+            else:
+                if has_more:
+                    self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+                if cursor is not None:
+                    self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def paginate_page(self, queryset, request):
+        """Вариант для шаблонных views: некорректный курсор даёт Http404."""
+        try:
+            return self.paginate_queryset(queryset, request)
+        except NotFound:
+            raise Http404(self.invalid_cursor_message)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    @property
+    def next_link(self):
+        return self.get_link(self.next_cursor)
+
+    @property
+    def previous_link(self):
+        return self.get_link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
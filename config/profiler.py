@@ -0,0 +1,215 @@
+"""
+Профилирование отдельных запросов по требованию администратора.
+
+Администратор добавляет к запросу заголовок X-Profile: 1 или параметр
+?_profile=1, и, если запрос попал в выборку (PROFILER_SAMPLE_RATE) и
+сейчас не идёт другой профиль, ProfilerMiddleware запускает
+статистический сэмплер: отдельный поток каждые PROFILER_INTERVAL секунд
+снимает стек потока, обрабатывающего запрос (sys._current_frames).
+Код запроса не инструментируется, поэтому накладные расходы малы и не
+зависят от числа вызовов функций.
+
+Результат пишется в PROFILES_DIR тремя файлами с общим именем:
+.collapsed (свёрнутые стеки "f1;f2;f3 N" для flamegraph.pl и аналогов),
+.speedscope.json (открывается в https://www.speedscope.app) и .meta.json
+(представление, путь, длительность - для страницы /admin/profiles/).
+Имя профиля возвращается в заголовке X-Profile-Id. Хранятся последние
+PROFILES_KEEP профилей.
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+PROFILE_ID_RE = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+PROFILE_SUFFIXES = ('.collapsed', '.speedscope.json', '.meta.json')
+# Глубже стек не разворачивается (рекурсия в шаблонах)
+MAX_STACK_DEPTH = 200
+
+# Одновременно снимается не больше одного профиля
+_profile_lock = threading.Lock()
+
+
+def profiles_dir():
+    return Path(getattr(settings, 'PROFILES_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}.{code.co_qualname}', code.co_filename, code.co_firstlineno
+
+
+class Sampler:
+    """Снимает стеки потока thread_id каждые interval секунд из фонового потока."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        # Стек (от корня к листу, кортеж индексов frames) -> число снимков
+        self.stacks = Counter()
+        self.frames = []
+        self._frame_index = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._stack(frame)] += 1
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            key = _frame_name(frame)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append(key)
+            stack.append(index)
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def collapsed(self):
+        """Свёрнутые стеки: строка "корень;...;лист число" на каждый стек."""
+        return ''.join(
+            ';'.join(self.frames[index][0] for index in stack) + f' {count}\n'
+            for stack, count in self.stacks.most_common()
+        )
+
+    def speedscope(self, name):
+        """Профиль в формате speedscope (тип sampled, веса в миллисекундах)."""
+        stacks = list(self.stacks.items())
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'pawshelter',
+            'shared': {'frames': [{'name': name, 'file': file, 'line': line} for name, file, line in self.frames]},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(self.duration * 1000, 3),
+                'samples': [list(stack) for stack, _ in stacks],
+                'weights': [round(count * self.interval * 1000, 3) for _, count in stacks],
+            }],
+        }
+
+
+def can_profile(user):
+    """Вправе ли пользователь снимать профили и смотреть /admin/profiles/."""
+    return user.is_authenticated and (user.role == 'admin' or user.is_superuser)
+
+
+def profile_requested(request):
+    """Просит ли запрос профиль и вправе ли пользователь его снимать."""
+    flagged = request.META.get(PROFILE_HEADER) == '1' or request.GET.get(PROFILE_PARAM) == '1'
+    return flagged and can_profile(request.user)
+
+
+def save_profile(sampler, request, response):
+    match = getattr(request, 'resolver_match', None)
+    now = timezone.now()
+    profile_id = f"{now.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    meta = {
+        'id': profile_id,
+        'view': match.view_name if match else None,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'user': request.user.username,
+        'duration_ms': round(sampler.duration * 1000, 1),
+        'samples': sum(sampler.stacks.values()),
+        'interval_ms': sampler.interval * 1000,
+        'created_at': now.isoformat(),
+    }
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    title = f"{meta['view'] or meta['path']} ({meta['duration_ms']} ms)"
+    (directory / f'{profile_id}.collapsed').write_text(sampler.collapsed(), encoding='utf-8')
+    (directory / f'{profile_id}.speedscope.json').write_text(
+        json.dumps(sampler.speedscope(title), ensure_ascii=False), encoding='utf-8',
+    )
+    # Метаданные пишутся последними: профиль появляется в списке уже целиком
+    (directory / f'{profile_id}.meta.json').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+    _prune(directory)
+    return profile_id
+
+
+def _prune(directory):
+    keep = getattr(settings, 'PROFILES_KEEP', 200)
+    metas = sorted(directory.glob('*.meta.json'), reverse=True)
+    for meta in metas[keep:]:
+        profile_id = meta.name[:-len('.meta.json')]
+        for suffix in PROFILE_SUFFIXES:
+            try:
+                os.remove(directory / f'{profile_id}{suffix}')
+            except FileNotFoundError:
+                pass
+
+
+def recent_profiles(limit=100):
+    """Метаданные последних профилей, новые первыми."""
+    directory = profiles_dir()
+    if not directory.exists():
+        return []
+    profiles = []
+    for path in sorted(directory.glob('*.meta.json'), reverse=True)[:limit]:
+        try:
+            profiles.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id, suffix):
+    """Путь к файлу профиля или None, если имя или тип файла не подходят."""
+    if not PROFILE_ID_RE.match(profile_id) or suffix not in PROFILE_SUFFIXES:
+        return None
+    path = profiles_dir() / f'{profile_id}{suffix}'
+    return path if path.exists() else None
+
+
+class ProfilerMiddleware:
+    """Снимает профиль запроса администратора с флагом X-Profile / ?_profile=1."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request):
+            return self.get_response(request)
+        if random.random() >= getattr(settings, 'PROFILER_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+        if not _profile_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            with Sampler(threading.get_ident(), getattr(settings, 'PROFILER_INTERVAL', 0.005)) as sampler:
+                response = self.get_response(request)
+            response['X-Profile-Id'] = save_profile(sampler, request, response)
+        finally:
+            _profile_lock.release()
+        return response
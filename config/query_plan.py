@@ -0,0 +1,94 @@
+"""
+Автоматический select_related/prefetch_related по полям сериализатора.
+
+План строится из dotted source полей (user.username, adoption.animal.name)
+и вложенных сериализаторов: прямые FK/OneToOne попадают в select_related,
+обратные связи, M2M и связи с моделями из другой БД - в prefetch_related
+(вместе со всем, что читается за ними). Поэтому новое поле сериализатора
+не добавляет N+1 запросов.
+Поля SerializerMethodField не анализируются - связи, которые читает такой
+метод, нужно подгружать в queryset вручную.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+from .routers import same_database
+
+
+def _reads_related_object(field):
+    """Нужен ли полю сам связанный объект, а не только его *_id."""
+    if isinstance(field, (serializers.BaseSerializer, ManyRelatedField)):
+        return True
+    return isinstance(field, RelatedField) and not isinstance(field, PrimaryKeyRelatedField)
+
+
+def _walk(model, attrs, prefix, prefetching, select, prefetch):
+    """Проходит цепочку атрибутов по связям модели и раскладывает пути по select/prefetch."""
+    path = prefix
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path = f'{path}__{attr}' if path else attr
+        # Связь в другую БД (config/routers.py) не соединить JOIN-ом
+        if field.many_to_many or field.one_to_many or not same_database(model, field.related_model):
+            prefetching = True
+        (prefetch if prefetching else select).add(path)
+        model = field.related_model
+    return model, path, prefetching
+
+
+def _plan(serializer, model, prefix, prefetching, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        attrs = field.source_attrs
+        # Последний атрибут - сама связь: обходим её, только если нужен объект
+        traversed = attrs if _reads_related_object(field) else attrs[:-1]
+        related_model, path, related_prefetching = _walk(
+            model, traversed, prefix, prefetching, select, prefetch
+        )
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(child, serializers.Serializer) and path != prefix:
+            _plan(child, related_model, path, related_prefetching, select, prefetch)
+
+
+@lru_cache(maxsize=None)
+def plan_for(serializer_class, model):
+    """(select_related, prefetch_related) для сериализатора; кэшируется на класс."""
+    select, prefetch = set(), set()
+    _plan(serializer_class(), model, '', False, select, prefetch)
+    # Родительские пути prefetch подтянутся сами вместе с дочерними
+    prefetch = {
+        path for path in prefetch
+        if not any(other.startswith(f'{path}__') for other in prefetch)
+    }
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+
+def optimize_queryset(queryset, serializer_class):
+    select, prefetch = plan_for(serializer_class, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    # Не дублируем уже заданные Prefetch (например, из Animal.objects.with_cards())
+    existing = {
+        getattr(lookup, 'prefetch_to', lookup) for lookup in queryset._prefetch_related_lookups
+    }
+    missing = [path for path in prefetch if path not in existing]
+    if missing:
+        queryset = queryset.prefetch_related(*missing)
+    return queryset
+
+
+class QueryPlanMixin:
+    """Примесь для APIView: подгружает связи, которые читает serializer_class."""
+    serializer_class = None
+
+    def optimize_queryset(self, queryset, serializer_class=None):
+        return optimize_queryset(queryset, serializer_class or self.serializer_class)
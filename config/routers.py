@@ -0,0 +1,112 @@
+"""
+Маршрутизация запросов по базам данных.
+
+DATABASE_APPS выносит приложение в отдельную БД (например, activities -
+в свой файл SQLite, чтобы запись ленты не ждала блокировку записи
+заявок). Связи с пользователями при этом не проходят через JOIN: такие FK
+объявлены без ограничения в БД, а связанные объекты подгружаются
+отдельным запросом (same_database, config/query_plan.py).
+
+DATABASE_REPLICAS задаёт реплику основной БД - копию, которую обновляет
+команда refresh_replica. На реплику уходит только чтение моделей из
+REPLICA_READ_APPS и только в представлениях, помеченных replica_reads
+(каталог, лента, списочные API), - остальное читается из основной БД.
+Пользователи и сессии всегда читаются из основной: иначе только что
+вошедший пользователь выглядел бы вышедшим, пока реплика не обновится.
+
+Реплика отстаёт, поэтому после запроса, изменяющего данные, клиент
+получает cookie, и следующие REPLICA_STICKY_SECONDS секунд его чтения
+идут в основную БД: пользователь сразу видит свою правку.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, router
+
+STICKY_COOKIE = 'db_primary'
+REPLICA_READ_APPS = {'animals', 'activities', 'adoptions', 'sync'}
+
+# Разрешено ли текущему запросу читать с реплики
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def database_for_app(app_label):
+    return getattr(settings, 'DATABASE_APPS', {}).get(app_label, 'default')
+
+
+def same_database(model, other):
+    """Лежат ли таблицы двух моделей в одной БД (можно ли их соединять JOIN)."""
+    return router.db_for_write(model) == router.db_for_write(other)
+
+
+def replica_reads(view):
+    """Помечает представление (функцию или класс), чьё чтение можно отдать реплике."""
+    view.replica_reads = True
+    return view
+
+
+@contextmanager
+def primary_reads():
+    """Внутри блока чтение идёт из основной БД даже в представлении replica_reads."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ShelterRouter:
+
+    def db_for_read(self, model, **hints):
+        primary = database_for_app(model._meta.app_label)
+        replica = getattr(settings, 'DATABASE_REPLICAS', {}).get(primary)
+        if (
+            replica
+            and _replica_reads.get()
+            and model._meta.app_label in REPLICA_READ_APPS
+            # Внутри транзакции читаем то, что только что записали
+            and not connections[primary].in_atomic_block
+        ):
+            return replica
+        return primary
+
+    def db_for_write(self, model, **hints):
+        return database_for_app(model._meta.app_label)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Связи между БД допустимы: FK в другую БД объявлены без ограничения
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', {}).values():
+            # Реплика - копия основной БД, схему она получает вместе с данными
+            return False
+        return database_for_app(app_label) == db
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплики в помеченных представлениях и закрепляет
+    клиента за основной БД после изменяющих запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, '_replica_reads_token', None)
+            if token is not None:
+                _replica_reads.reset(token)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and getattr(settings, 'DATABASE_REPLICAS', None):
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        marked = getattr(view_func, 'replica_reads', False) or getattr(view_class, 'replica_reads', False)
+        if marked and request.method in ('GET', 'HEAD') and STICKY_COOKIE not in request.COOKIES:
+            request._replica_reads_token = _replica_reads.set(True)
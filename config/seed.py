@@ -0,0 +1,260 @@
+"""
+Генерация больших объёмов правдоподобных данных для нагрузочных тестов.
+
+Записи вставляются bulk_create пачками, минуя save() и сигналы, поэтому
+всё, что обычно делают они, выполняется здесь пачкой: slug (allocate_slugs),
+обложка животного, поисковый индекс. Даты создания разнесены на несколько
+лет назад (auto_now/auto_now_add на время вставки отключаются), распределения
+видов, возрастов, статусов и ролей приближены к реальному приюту: это
+важно для планов запросов и keyset-пагинации. Пароль у всех созданных
+пользователей одинаковый (SEED_PASSWORD) - им входит нагрузочный тест.
+Фотографии ссылаются на небольшой набор сгенерированных файлов media/seed/,
+производные для них строятся сразу - иначе первый же показ каталога
+поставил бы в очередь задачу на каждое фото.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from PIL import Image
+
+from activities.models import Activity
+from adoptions.models import Adoption, Return
+from animals import search
+from animals.models import Animal, AnimalPhoto
+from users.models import CustomUser
+from . import page_cache
+from .images import build_derivatives
+from .slugs import allocate_slugs
+
+SEED_PASSWORD = 'shelter-load-test'
+SEED_USERNAME_PREFIX = 'seed'
+SEED_BATCH_SIZE = 5000
+# Сколько разных файлов фотографий создать (на них ссылаются все фото)
+SEED_PHOTO_FILES = 24
+# За сколько дней назад разносить даты создания
+SEED_HISTORY_DAYS = 3 * 365
+
+DEFAULT_VOLUMES = {
+    'users': 50_000,
+    'animals': 100_000,
+    'adoptions': 1_000_000,
+    'activities': 200_000,
+}
+
+ROLES = {'adopter': 90, 'volunteer': 9, 'admin': 1}
+SPECIES = {
+    'Собака': (45, ['Дворняга', 'Лабрадор', 'Овчарка', 'Хаски', 'Такса', 'Спаниель', 'Бигль', 'Корги']),
+    'Кошка': (40, ['Беспородная', 'Британская', 'Сиамская', 'Мейн-кун', 'Сфинкс', 'Шотландская']),
+    'Кролик': (6, ['Декоративный', 'Карликовый', 'Рекс']),
+    'Попугай': (5, ['Волнистый', 'Корелла', 'Неразлучник']),
+    'Хомяк': (4, ['Джунгарский', 'Сирийский']),
+}
+NAMES = [
+    'Барсик', 'Мурка', 'Шарик', 'Рекс', 'Бобик', 'Пушок', 'Снежок', 'Рыжик', 'Дымка', 'Лаки',
+    'Граф', 'Булка', 'Тиша', 'Марс', 'Ночка', 'Кузя', 'Соня', 'Бим', 'Джек', 'Луна',
+    'Маркиз', 'Персик', 'Тоша', 'Жужа', 'Чарли', 'Боня', 'Зефир', 'Ириска', 'Лео', 'Симба',
+]
+HEALTH = {'Здоров': 70, 'Привит, стерилизован': 15, 'На лечении': 8, 'Требует особого ухода': 5, 'Хроническое заболевание': 2}
+# Возраст в годах: молодых животных в приюте больше
+AGE_WEIGHTS = [18, 16, 14, 11, 9, 8, 6, 5, 4, 3, 2, 2, 1, 1]
+PHOTOS_PER_ANIMAL = {0: 10, 1: 30, 2: 35, 3: 15, 4: 10}
+ADOPTED_SHARE = 0.35
+ACTIVITY_TYPES = {'feeding': 30, 'cleaning': 20, 'medical': 15, 'news': 15, 'event': 10, 'advice': 10}
+REJECTION_REASONS = [
+    'Неподходящие условия содержания',
+    'Животное было усыновлено другим пользователем',
+    'Заявитель не вышел на связь',
+    'Нет опыта с животными этого вида',
+]
+RETURN_REASONS = ['Аллергия', 'Переезд', 'Не сошлись характерами', 'Изменились жизненные обстоятельства']
+
+
+def _choice(rng, weighted):
+    return rng.choices(list(weighted), weights=[
+        value[0] if isinstance(value, tuple) else value for value in weighted.values()
+    ])[0]
+
+
+def _past(rng, days=SEED_HISTORY_DAYS, after=None):
+    """Случайный момент за последние days дней (но не раньше after)."""
+    now = timezone.now()
+    start = after or now - timedelta(days=days)
+    return start + (now - start) * rng.random()
+
+
+@contextmanager
+def explicit_timestamps(*model_classes):
+    """Отключает auto_now/auto_now_add: даты создания берутся из объектов."""
+    saved = []
+    for model in model_classes:
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.DateTimeField) and (field.auto_now or field.auto_now_add):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def photo_files(count=SEED_PHOTO_FILES):
+    """Имена файлов-заготовок в хранилище (создаются при первом запуске)."""
+    names = []
+    for index in range(count):
+        name = f'seed/photo-{index:02d}.jpg'
+        if not default_storage.exists(name):
+            hue = index * 360 // count
+            image = Image.new('RGB', (1200, 900), f'hsl({hue}, 45%, 55%)')
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            build_derivatives(default_storage, name)
+        names.append(name)
+    return names
+
+
+def seed_users(rng, count, batch_size, report):
+    password = make_password(SEED_PASSWORD)
+    start = CustomUser.objects.count()
+    for offset, size in _chunks(count, batch_size):
+        usernames = [f'{SEED_USERNAME_PREFIX}_{start + offset + i}' for i in range(size)]
+        slugs = allocate_slugs(CustomUser, usernames, 'user')
+        users = []
+        for index, (username, slug) in enumerate(zip(usernames, slugs), start=offset):
+            # Хотя бы один администратор и волонтёр есть даже в маленьком наборе
+            role = ('admin', 'volunteer')[index] if index < 2 else _choice(rng, ROLES)
+            joined = _past(rng)
+            users.append(CustomUser(
+                username=username, slug=slug, password=password, role=role,
+                email=f'{username}@example.com', date_joined=joined, created_at=joined,
+                has_experience=rng.random() < 0.4, has_other_pets=rng.random() < 0.3,
+            ))
+        with explicit_timestamps(CustomUser):
+            CustomUser.objects.bulk_create(users)
+        report('users', offset + size, count)
+
+
+def seed_animals(rng, count, batch_size, report):
+    files = photo_files()
+    for offset, size in _chunks(count, batch_size):
+        names = [rng.choice(NAMES) for _ in range(size)]
+        slugs = allocate_slugs(Animal, names, 'animal')
+        animals = []
+        for name, slug in zip(names, slugs):
+            species = _choice(rng, SPECIES)
+            created = _past(rng)
+            animals.append(Animal(
+                name=name, slug=slug, species=species, breed=rng.choice(SPECIES[species][1]),
+                age_years=rng.choices(range(len(AGE_WEIGHTS)), weights=AGE_WEIGHTS)[0],
+                age_months=rng.randrange(12), health_status=_choice(rng, HEALTH),
+                description=f'{name} - {species.lower()} с добрым характером, ждёт новую семью.',
+                status='adopted' if rng.random() < ADOPTED_SHARE else 'in_shelter',
+                created_at=created, updated_at=_past(rng, after=created),
+            ))
+        with transaction.atomic(), explicit_timestamps(Animal, AnimalPhoto):
+            Animal.objects.bulk_create(animals)
+            photos = [
+                AnimalPhoto(animal=animal, photo_url=name, derivatives_name=name,
+                            uploaded_at=animal.created_at, updated_at=animal.created_at)
+                for animal in animals
+                for name in rng.choices(files, k=_choice(rng, PHOTOS_PER_ANIMAL))
+            ]
+            AnimalPhoto.objects.bulk_create(photos)
+            first_photo = AnimalPhoto.objects.filter(animal=OuterRef('pk')).order_by('id').values('id')[:1]
+            Animal.objects.filter(pk__in=[animal.pk for animal in animals]).update(cover_photo=Subquery(first_photo))
+            search.index_animals(animals)
+        report('animals', offset + size, count)
+
+
+def seed_adoptions(rng, count, batch_size, report):
+    """Заявки усыновителей; у каждого усыновлённого животного ровно одна одобренная."""
+    adopters = list(CustomUser.objects.filter(role='adopter').values_list('pk', flat=True))
+    staff = list(CustomUser.objects.filter(role='admin').values_list('pk', flat=True))
+    animals = list(Animal.objects.values_list('pk', 'status', 'created_at'))
+    if not adopters or not animals:
+        return
+    taken = set(Adoption.objects.values_list('user_id', 'animal_id'))
+    has_approved = set(Adoption.objects.filter(status='approved').values_list('animal_id', flat=True))
+    count = min(count, len(adopters) * len(animals) - len(taken))
+
+    def pairs():
+        # Сначала одобренные заявки усыновлённых животных, затем случайные
+        for pk, status, created in animals:
+            if status == 'adopted' and pk not in has_approved:
+                yield rng.choice(adopters), pk, status, created, 'approved'
+        while True:
+            pk, status, created = rng.choice(animals)
+            if status == 'adopted':
+                state = rng.choices(['rejected', 'returned'], weights=[90, 10])[0]
+            else:
+                state = rng.choices(['pending', 'rejected', 'returned'], weights=[40, 52, 8])[0]
+            yield rng.choice(adopters), pk, status, created, state
+
+    generator = pairs()
+    for offset, size in _chunks(count, batch_size):
+        adoptions = []
+        while len(adoptions) < size:
+            user_id, animal_id, _, created, state = next(generator)
+            if (user_id, animal_id) in taken:
+                continue
+            taken.add((user_id, animal_id))
+            submitted = _past(rng, after=created)
+            adoptions.append(Adoption(
+                user_id=user_id, animal_id=animal_id, status=state,
+                rejection_reason=rng.choice(REJECTION_REASONS) if state == 'rejected' else '',
+                submitted_at=submitted, updated_at=_past(rng, after=submitted),
+            ))
+        with transaction.atomic(), explicit_timestamps(Adoption, Return):
+            Adoption.objects.bulk_create(adoptions)
+            Return.objects.bulk_create([
+                Return(adoption=adoption, reason=rng.choice(RETURN_REASONS),
+                       processed_by_id=rng.choice(staff) if staff else None, returned_at=adoption.updated_at)
+                for adoption in adoptions if adoption.status == 'returned'
+            ])
+        report('adoptions', offset + size, count)
+
+
+def seed_activities(rng, count, batch_size, report):
+    authors = list(CustomUser.objects.filter(role__in=['admin', 'volunteer']).values_list('pk', flat=True))
+    if not authors:
+        return
+    titles = dict(Activity.ACTIVITY_TYPES)
+    for offset, size in _chunks(count, batch_size):
+        activities = []
+        for _ in range(size):
+            activity_type = _choice(rng, ACTIVITY_TYPES)
+            created = _past(rng)
+            activities.append(Activity(
+                title=f'{titles[activity_type]}: {rng.choice(NAMES)}', activity_type=activity_type,
+                description='Запись о жизни приюта. ' * rng.randint(1, 6),
+                created_by_id=rng.choice(authors), created_at=created, updated_at=created,
+            ))
+        with explicit_timestamps(Activity):
+            Activity.objects.bulk_create(activities)
+        report('activities', offset + size, count)
+
+
+def seed_shelter(volumes=None, batch_size=SEED_BATCH_SIZE, seed=None, report=None):
+    """Заполняет БД: volumes - {'users', 'animals', 'adoptions', 'activities'} -> сколько добавить."""
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    rng = random.Random(seed)
+    report = report or (lambda kind, done, total: None)
+    seed_users(rng, volumes['users'], batch_size, report)
+    seed_animals(rng, volumes['animals'], batch_size, report)
+    seed_adoptions(rng, volumes['adoptions'], batch_size, report)
+    seed_activities(rng, volumes['activities'], batch_size, report)
+    page_cache.invalidate('animals', 'activities')
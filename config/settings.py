@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 
@@ -48,25 +49,37 @@ INSTALLED_APPS = [
     'animals',
     'adoptions',
     'activities',
+    'sync',
+    'jobs',
+    'config',
 
     'rest_framework',
 ]
 
 MIDDLEWARE = [
+    # Первым: учитывает и запросы сессий/пользователя из других middleware
+    "config.instrumentation.QueryInstrumentationMiddleware",
+    # Сразу за учётом запросов: берёт из него время SQL (config/metrics.py)
+    "config.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Сразу после аутентификации: нужен request.user
+    "config.profiler.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.routers.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates с учётом времени рендеринга в метриках
+        "BACKEND": "config.metrics.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -92,6 +105,91 @@ DATABASES = {
     }
 }
 
+# Кэш общий для всех процессов сервера: в нём поколения кэша страниц
+# (config/page_cache.py), кэш карточек и отметки очереди миниатюр. Кэш в
+# памяти процесса (LocMemCache) для сервера с несколькими воркерами не
+# годится: правка в одном воркере не сделает несвежими страницы остальных.
+# По умолчанию - файлы в PAWSHELTER_CACHE_DIR; с PAWSHELTER_REDIS_URL - Redis
+# (пакет redis), у него add() атомарен и блокировки перерисовки точнее
+if os.environ.get("PAWSHELTER_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["PAWSHELTER_REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("PAWSHELTER_CACHE_DIR") or BASE_DIR / "cache",
+            # Карточки кэшируются по одной на животное: порог вытеснения выше стандартных 300
+            "OPTIONS": {"MAX_ENTRIES": 50000},
+        }
+    }
+
+# Профиль БД: development (по умолчанию) или production - для сервера с
+# параллельными запросами (PAWSHELTER_DB_PROFILE=production), см. config/sqlite.py
+DATABASE_PROFILE = os.environ.get("PAWSHELTER_DB_PROFILE", "development")
+
+# PRAGMA, которые выставляются каждому новому соединению SQLite
+SQLITE_PRAGMAS = {}
+# Выполнять записи (serialized_write) через очередь одного потока-писателя
+SQLITE_WRITE_QUEUE = False
+
+if DATABASE_PROFILE == "production":
+    DATABASES["default"].update({
+        # Постоянные соединения: PRAGMA и кэш страниц не теряются между запросами
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Сколько секунд ждать блокировку записи, прежде чем "database is locked"
+            "timeout": 20,
+            # Транзакция сразу берёт блокировку записи: повышение блокировки
+            # чтения до записи посреди транзакции падает без ожидания
+            "transaction_mode": "IMMEDIATE",
+        },
+    })
+    SQLITE_PRAGMAS = {
+        # Читатели не ждут писателя, запись не ждёт читателей
+        "journal_mode": "WAL",
+        "busy_timeout": 20000,
+        # В WAL безопасно: при сбое питания теряется лишь последний коммит
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        # Отрицательное значение - размер в КиБ (64 МиБ на соединение)
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        # Ограничение ANALYZE внутри PRAGMA optimize, чтобы он был быстрым
+        "analysis_limit": 400,
+    }
+    SQLITE_WRITE_QUEUE = True
+
+# Маршрутизация по БД (config/routers.py)
+DATABASE_ROUTERS = ["config.routers.ShelterRouter"]
+# Приложение -> псевдоним БД (по умолчанию все в default)
+DATABASE_APPS = {}
+# Основная БД -> её реплика для чтения
+DATABASE_REPLICAS = {}
+# Сколько секунд после изменяющего запроса клиент читает из основной БД;
+# не меньше интервала запуска refresh_replica
+REPLICA_STICKY_SECONDS = 60
+
+# Активности в отдельном файле SQLite: PAWSHELTER_ACTIVITIES_DB=/путь/activities.sqlite3
+if os.environ.get("PAWSHELTER_ACTIVITIES_DB"):
+    DATABASES["activities"] = {**DATABASES["default"], "NAME": os.environ["PAWSHELTER_ACTIVITIES_DB"]}
+    DATABASE_APPS["activities"] = "activities"
+
+# Реплика основной БД: PAWSHELTER_REPLICA_DB=/путь/replica.sqlite3, обновляется refresh_replica
+if os.environ.get("PAWSHELTER_REPLICA_DB"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["PAWSHELTER_REPLICA_DB"],
+        # В тестах реплика - та же БД, что и основная
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS["default"] = "replica"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,3 +237,32 @@ MEDIA_ROOT = BASE_DIR / "media"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Модули с обработчиками фоновых задач (jobs.queue.register), см. manage.py runworker
+JOB_MODULES = [
+    "config.images",
+    "config.export",
+]
+
+# Профилирование запросов администратора по X-Profile: 1 / ?_profile=1 (config/profiler.py)
+PROFILES_DIR = BASE_DIR / "profiles"
+# Сколько последних профилей хранить
+PROFILES_KEEP = 200
+# Доля запросов с флагом, для которых профиль действительно снимается
+PROFILER_SAMPLE_RATE = 1.0
+# Период снятия стека, секунд
+PROFILER_INTERVAL = 0.005
+
+# Общий каталог файлов метрик всех процессов сервера для /metrics (config/metrics.py);
+# очищать при запуске сервера. Без него каждый процесс считает только себя
+METRICS_DIR = os.environ.get("PAWSHELTER_METRICS_DIR") or None
+# Кому отдавать /metrics: запросу с "Authorization: Bearer <METRICS_TOKEN>" или адресам
+# из списка (по умолчанию пуст). Проверяется REMOTE_ADDR: за прокси на том же хосте
+# это 127.0.0.1 для всех запросов, поэтому адреса прокси в список не вносить
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.environ.get("PAWSHELTER_METRICS_ALLOWED_IPS", "").split(",") if ip.strip()
+]
+METRICS_TOKEN = os.environ.get("PAWSHELTER_METRICS_TOKEN", "")
+
+# Тесты работают со своим кэшем в памяти и пишут метрики во временный каталог (config/test_runner.py)
+TEST_RUNNER = "config.test_runner.ShelterTestRunner"
@@ -0,0 +1,125 @@
+"""
+Выдача уникальных slug для Animal и CustomUser.
+
+Кириллица транслитерируется (slugify её просто выбрасывает). Следующий
+свободный суффикс находится одним запросом по диапазону уникального
+индекса slug: base, base-1, base-2, ... -> base-(max+1), без перебора
+по одному запросу на коллизию. Заранее свободность не проверяется:
+если параллельная вставка заняла тот же slug, уникальный индекс даёт
+IntegrityError и slug выделяется заново. Для массового импорта
+allocate_slugs выдаёт slug целой пачке записей одним запросом.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, IntegerField, Max, Q
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+# Место под "-<число>" в пределах max_length поля
+SUFFIX_RESERVE = 11
+MAX_ATTEMPTS = 5
+# Сколько различных base проверять одним запросом (глубина выражения SQLite ограничена)
+SLUG_BASES_PER_QUERY = 100
+
+
+def transliterate(text):
+    return ''.join(TRANSLIT.get(char, char) for char in text.lower())
+
+
+def make_base_slug(text, fallback, max_length):
+    """Slug без суффикса; если из текста ничего не осталось - fallback."""
+    base = slugify(transliterate(text or '')) or fallback
+    return base[:max_length - SUFFIX_RESERVE].strip('-') or fallback
+
+
+def _slug_aggregates(field, base, alias=''):
+    """Условие и агрегаты (занят ли base, наибольший суффикс) для одного base."""
+    prefix = f'{base}-'
+    # Все base-<цифры...> лежат в диапазоне ['base-0', 'base-:'), ':' идёт сразу за '9'
+    suffixed = Q(**{f'{field}__gte': f'{prefix}0', f'{field}__lt': f'{prefix}:'})
+    aggregates = {
+        f'base_taken{alias}': Count('pk', filter=Q(**{field: base})),
+        f'last{alias}': Max(Cast(Substr(field, len(prefix) + 1), IntegerField()), filter=suffixed),
+    }
+    return Q(**{field: base}) | suffixed, aggregates
+
+
+def next_free_slug(model, base, field='slug'):
+    """Первый свободный slug для base одним запросом по индексу поля."""
+    condition, aggregates = _slug_aggregates(field, base)
+    result = model._default_manager.filter(condition).aggregate(**aggregates)
+    if not result['base_taken']:
+        return base
+    return f"{base}-{(result['last'] or 0) + 1}"
+
+
+def allocate_slugs(model, sources, fallback, field='slug'):
+    """Уникальные slug для пачки новых записей одним запросом
+    (на каждые SLUG_BASES_PER_QUERY различных base).
+
+    sources - тексты, из которых строятся slug (по одному на запись).
+    Для каждого различного base занятость и наибольший суффикс считаются
+    условными агрегатами одного запроса, дальше суффиксы раздаются подряд,
+    пропуская slug, уже выданные в этой же пачке.
+    Как и в save_with_slug, от параллельной вставки защищает уникальный
+    индекс: при IntegrityError пачку нужно разместить заново.
+    """
+    max_length = model._meta.get_field(field).max_length
+    bases = [make_base_slug(source, fallback, max_length) for source in sources]
+    distinct = list(dict.fromkeys(bases))
+    if not distinct:
+        return []
+
+    state = {}
+    for start in range(0, len(distinct), SLUG_BASES_PER_QUERY):
+        group = distinct[start:start + SLUG_BASES_PER_QUERY]
+        condition, aggregates = Q(), {}
+        for index, base in enumerate(group):
+            base_condition, base_aggregates = _slug_aggregates(field, base, alias=f'_{index}')
+            condition |= base_condition
+            aggregates.update(base_aggregates)
+        result = model._default_manager.filter(condition).aggregate(**aggregates)
+        for index, base in enumerate(group):
+            state[base] = [bool(result[f'base_taken_{index}']), result[f'last_{index}'] or 0]
+    # Все выданные в пачке slug: суффикс одного base может совпасть с другим
+    # base ("Барсик" -> barsik-1 и "Барсик 1" -> barsik-1)
+    issued = set()
+    slugs = []
+    for base in bases:
+        taken, last = state[base]
+        slug = base
+        if taken or slug in issued:
+            while slug in issued or slug == base:
+                last += 1
+                slug = f'{base}-{last}'
+            state[base][1] = last
+        state[base][0] = True
+        issued.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def save_with_slug(instance, source, fallback, save):
+    """Вызывает save(), при необходимости выдав instance уникальный slug."""
+    if instance.slug:
+        return save()
+    model = type(instance)
+    field = model._meta.get_field('slug')
+    base = make_base_slug(source, fallback, field.max_length)
+    for attempt in range(MAX_ATTEMPTS):
+        instance.slug = next_free_slug(model, base)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            # Повторяем, только если конфликт именно по slug
+            slug_taken = model._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not slug_taken or attempt == MAX_ATTEMPTS - 1:
+                instance.slug = ''
+                raise
@@ -0,0 +1,157 @@
+"""
+Рабочий профиль SQLite: PRAGMA соединений и очередь записи.
+
+Профиль включается переменной окружения PAWSHELTER_DB_PROFILE=production
+(см. settings.py): постоянные соединения, ожидание блокировки вместо
+ошибки "database is locked", транзакции BEGIN IMMEDIATE и PRAGMA из
+SQLITE_PRAGMAS, которые выставляются каждому новому соединению. WAL
+позволяет читателям не ждать писателя, а periodic PRAGMA optimize
+обновляет статистику планировщика на долгоживущих соединениях.
+
+SQLite допускает одного писателя. Вместо того чтобы потоки процесса
+одновременно боролись за блокировку БД, записи, обёрнутые в
+serialized_write, выполняет один поток-писатель: они выстраиваются в
+очередь, а накопившиеся за время предыдущей транзакции объединяются в
+одну транзакцию (каждая - в своей точке сохранения, ошибка одной не
+откатывает остальные) с одним fsync. Вызывающий поток ждёт результата,
+который отдаётся только после коммита. Между процессами запись
+по-прежнему разделяет сама SQLite (busy_timeout + BEGIN IMMEDIATE).
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Как часто выполнять PRAGMA optimize на одном соединении
+OPTIMIZE_INTERVAL_SECONDS = 60 * 60
+# Сколько записей из очереди объединять в одну транзакцию
+WRITE_BATCH_SIZE = 50
+# Повторы транзакции, если БД занята другим процессом дольше busy_timeout
+WRITE_RETRIES = 5
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    connection.last_optimize = time.monotonic()
+
+
+@receiver(request_finished)
+def optimize_connections(sender, **kwargs):
+    """PRAGMA optimize на долгоживущих (CONN_MAX_AGE) соединениях раз в час."""
+    if not getattr(settings, 'SQLITE_PRAGMAS', None):
+        return
+    for conn in connections.all(initialized_only=True):
+        if conn.vendor != 'sqlite' or conn.connection is None or conn.in_atomic_block:
+            continue
+        if time.monotonic() - getattr(conn, 'last_optimize', 0) > OPTIMIZE_INTERVAL_SECONDS:
+            with conn.cursor() as cursor:
+                cursor.execute('PRAGMA optimize')
+            conn.last_optimize = time.monotonic()
+
+
+class WriteQueue:
+    """Очередь записей, которые выполняет один поток-писатель (см. описание модуля)."""
+
+    def __init__(self, batch_size=WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def in_writer(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        self._ensure_thread()
+        return future
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._run_batch(batch)
+            except Exception as exc:
+                logger.exception("Ошибка пакета записи")
+                for future, *_ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+            finally:
+                close_old_connections()
+
+    def _run_batch(self, batch):
+        self.batches += 1
+        for attempt in range(WRITE_RETRIES):
+            results = []
+            started = False
+            try:
+                with transaction.atomic():
+                    started = True
+                    for future, func, args, kwargs in batch:
+                        try:
+                            with transaction.atomic():
+                                results.append((future, True, func(*args, **kwargs)))
+                        except Exception as exc:
+                            results.append((future, False, exc))
+            except OperationalError:
+                # БД занята другим процессом дольше busy_timeout: транзакция не начиналась
+                if started or attempt == WRITE_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+                continue
+            break
+        # Результаты - только после коммита: вызывающий сразу видит свои изменения
+        for future, ok, value in results:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+write_queue = WriteQueue()
+
+
+def serialized_write(func):
+    """Выполняет функцию записи через очередь писателя (если она включена).
+
+    Внутри уже открытой транзакции (или в самом писателе) функция
+    выполняется сразу: её изменения должны остаться частью этой транзакции.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if (
+            not getattr(settings, 'SQLITE_WRITE_QUEUE', False)
+            or connection.in_atomic_block
+            or write_queue.in_writer()
+        ):
+            return func(*args, **kwargs)
+        return write_queue.submit(func, *args, **kwargs).result()
+    return wrapper
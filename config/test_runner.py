@@ -0,0 +1,25 @@
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ShelterTestRunner(DiscoverRunner):
+    """Тесты пользуются своим кэшем в памяти процесса, а метрики пишут во
+    временный каталог прогона: cache.clear() и счётчики тестов не задевают
+    кэш и METRICS_DIR работающего сервера."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.mkdtemp(prefix='pawshelter-test-metrics-')
+        self.metrics_override = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            METRICS_DIR=self.metrics_dir,
+        )
+        self.metrics_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.metrics_override.disable()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
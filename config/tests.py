@@ -0,0 +1,555 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from importlib import import_module
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, models, router
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from activities.models import Activity
+from activities.serializers import ActivitySerializer
+from animals.models import Animal, AnimalPhoto
+from adoptions.models import Adoption, Return
+from adoptions import services
+from jobs.models import Job
+from . import benchmarks
+from . import metrics
+from .loadtest import compare_reports, percentile, summarize
+from .instrumentation import QueryInstrumentationMiddleware, query_budget, view_budget
+from .query_plan import plan_for
+from .seed import seed_shelter
+from .page_cache import cached_page
+from .profiler import Sampler
+from .routers import STICKY_COOKIE, ReplicaRoutingMiddleware, replica_reads
+from .sqlite import configure_connection, serialized_write, write_queue
+
+User = get_user_model()
+
+
+class SQLiteProfileTests(TestCase):
+    """PRAGMA рабочего профиля выставляются новому соединению."""
+
+    @override_settings(SQLITE_PRAGMAS={"cache_size": -32000, "busy_timeout": 7000})
+    def test_pragmas_applied_to_connection(self):
+        configure_connection(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -32000)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 7000)
+
+    @override_settings(SQLITE_WRITE_QUEUE=True)
+    def test_write_inside_transaction_runs_inline(self):
+        # Тест уже в транзакции: запись должна остаться в ней, а не уйти писателю
+        batches = write_queue.batches
+        thread = serialized_write(lambda: threading.current_thread())()
+        self.assertIs(thread, threading.current_thread())
+        self.assertEqual(write_queue.batches, batches)
+
+
+@override_settings(SQLITE_WRITE_QUEUE=True)
+class WriteQueueTests(TransactionTestCase):
+    """Параллельные записи выстраиваются в очередь и объединяются в транзакции."""
+
+    def setUp(self):
+        self.animal = Animal.objects.create(name="Шарик", species="dog", health_status="healthy")
+        self.adoptions = [
+            Adoption.objects.create(
+                user=User.objects.create(username=f"user{i}"), animal=self.animal
+            )
+            for i in range(8)
+        ]
+
+    def run_in_threads(self, func, items):
+        results, barrier = [], threading.Barrier(len(items))
+
+        def target(item):
+            barrier.wait()
+            try:
+                results.append(func(item))
+            except Exception as exc:
+                results.append(exc)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=target, args=(item,)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_approvals_queue_instead_of_failing(self):
+        results = self.run_in_threads(services.approve, self.adoptions)
+
+        approved = [result for result in results if isinstance(result, Adoption)]
+        errors = [result for result in results if isinstance(result, Exception)]
+        self.assertEqual(len(approved), 1)
+        # Остальные проиграли честно: ошибка перехода, а не "database is locked"
+        self.assertTrue(all(isinstance(error, services.AdoptionTransitionError) for error in errors))
+        self.assertEqual(Adoption.objects.filter(status='approved').count(), 1)
+        self.animal.refresh_from_db()
+        self.assertEqual(self.animal.status, 'adopted')
+
+    def test_queued_writes_share_transactions(self):
+        # Пока писатель занят, записи копятся и уходят одной транзакцией
+        started, release = threading.Event(), threading.Event()
+        blocker = write_queue.submit(lambda: (started.set(), release.wait()))
+        started.wait()
+        batches = write_queue.batches
+        futures = [
+            write_queue.submit(services.reject, adoption, f"Причина {adoption.pk}")
+            for adoption in self.adoptions
+        ]
+        release.set()
+        blocker.result()
+        for future in futures:
+            future.result()
+
+        self.assertEqual(write_queue.batches - batches, 1)
+        self.assertEqual(Adoption.objects.filter(status='rejected').count(), len(self.adoptions))
+
+    def test_failed_write_does_not_roll_back_neighbours(self):
+        release = threading.Event()
+        blocker = write_queue.submit(release.wait)
+        ok = write_queue.submit(services.reject, self.adoptions[0], "Причина")
+        failed = write_queue.submit(services.reject, self.adoptions[1], "")
+        release.set()
+        blocker.result()
+
+        self.assertEqual(ok.result().status, 'rejected')
+        with self.assertRaises(services.AdoptionTransitionError):
+            failed.result()
+        self.assertEqual(Adoption.objects.get(pk=self.adoptions[0].pk).status, 'rejected')
+
+
+@override_settings(DATABASE_REPLICAS={'default': 'replica'}, REPLICA_STICKY_SECONDS=30)
+class DatabaseRoutingTests(SimpleTestCase):
+    """Чтение с реплики в помеченных представлениях и закрепление за основной БД после записи."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = {}
+
+        def get_response(request):
+            self.seen['animal'] = router.db_for_read(Animal)
+            self.seen['user'] = router.db_for_read(User)
+            return HttpResponse()
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def handle(self, request, view):
+        self.middleware.process_view(request, view, (), {})
+        return self.middleware(request)
+
+    def test_marked_view_reads_catalog_from_replica(self):
+        self.handle(self.factory.get('/'), replica_reads(lambda request: None))
+        self.assertEqual(self.seen, {'animal': 'replica', 'user': 'default'})
+        # После запроса чтение снова идёт в основную БД
+        self.assertEqual(router.db_for_read(Animal), 'default')
+
+    def test_unmarked_view_reads_primary(self):
+        self.handle(self.factory.get('/'), lambda request: None)
+        self.assertEqual(self.seen['animal'], 'default')
+
+    def test_write_pins_client_to_primary(self):
+        response = self.handle(self.factory.post('/'), replica_reads(lambda request: None))
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 30)
+
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.handle(request, replica_reads(lambda request: None))
+        self.assertEqual(self.seen['animal'], 'default')
+
+    def test_cached_page_is_rendered_from_primary(self):
+        """Общая копия страницы не берётся с отстающей реплики, а клиент после записи идёт мимо кэша."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        @replica_reads
+        @cached_page('animals')
+        def view(request):
+            self.seen['animal'] = router.db_for_read(Animal)
+            return HttpResponse('<p>Каталог</p>')
+
+        def get(cookies=None):
+            request = self.factory.get('/animals/')
+            request.user = AnonymousUser()
+            request.COOKIES.update(cookies or {})
+            middleware = ReplicaRoutingMiddleware(view)
+            middleware.process_view(request, view, (), {})
+            return middleware(request)
+
+        self.assertEqual(get()['X-Page-Cache'], 'miss')
+        self.assertEqual(self.seen['animal'], 'default')
+
+        self.seen.clear()
+        self.assertEqual(get({STICKY_COOKIE: '1'})['X-Page-Cache'], 'bypass')
+        self.assertEqual(self.seen['animal'], 'default')
+
+        self.seen.clear()
+        self.assertEqual(get()['X-Page-Cache'], 'hit')
+        self.assertEqual(self.seen, {})
+
+    @override_settings(DATABASE_APPS={'activities': 'activities'})
+    def test_relation_to_other_database_is_prefetched(self):
+        plan_for.cache_clear()
+        self.addCleanup(plan_for.cache_clear)
+        self.assertEqual(plan_for(ActivitySerializer, Activity), ((), ('created_by',)))
+        self.assertFalse(router.allow_migrate('default', 'activities'))
+        self.assertTrue(router.allow_migrate('activities', 'activities'))
+        self.assertFalse(router.allow_migrate('replica', 'animals'))
+
+
+class QueryBudgetTests(TestCase):
+    """Каждый URL приложений укладывается в объявленный бюджет SQL-запросов."""
+
+    URLCONFS = ['animals.urls', 'adoptions.urls', 'activities.urls', 'users.urls']
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username="admin", role="admin")
+        self.volunteer = User.objects.create(username="volunteer", role="volunteer")
+        self.adopter = User.objects.create(username="adopter", role="adopter")
+        # По нескольку записей в каждом списке: N+1 сразу выйдет за бюджет
+        self.animals = [
+            Animal.objects.create(name=f"Животное {i}", species="dog", health_status="healthy")
+            for i in range(4)
+        ]
+        for animal in self.animals:
+            for j in range(2):
+                AnimalPhoto.objects.create(animal=animal, photo_url=f"animals/{animal.pk}-{j}.jpg")
+        self.adoptions = [Adoption.objects.create(user=self.adopter, animal=animal) for animal in self.animals[:3]]
+        services.approve(self.adoptions[0])
+        self.return_obj = services.return_animal(self.adoptions[0], "Аллергия", processed_by=self.admin)
+        self.activities = [
+            Activity.objects.create(
+                title=f"Новость {i}", description="Текст", activity_type="news",
+                created_by=[self.admin, self.volunteer][i % 2],
+            )
+            for i in range(4)
+        ]
+
+    def cases(self):
+        """Имя URL -> (аргументы, пользователь)."""
+        animal, adoption, activity = self.animals[1], self.adoptions[1], self.activities[0]
+        photo = animal.photos.first()
+        return {
+            'api_animals': ({}, self.adopter),
+            'api_animal_detail': ({'pk': animal.pk}, self.adopter),
+            'api_animal_card_cache': ({}, self.admin),
+            'api_animals_import': ({}, self.admin),
+            'api_animals_export': ({'extension': 'ndjson'}, self.admin),
+            'api_animal_photos': ({'animal_id': animal.pk}, self.adopter),
+            'api_photo_detail': ({'pk': photo.pk}, self.adopter),
+            'animal_list': ({}, self.adopter),
+            'create_animal': ({}, self.volunteer),
+            'animal_detail': ({'slug': animal.slug}, self.adopter),
+            'edit_animal': ({'slug': animal.slug}, self.volunteer),
+            'delete_animal': ({'slug': animal.slug}, self.volunteer),
+            'api_adoptions': ({}, self.admin),
+            'api_adoptions_batch': ({}, self.admin),
+            'api_adoption_detail': ({'pk': adoption.pk}, self.adopter),
+            'api_returns': ({}, self.admin),
+            'api_return_detail': ({'pk': self.return_obj.pk}, self.admin),
+            'api_adoptions_export': ({'extension': 'csv'}, self.admin),
+            'api_returns_export': ({'extension': 'csv'}, self.admin),
+            'adoption_list': ({}, self.admin),
+            'adoption_detail': ({'pk': adoption.pk}, self.adopter),
+            'return_list': ({}, self.admin),
+            'home': ({}, self.adopter),
+            'activity_feed': ({}, self.adopter),
+            'activity_feed_items': ({}, self.adopter),
+            'create_activity': ({}, self.volunteer),
+            'edit_activity': ({'pk': activity.pk}, self.volunteer),
+            'delete_activity': ({'pk': activity.pk}, self.volunteer),
+            'api_activities': ({}, self.adopter),
+            'api_activity_detail': ({'pk': activity.pk}, self.adopter),
+            'api_activities_export': ({'extension': 'ndjson'}, self.admin),
+            'register': ({}, None),
+            'login': ({}, None),
+            'logout': ({}, self.adopter),
+            'api_users': ({}, self.admin),
+            'api_user_detail': ({'pk': self.adopter.pk}, self.admin),
+        }
+
+    def test_every_url_within_budget(self):
+        cases = self.cases()
+        for urlconf in self.URLCONFS:
+            for pattern in import_module(urlconf).urlpatterns:
+                with self.subTest(url=pattern.name):
+                    self.assertIn(pattern.name, cases, "Нет сценария для URL")
+                    budget = view_budget(pattern.callback)
+                    self.assertIsNotNone(budget, "Представление не объявило query_budget")
+
+                    kwargs, user = cases[pattern.name]
+                    client = Client()
+                    if user is not None:
+                        client.force_login(user)
+                    response = client.get(reverse(pattern.name, kwargs=kwargs))
+                    stats = response.wsgi_request.query_stats
+                    self.assertLessEqual(
+                        stats.count, budget,
+                        f"{pattern.name}: {stats.count} запросов при бюджете {budget}, повторы: {stats.duplicates()}",
+                    )
+
+    def test_server_timing_header(self):
+        client = Client()
+        client.force_login(self.adopter)
+        response = client.get(reverse('api_animals'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries, \d+ repeated", app;dur=[\d.]+$')
+
+    def test_budget_overrun_is_logged_with_repeated_queries(self):
+        @query_budget(1)
+        def view(request):
+            for animal in Animal.objects.all():
+                list(animal.photos.all())
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(view)
+        request = RequestFactory().get('/')
+        middleware.process_view(request, view, (), {})
+        with self.assertLogs('config.instrumentation', 'WARNING') as logs:
+            middleware(request)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'query_budget_exceeded')
+        self.assertEqual(record['queries'], 1 + len(self.animals))
+        self.assertEqual(record['duplicates'][0]['count'], len(self.animals))
+
+
+class SeedShelterTests(TestCase):
+    """Генерация данных для нагрузочного теста и расчёт отчёта."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_seed_keeps_invariants(self):
+        volumes = {'users': 12, 'animals': 15, 'adoptions': 40, 'activities': 6}
+        seed_shelter(volumes, batch_size=7, seed=1)
+
+        User = get_user_model()
+        self.assertEqual(User.objects.count(), 12)
+        self.assertEqual(Animal.objects.count(), 15)
+        self.assertEqual(Adoption.objects.count(), 40)
+        self.assertEqual(Activity.objects.count(), 6)
+        self.assertFalse(Animal.objects.filter(slug='').exists())
+        self.assertTrue(User.objects.filter(role='admin').exists())
+        # Ровно одна одобренная заявка на каждое усыновлённое животное
+        self.assertEqual(
+            Adoption.objects.filter(status='approved').count(),
+            Animal.objects.filter(status='adopted').count(),
+        )
+        self.assertEqual(Return.objects.count(), Adoption.objects.filter(status='returned').count())
+        # Производные фото готовы: показ каталога не ставит задачи в очередь
+        self.assertFalse(AnimalPhoto.objects.exclude(derivatives_name=models.F('photo_url')).exists())
+        self.client.get(reverse('animal_list'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_report_percentiles_and_comparison(self):
+        self.assertEqual(percentile([0.1, 0.2, 0.3, 0.4], 0.5), 0.2)
+        self.assertEqual(percentile([0.1, 0.2, 0.3, 0.4], 0.99), 0.4)
+        self.assertIsNone(percentile([], 0.5))
+        self.assertEqual(percentile(list(range(1, 21)), 0.95), 19)
+        self.assertEqual(percentile(list(range(1, 101)), 0.95), 95)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
+        self.assertEqual(percentile(list(range(1, 101)), 0.07), 7)
+
+        baseline = summarize({'home': [0.1] * 20}, {}, elapsed=2)
+        current = summarize({'home': [0.1] * 18 + [0.3, 0.3]}, {'home': 1}, elapsed=2)
+        self.assertEqual(current['endpoints']['home']['errors'], 1)
+        self.assertEqual(current['endpoints']['home']['rps'], 10)
+        name, old_p95, new_p95, change, _, _ = compare_reports(baseline, current)[0]
+        self.assertEqual((name, old_p95, new_p95, change), ('home', 100.0, 300.0, 200.0))
+
+
+class BenchmarkTests(TestCase):
+    """Микробенчмарки: каждый запускается, регрессия определяется по порогу."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_all_benchmarks_run(self):
+        with mock.patch.object(benchmarks, 'MIN_SERIES_SECONDS', 0):
+            report = benchmarks.run_benchmarks(size=3, repeat=1)
+        self.assertEqual(set(report['benchmarks']), set(benchmarks.BENCHMARKS))
+        for result in report['benchmarks'].values():
+            self.assertGreater(result['best_us'], 0)
+
+    def test_slug_benchmark_keeps_table_size(self):
+        """Каждый замер вставки видит одно и то же число совпадающих имён."""
+        run = benchmarks.BENCHMARKS['model.animal_save_slug'](3)
+        count = Animal.objects.count()
+        for _ in range(5):
+            run()
+        self.assertEqual(Animal.objects.count(), count)
+
+    def test_compare_flags_regressions_over_threshold(self):
+        baseline = {'benchmarks': {'fast': {'best_us': 100.0}, 'slow': {'best_us': 100.0}}}
+        report = {'benchmarks': {'fast': {'best_us': 110.0}, 'slow': {'best_us': 130.0}, 'new': {'best_us': 5.0}}}
+        rows = {row[0]: row for row in benchmarks.compare(baseline, report, threshold=0.2)}
+        self.assertFalse(rows['fast'][4])
+        self.assertTrue(rows['slow'][4])
+        self.assertAlmostEqual(rows['slow'][3], 0.3)
+        self.assertEqual(rows['new'][1:], (None, 5.0, None, False))
+
+
+class ProfilerTests(TestCase):
+    """Профиль по флагу администратора и страница профилей."""
+
+    def setUp(self):
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir, ignore_errors=True)
+        override = override_settings(PROFILES_DIR=self.profiles_dir, PROFILER_INTERVAL=0.001)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.admin = User.objects.create(username="admin", role="admin", is_staff=True)
+        self.adopter = User.objects.create(username="adopter", role="adopter")
+
+    def test_sampler_collects_stacks_of_request_thread(self):
+        def busy():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with Sampler(threading.get_ident(), 0.001) as sampler:
+            busy()
+        self.assertGreater(sum(sampler.stacks.values()), 0)
+        self.assertIn('test_sampler_collects_stacks_of_request_thread.<locals>.busy', sampler.collapsed())
+        profile = sampler.speedscope('busy')['profiles'][0]
+        self.assertEqual(len(profile['samples']), len(profile['weights']))
+
+    def test_admin_flag_writes_profile_listed_in_admin(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('api_animals'), HTTP_X_PROFILE='1')
+        profile_id = response['X-Profile-Id']
+
+        page = self.client.get(reverse('profile_list'))
+        self.assertContains(page, 'api_animals')
+        download = self.client.get(reverse('profile_download', args=[profile_id, 'speedscope']))
+        data = json.loads(b''.join(download.streaming_content))
+        self.assertEqual(data['profiles'][0]['type'], 'sampled')
+        self.assertEqual(self.client.get(reverse('profile_download', args=['..', 'collapsed'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('profile_download', args=[profile_id, 'meta'])).status_code, 404)
+
+    def test_flag_ignored_for_non_admin(self):
+        self.client.force_login(self.adopter)
+        response = self.client.get(reverse('api_animals') + '?_profile=1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 302)
+
+    def test_role_admin_without_staff_flag_profiles_and_sees_list(self):
+        """Снимать профили и смотреть их список разрешено одним и тем же пользователям."""
+        manager = User.objects.create(username="manager", role="admin", is_staff=False)
+        self.client.force_login(manager)
+        profile_id = self.client.get(reverse('api_animals'), HTTP_X_PROFILE='1')['X-Profile-Id']
+        self.assertContains(self.client.get(reverse('profile_list')), profile_id)
+        download = self.client.get(reverse('profile_download', args=[profile_id, 'collapsed']))
+        self.assertEqual(download.status_code, 200)
+        download.close()
+
+
+def _child_metrics():
+    metrics.CACHE_REQUESTS.inc(2, cache='card', result='hit')
+    metrics.IN_FLIGHT.inc()
+
+
+class MetricsTests(TestCase):
+    """/metrics: метрики представлений и сложение значений процессов."""
+
+    def setUp(self):
+        cache.clear()
+        self.run_metrics_dir = settings.METRICS_DIR
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        override = override_settings(METRICS_DIR=self.metrics_dir, METRICS_TOKEN='secret')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_views_report_requests_latency_db_and_templates(self):
+        Animal.objects.create(name="Шарик", species="dog", health_status="healthy")
+        self.client.get(reverse('animal_list'))
+        self.client.get(reverse('animal_list'))
+        self.client.get(reverse('api_animals'))
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        self.assertIn('pawshelter_http_requests_total{view="animal_list",method="GET",status="200"} 2.0', text)
+        self.assertIn('pawshelter_http_requests_total{view="api_animals",method="GET",status="403"} 1.0', text)
+        self.assertIn('pawshelter_http_request_duration_seconds_bucket{view="api_animals",method="GET",le="+Inf"} 1.0', text)
+        self.assertIn('pawshelter_db_duration_seconds_count{view="animal_list"} 2.0', text)
+        # Попадание в кэш страниц тоже рендерит шаблоны фрагментов
+        self.assertIn('pawshelter_template_render_seconds_count{view="animal_list"} 2.0', text)
+        self.assertNotIn('pawshelter_template_render_seconds_count{view="api_animals"}', text)
+        self.assertIn('pawshelter_cache_requests_total{cache="page",result="miss"} 1.0', text)
+        self.assertIn('pawshelter_cache_requests_total{cache="page",result="hit"} 1.0', text)
+        # Сам запрос /metrics ещё обрабатывается
+        self.assertIn('pawshelter_http_requests_in_flight 1.0', text)
+
+    @skipUnless(hasattr(os, 'fork'), "нужен fork")
+    def test_values_of_all_processes_are_summed(self):
+        metrics.CACHE_REQUESTS.inc(cache='card', result='hit')
+        metrics.IN_FLIGHT.inc()
+        child = multiprocessing.get_context('fork').Process(target=_child_metrics)
+        child.start()
+        child.join()
+
+        samples = metrics.collect()
+        self.assertEqual(samples['pawshelter_cache_requests_total'][
+            ('pawshelter_cache_requests_total', (('cache', 'card'), ('result', 'hit')))
+        ], 3)
+        # gauge завершившегося процесса не учитывается
+        self.assertEqual(samples['pawshelter_http_requests_in_flight'][('pawshelter_http_requests_in_flight', ())], 1)
+        # файл завершившегося процесса перенесён в merged.db и удалён
+        self.assertEqual(
+            sorted(path.name for path in Path(self.metrics_dir).glob('*.db')),
+            sorted([f'{os.getpid()}.db', metrics.MERGED_FILE]),
+        )
+        self.assertEqual(metrics.collect()['pawshelter_cache_requests_total'][
+            ('pawshelter_cache_requests_total', (('cache', 'card'), ('result', 'hit')))
+        ], 3)
+
+    def test_test_run_writes_metrics_to_its_own_directory(self):
+        self.assertIn('pawshelter-test-metrics-', self.run_metrics_dir)
+
+    def test_metrics_forbidden_without_token_even_from_localhost(self):
+        """За прокси на том же хосте REMOTE_ADDR у всех 127.0.0.1: по умолчанию адресам не верим."""
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_allowed_for_listed_address(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5').status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.6').status_code, 403)
+
+    def test_metrics_allowed_with_bearer_token(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+    def test_mmap_file_grows_and_reopens(self):
+        path = os.path.join(self.metrics_dir, 'values.db')
+        values = metrics.MmapValues(path)
+        for index in range(3000):
+            values.add(f'key-{index}', index)
+        values.add('key-7', 1)
+        self.assertEqual(dict(metrics.read_values(path))['key-2999'], 2999)
+        reopened = metrics.MmapValues(path)
+        reopened.add('key-7', 1)
+        self.assertEqual(dict(metrics.read_values(path))['key-7'], 9)
@@ -20,12 +20,20 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from . import views
+
 urlpatterns = [
+    # Раньше admin/: иначе адреса перехватит сам сайт администратора.
+    # Доступ - как к снятию профиля (config.profiler.can_profile), а не по is_staff
+    path("admin/profiles/", views.profile_list, name="profile_list"),
+    path("admin/profiles/<str:profile_id>/<str:fmt>/", views.profile_download, name="profile_download"),
     path("admin/", admin.site.urls),
+    path("metrics", views.metrics, name="metrics"),
     path("users/", include("users.urls")),
     path("", include("activities.urls")),
     path("", include("animals.urls")),
     path("", include("adoptions.urls")),
+    path("", include("sync.urls")),
 ]
 
 # Для обслуживания медиа файлов в режиме разработки
@@ -0,0 +1,47 @@
+import hmac
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.decorators import user_passes_test
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+
+from .metrics import CONTENT_TYPE, render_metrics
+from .profiler import can_profile, profile_path, recent_profiles
+
+PROFILE_FORMATS = {'speedscope': '.speedscope.json', 'collapsed': '.collapsed'}
+
+
+@never_cache
+@user_passes_test(can_profile)
+def profile_list(request):
+    """Последние профили запросов (см. config/profiler.py)."""
+    return render(request, 'admin/profiles.html', {
+        **admin.site.each_context(request),
+        'title': "Профили запросов",
+        'profiles': recent_profiles(),
+    })
+
+
+@never_cache
+@user_passes_test(can_profile)
+def profile_download(request, profile_id, fmt):
+    path = profile_path(profile_id, PROFILE_FORMATS[fmt]) if fmt in PROFILE_FORMATS else None
+    if path is None:
+        raise Http404("Профиль не найден")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Метрики всех процессов сервера в текстовом формате Prometheus."""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden("Метрики доступны только серверу мониторинга")
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedupe_key', 'last_error']
+    readonly_fields = ['created_at', 'updated_at', 'finished_at', 'locked_by', 'locked_at', 'last_error']
+    actions = ['retry_selected']
+
+    @admin.action(description="Повторить выбранные задачи")
+    def retry_selected(self, request, queryset):
+        now = timezone.now()
+        updated = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_at=now, finished_at=None, updated_at=now
+        )
+        self.message_user(request, f"Возвращено в очередь: {updated}")
@@ -0,0 +1,14 @@
+from importlib import import_module
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "jobs"
+
+    def ready(self):
+        # Модули с обработчиками (@register) должны быть загружены и в воркере
+        for module in getattr(settings, 'JOB_MODULES', []):
+            import_module(module)
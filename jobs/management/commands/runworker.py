@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import default_worker_id, run_worker
+
+
+class Command(BaseCommand):
+    help = "Выполняет фоновые задачи из очереди (можно запускать несколько процессов)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Сколько задач выполнять одновременно")
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help="Пул потоков (ввод-вывод) или процессов (вычисления)")
+        parser.add_argument('--poll', type=float, default=1.0, help="Пауза между опросами пустой очереди, с")
+        parser.add_argument('--once', action='store_true', help="Выполнить готовые задачи и выйти")
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        self.stdout.write(f"Воркер {worker_id}: {options['mode']} x {options['concurrency']}")
+        processed = run_worker(
+            concurrency=options['concurrency'], mode=options['mode'], poll=options['poll'],
+            once=options['once'], worker_id=worker_id, stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Обработано задач: {processed}"))
@@ -0,0 +1,46 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди (см. jobs/queue.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField("Задача", max_length=100)
+    kwargs = models.JSONField("Аргументы", default=dict, blank=True)
+    status = models.CharField("Статус", max_length=20, choices=STATUS_CHOICES, default='queued')
+    # Пока задача с этим ключом в очереди или выполняется, такая же не добавляется
+    dedupe_key = models.CharField("Ключ дедупликации", max_length=200, null=True, blank=True)
+    run_at = models.DateTimeField("Выполнить не раньше", default=timezone.now)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveIntegerField("Максимум попыток", default=5)
+    locked_by = models.CharField("Воркер", max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField("Взята в работу", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True, default='')
+    created_at = models.DateTimeField("Дата создания", auto_now_add=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+    finished_at = models.DateTimeField("Дата завершения", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            # Выбор готовых задач воркером: status='queued' AND run_at <= now по порядку
+            models.Index(fields=['status', 'run_at', 'id'], name='job_status_run_at_idx'),
+            # Захваченные одним запросом задачи ищутся по метке захвата
+            models.Index(fields=['locked_by'], name='job_locked_by_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=models.Q(status__in=['queued', 'running']),
+                name='job_active_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,203 @@
+"""
+Очередь фоновых задач в базе проекта.
+
+Задача - строка Job: имя зарегистрированного обработчика и JSON-аргументы.
+enqueue() добавляет её в той же транзакции, что и данные, которые её
+породили: откат транзакции отменяет и задачу, а после коммита задача не
+потеряется при перезапуске процесса. Выполняет задачи команда runworker.
+
+Захват задач - условный UPDATE, как и переходы заявок (adoptions/services.py):
+готовые задачи переводятся в running с уникальной меткой захвата только
+при status='queued', поэтому из нескольких процессов-воркеров задачу
+получает ровно один - и на SQLite, и на серверной СУБД, без блокировок
+строк. Задачи, чей воркер упал, через JOB_LEASE_SECONDS возвращаются в
+очередь (после max_attempts попыток - failed), поэтому обработчик может
+выполниться повторно и должен быть идемпотентным. Ошибки повторяются с экспоненциальной задержкой.
+"""
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_ATTEMPTS = 5
+# Задержка перед повтором: JOB_RETRY_BASE_SECONDS * 2^(попытка-1), не больше JOB_RETRY_MAX_SECONDS
+JOB_RETRY_BASE_SECONDS = 10
+JOB_RETRY_MAX_SECONDS = 60 * 60
+# Через сколько задача без завершения считается брошенной упавшим воркером
+JOB_LEASE_SECONDS = 10 * 60
+# Сколько хранить выполненные задачи
+JOB_KEEP_DONE_DAYS = 7
+ACTIVE_STATUSES = ('queued', 'running')
+
+_handlers = {}
+
+
+def register(name):
+    """Декоратор: регистрирует функцию (**kwargs) как обработчик задачи name."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, kwargs=None, dedupe_key=None, delay=0, max_attempts=JOB_MAX_ATTEMPTS):
+    """Ставит задачу name(**kwargs) в очередь; kwargs должны сериализоваться в JSON.
+
+    С dedupe_key задача не дублируется, пока такая же в очереди или
+    выполняется: возвращается уже существующая.
+    """
+    job = Job(
+        name=name, kwargs=kwargs or {}, dedupe_key=dedupe_key, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if dedupe_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status__in=ACTIVE_STATUSES).first()
+        if existing is None:
+            raise
+        return existing
+    return job
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker_id, limit):
+    """Захватывает до limit готовых задач; возвращает их id по порядку."""
+    now = timezone.now()
+    # Задачи упавших воркеров возвращаются в очередь, пока не исчерпаны попытки:
+    # задача, которая сама роняет воркер, иначе повторялась бы бесконечно
+    expired = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=JOB_LEASE_SECONDS))
+    expired.filter(attempts__lt=F('max_attempts')).update(status='queued', locked_by='', updated_at=now)
+    expired.update(
+        status='failed', locked_by='', last_error="Истёк срок захвата: воркер не завершил задачу",
+        finished_at=now, updated_at=now,
+    )
+
+    candidates = list(
+        Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id').values_list('pk', flat=True)[:limit]
+    )
+    if not candidates:
+        return []
+    # Метка захвата уникальна: по ней находятся задачи, которые достались именно нам
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    Job.objects.filter(pk__in=candidates, status='queued').update(
+        status='running', locked_by=token, locked_at=now, attempts=F('attempts') + 1, updated_at=now,
+    )
+    return list(Job.objects.filter(locked_by=token, status='running').order_by('run_at', 'id').values_list('pk', flat=True))
+
+
+def retry_delay(attempts):
+    delay = min(JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), JOB_RETRY_MAX_SECONDS)
+    # Разброс, чтобы одновременно упавшие задачи не повторялись одной волной
+    return delay * random.uniform(0.9, 1.1)
+
+
+def execute(pk):
+    """Выполняет захваченную задачу pk и записывает результат; True - успех."""
+    try:
+        job = Job.objects.get(pk=pk)
+        # Отметки ставятся только пока задача наша (её не вернули в очередь по таймауту)
+        ours = Job.objects.filter(pk=pk, status='running', locked_by=job.locked_by)
+        try:
+            handler = _handlers.get(job.name)
+            if handler is None:
+                raise LookupError(f"Неизвестная задача: {job.name}")
+            handler(**job.kwargs)
+        except Exception as exc:
+            logger.exception("Ошибка задачи %s #%s (попытка %s)", job.name, pk, job.attempts)
+            now = timezone.now()
+            error = f'{type(exc).__name__}: {exc}'
+            if job.attempts >= job.max_attempts:
+                ours.update(status='failed', last_error=error, finished_at=now, updated_at=now)
+            else:
+                ours.update(
+                    status='queued', last_error=error, locked_by='', updated_at=now,
+                    run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+                )
+            return False
+        now = timezone.now()
+        ours.update(status='done', finished_at=now, updated_at=now)
+        return True
+    finally:
+        close_old_connections()
+
+
+def purge_finished(days=JOB_KEEP_DONE_DAYS):
+    """Удаляет выполненные задачи старше days дней (с ошибкой - оставляет для разбора)."""
+    return Job.objects.filter(status='done', finished_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
+
+
+def _init_process():
+    # Унаследованные от родителя соединения не закрываем (закрытие в дочернем
+    # процессе оборвало бы соединение родителя), а просто забываем: процесс
+    # откроет свои при первом запросе
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+
+
+def run_worker(concurrency=4, mode='thread', poll=1.0, once=False, worker_id=None, stdout=None):
+    """Цикл воркера: захватывает задачи по числу свободных исполнителей пула.
+
+    mode='thread' подходит для задач, ожидающих ввода-вывода, mode='process'
+    - для тяжёлых вычислений (миниатюры). once=True - выполнить готовые
+    задачи и выйти (для cron и тестов).
+    """
+    worker_id = worker_id or default_worker_id()
+    if mode == 'process':
+        # fork: дочерние процессы наследуют настроенный Django и реестр обработчиков
+        pool = ProcessPoolExecutor(
+            max_workers=concurrency, mp_context=multiprocessing.get_context('fork'), initializer=_init_process,
+        )
+    else:
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+
+    in_flight = set()
+    processed = 0
+    last_purge = None
+    try:
+        while True:
+            if last_purge is None or time.monotonic() - last_purge > 60 * 60:
+                purge_finished()
+                last_purge = time.monotonic()
+            free = concurrency - len(in_flight)
+            claimed = claim(worker_id, free) if free else []
+            for pk in claimed:
+                in_flight.add(pool.submit(execute, pk))
+            close_old_connections()
+
+            if not in_flight:
+                if once:
+                    break
+                time.sleep(poll)
+                continue
+            done, in_flight = wait(in_flight, timeout=poll, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    logger.error("Сбой исполнителя задач: %r", future.exception())
+            processed += len(done)
+    except KeyboardInterrupt:
+        if stdout:
+            stdout.write("Остановка: дожидаемся выполняющихся задач")
+    finally:
+        pool.shutdown(wait=True)
+    return processed + len(in_flight)
@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from animals.models import Animal, AnimalPhoto
+from config.images import generate_derivatives
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.register('tests.record')
+def record(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError("сбой")
+
+
+class JobQueueTests(TestCase):
+    """Очередь задач: дедупликация, захват, повторы с задержкой."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_dedupe_key_while_active(self):
+        first = queue.enqueue('tests.record', {'value': 1}, dedupe_key='k')
+        self.assertEqual(queue.enqueue('tests.record', {'value': 2}, dedupe_key='k').pk, first.pk)
+        self.assertEqual(queue.claim('w', 10), [first.pk])
+        queue.execute(first.pk)
+        # После выполнения задачу с тем же ключом снова можно поставить
+        self.assertNotEqual(queue.enqueue('tests.record', {'value': 3}, dedupe_key='k').pk, first.pk)
+
+    def test_claim_gives_each_job_to_one_worker(self):
+        jobs = [queue.enqueue('tests.record', {'value': index}) for index in range(5)]
+        queue.enqueue('tests.record', {'value': 'later'}, delay=60)
+        first = queue.claim('w1', 3)
+        second = queue.claim('w2', 10)
+        self.assertEqual(first, [job.pk for job in jobs[:3]])
+        self.assertEqual(second, [job.pk for job in jobs[3:]])
+        self.assertEqual(queue.claim('w3', 10), [])
+
+    def test_retry_with_backoff_then_fail(self):
+        job = queue.enqueue('tests.record', {'value': 'x', 'fail': True}, max_attempts=2)
+        queue.claim('w', 1)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(queue.execute(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertIn("сбой", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        queue.claim('w', 1)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.execute(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(calls, ['x', 'x'])
+
+    def test_abandoned_job_is_reclaimed(self):
+        job = queue.enqueue('tests.record', {'value': 1})
+        queue.claim('crashed', 1)
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(seconds=queue.JOB_LEASE_SECONDS + 1)
+        )
+        self.assertEqual(queue.claim('w', 1), [job.pk])
+        self.assertTrue(queue.execute(job.pk))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'done')
+
+    def test_job_crashing_worker_fails_after_max_attempts(self):
+        """Задача, каждый раз роняющая воркер, не возвращается в очередь бесконечно."""
+        job = queue.enqueue('tests.record', {'value': 1}, max_attempts=2)
+        expired = timezone.now() - timedelta(seconds=queue.JOB_LEASE_SECONDS + 1)
+        for _ in range(2):
+            self.assertEqual(queue.claim('crashed', 1), [job.pk])
+            Job.objects.filter(pk=job.pk).update(locked_at=expired)
+        self.assertEqual(queue.claim('w', 1), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIn("Истёк срок захвата", job.last_error)
+
+
+class ImageJobsTests(TestCase):
+    """Миниатюры и удаление файлов выполняются фоновыми задачами."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_photo_jobs(self):
+        buffer = BytesIO()
+        Image.new("RGB", (300, 200), "green").save(buffer, "JPEG")
+        animal = Animal.objects.create(name="Рыжик", species="Кот", health_status="Здоров")
+        photo = AnimalPhoto.objects.create(
+            animal=animal, photo_url=SimpleUploadedFile("ryzhik.jpg", buffer.getvalue())
+        )
+        job = Job.objects.get(name='images.generate_derivatives')
+        self.assertEqual(job.kwargs["pk"], photo.pk)
+
+        generate_derivatives(AnimalPhoto, photo.pk, photo.photo_url.name)
+        storage, name = photo.photo_url.storage, photo.photo_url.name
+        card = name.rsplit(".", 1)[0] + ".card.webp"
+        self.assertTrue(storage.exists(card))
+
+        # Удаление животного каскадом удаляет фото, файлы - задачей
+        animal.delete()
+        cleanup = Job.objects.get(name='images.delete_files')
+        claimed = queue.claim('w', 10)
+        self.assertEqual(claimed, [job.pk, cleanup.pk])
+        for pk in claimed:
+            self.assertTrue(queue.execute(pk))
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(card))
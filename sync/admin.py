@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Change
+
+@admin.register(Change)
+class ChangeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'model', 'object_id', 'deleted', 'changed_at']
+    list_filter = ['model', 'deleted']
+    search_fields = ['object_id']
+    readonly_fields = ['model', 'object_id', 'deleted', 'changed_at']
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:09
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=50, verbose_name="Модель")),
+                ("object_id", models.BigIntegerField(verbose_name="Id записи")),
+                ("deleted", models.BooleanField(default=False, verbose_name="Удалена")),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now(),
+                        verbose_name="Время изменения",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Изменение",
+                "verbose_name_plural": "Журнал изменений",
+                "indexes": [
+                    models.Index(
+                        fields=["model", "object_id"], name="sync_change_object_idx"
+                    )
+                ],
+            },
+        ),
+    ]
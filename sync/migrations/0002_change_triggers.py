@@ -0,0 +1,100 @@
+from django.db import migrations
+
+# Модель (как в журнале изменений) -> таблица
+SYNC_TABLES = {
+    "animals.animal": "animals_animal",
+    "animals.animalphoto": "animals_animalphoto",
+    "activities.activity": "activities_activity",
+    "adoptions.adoption": "adoptions_adoption",
+}
+
+SQLITE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS sync_{table}_{op} AFTER {op} ON {table}
+BEGIN
+    DELETE FROM sync_change WHERE model = '{label}' AND object_id = {row}.id;
+    INSERT INTO sync_change (model, object_id, deleted) VALUES ('{label}', {row}.id, {deleted});
+END
+"""
+
+# Транзакционная advisory-блокировка выстраивает пишущие транзакции в очередь:
+# номер изменения, выданный позже, не может быть закоммичен раньше
+POSTGRESQL_FUNCTION = """
+CREATE OR REPLACE FUNCTION sync_record_change() RETURNS trigger AS $$
+DECLARE
+    row_id bigint;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('sync_change'));
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id;
+    ELSE
+        row_id := NEW.id;
+    END IF;
+    DELETE FROM sync_change WHERE model = TG_ARGV[0] AND object_id = row_id;
+    INSERT INTO sync_change (model, object_id, deleted) VALUES (TG_ARGV[0], row_id, TG_OP = 'DELETE');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+POSTGRESQL_TRIGGER = """
+CREATE TRIGGER sync_{table}_change AFTER INSERT OR UPDATE OR DELETE ON {table}
+FOR EACH ROW EXECUTE FUNCTION sync_record_change('{label}')
+"""
+
+
+def local_tables(connection):
+    # Таблицы приложений, вынесенных в другую БД (DATABASE_APPS), журналируют
+    # сигналы sync/signals.py: триггер не может писать в таблицу другой БД
+    existing = set(connection.introspection.table_names())
+    return {label: table for label, table in SYNC_TABLES.items() if table in existing}
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    tables = local_tables(schema_editor.connection)
+    if vendor == "sqlite":
+        for label, table in tables.items():
+            for op, row, deleted in (("INSERT", "NEW", 0), ("UPDATE", "NEW", 0), ("DELETE", "OLD", 1)):
+                schema_editor.execute(SQLITE_TRIGGER.format(
+                    table=table, op=op, label=label, row=row, deleted=deleted,
+                ))
+    elif vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_FUNCTION)
+        for label, table in tables.items():
+            schema_editor.execute(POSTGRESQL_TRIGGER.format(table=table, label=label))
+    else:
+        return
+
+    # Уже существующие записи попадают в журнал, чтобы первая синхронизация их получила
+    for label, table in tables.items():
+        schema_editor.execute(
+            f"INSERT INTO sync_change (model, object_id, deleted) "
+            f"SELECT '{label}', id, %s FROM {table} ORDER BY id",
+            [False],
+        )
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for table in SYNC_TABLES.values():
+            for op in ("INSERT", "UPDATE", "DELETE"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS sync_{table}_{op}")
+    elif vendor == "postgresql":
+        for table in SYNC_TABLES.values():
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS sync_{table}_change ON {table}")
+        schema_editor.execute("DROP FUNCTION IF EXISTS sync_record_change()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sync", "0001_initial"),
+        ("animals", "0007_updated_at"),
+        ("activities", "0007_updated_at"),
+        ("adoptions", "0008_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
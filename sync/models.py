@@ -0,0 +1,30 @@
+from django.db import models
+from django.db.models.functions import Now
+
+
+class Change(models.Model):
+    """Последнее изменение записи синхронизируемой модели.
+
+    Строки пишут триггеры БД (миграция 0002_change_triggers) на каждый
+    INSERT/UPDATE/DELETE, поэтому в журнал попадают и изменения через
+    .update() и bulk_create, которые обходят сигналы. Для каждой записи
+    хранится только последнее изменение: триггер удаляет предыдущее.
+    id - номер изменения; AUTOINCREMENT не выдаёт номера повторно даже после
+    удаления строк, поэтому номер монотонно растёт и служит токеном синхронизации.
+    """
+    model = models.CharField("Модель", max_length=50)
+    object_id = models.BigIntegerField("Id записи")
+    # Запись удалена (tombstone): клиенту нужно удалить её у себя
+    deleted = models.BooleanField("Удалена", default=False)
+    changed_at = models.DateTimeField("Время изменения", db_default=Now())
+
+    class Meta:
+        verbose_name = "Изменение"
+        verbose_name_plural = "Журнал изменений"
+        indexes = [
+            # Поиск предыдущего изменения записи в триггере
+            models.Index(fields=['model', 'object_id'], name='sync_change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.model}:{self.object_id}{' (удалена)' if self.deleted else ''}"
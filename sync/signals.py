@@ -0,0 +1,47 @@
+"""
+Журнал изменений для моделей из другой БД (DATABASE_APPS, config/routers.py).
+
+Триггер не может писать в sync_change чужой БД, поэтому для таких моделей
+изменения записывают сигналы - после коммита транзакции их БД, чтобы номер
+изменения не достался откатившейся записи. Массовые .update() и
+bulk_create сигналов не вызывают и в журнал в этом случае не попадают;
+исключение - отметка о готовых миниатюрах (derivatives_ready из
+config/images.py), она журналируется своим сигналом.
+"""
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from config.images import derivatives_ready
+from config.routers import same_database
+from .models import Change
+from .views import SYNC_TYPES
+
+
+def record_change(label, object_id, deleted):
+    with transaction.atomic(using=Change.objects.db):
+        Change.objects.filter(model=label, object_id=object_id).delete()
+        Change.objects.create(model=label, object_id=object_id, deleted=deleted)
+
+
+def _on_save(sender, instance, using, **kwargs):
+    transaction.on_commit(partial(record_change, sender._meta.label_lower, instance.pk, False), using=using)
+
+
+def _on_delete(sender, instance, using, **kwargs):
+    transaction.on_commit(partial(record_change, sender._meta.label_lower, instance.pk, True), using=using)
+
+
+def _on_derivatives_ready(sender, pk, using, **kwargs):
+    transaction.on_commit(partial(record_change, sender._meta.label_lower, pk, False), using=using)
+
+
+def connect_signals():
+    for label in SYNC_TYPES:
+        model = apps.get_model(label)
+        if not same_database(model, Change):
+            post_save.connect(_on_save, sender=model, dispatch_uid=f'sync_{label}_save')
+            post_delete.connect(_on_delete, sender=model, dispatch_uid=f'sync_{label}_delete')
+            derivatives_ready.connect(_on_derivatives_ready, sender=model, dispatch_uid=f'sync_{label}_derivatives')
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from activities.models import Activity
+from adoptions import services
+from adoptions.models import Adoption
+from animals.models import Animal
+from config.images import derivatives_ready
+from .models import Change
+from .signals import connect_signals
+
+User = get_user_model()
+
+
+class ChangesFeedTests(TestCase):
+    """Журнал изменений для офлайн-клиентов: токены, tombstone и права."""
+
+    def setUp(self):
+        self.volunteer = User.objects.create_user(username="volunteer", role="volunteer")
+        self.animal = Animal.objects.create(name="Барсик", species="Кот", health_status="Здоров")
+        self.activity = Activity.objects.create(
+            title="Кормление", description="Утро", activity_type="feeding", created_by=self.volunteer
+        )
+        self.adoption = Adoption.objects.create(
+            user=User.objects.create_user(username="adopter"), animal=self.animal, rejection_reason=""
+        )
+
+    def _sync(self, user, since=None, **params):
+        self.client.force_login(user)
+        if since is not None:
+            params["since"] = since
+        response = self.client.get(reverse("api_changes"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_sync_then_only_changes(self):
+        first = self._sync(self.volunteer)
+        self.assertEqual(
+            {(item["type"], item["id"]) for item in first["changes"]},
+            {("animal", self.animal.pk), ("activity", self.activity.pk), ("adoption", self.adoption.pk)},
+        )
+        self.assertFalse(first["has_more"])
+
+        # UPDATE из services и удаление тоже попадают в журнал
+        services.approve(self.adoption)
+        activity_id = self.activity.pk
+        self.activity.delete()
+        changes = self._sync(self.volunteer, first["next"])["changes"]
+        by_type = {item["type"]: item for item in changes}
+        self.assertEqual(set(by_type), {"animal", "adoption", "activity"})
+        self.assertEqual(by_type["animal"]["data"]["status"], "adopted")
+        self.assertEqual(by_type["adoption"]["data"]["status"], "approved")
+        self.assertEqual(by_type["activity"], {
+            "seq": by_type["activity"]["seq"], "type": "activity", "id": activity_id, "deleted": True,
+        })
+        # Для записи хранится только последнее изменение
+        self.assertEqual(Change.objects.filter(model="animals.animal", object_id=self.animal.pk).count(), 1)
+
+        latest = self._sync(self.volunteer, changes[-1]["seq"])
+        self.assertEqual(latest["changes"], [])
+        self.assertEqual(latest["next"], str(changes[-1]["seq"]))
+
+    def test_paging(self):
+        first = self._sync(self.volunteer, limit=2)
+        self.assertEqual(len(first["changes"]), 2)
+        self.assertTrue(first["has_more"])
+        rest = self._sync(self.volunteer, first["next"], limit=2)
+        self.assertEqual(len(rest["changes"]), 1)
+        self.assertFalse(rest["has_more"])
+
+    def test_adopter_does_not_get_adoptions(self):
+        changes = self._sync(User.objects.get(username="adopter"))["changes"]
+        self.assertNotIn("adoption", {item["type"] for item in changes})
+
+    @override_settings(DATABASE_APPS={"activities": "activities"})
+    def test_derivatives_of_model_in_other_database_are_recorded(self):
+        """Отметка о миниатюрах - .update() без post_save, журналирует её derivatives_ready."""
+        connect_signals()
+        self.addCleanup(post_save.disconnect, dispatch_uid="sync_activities.activity_save")
+        self.addCleanup(post_delete.disconnect, dispatch_uid="sync_activities.activity_delete")
+        self.addCleanup(derivatives_ready.disconnect, dispatch_uid="sync_activities.activity_derivatives")
+        before = Change.objects.get(model="activities.activity", object_id=self.activity.pk).pk
+        with self.captureOnCommitCallbacks(execute=True):
+            derivatives_ready.send(sender=Activity, pk=self.activity.pk, using="default")
+        self.assertGreater(Change.objects.get(model="activities.activity", object_id=self.activity.pk).pk, before)
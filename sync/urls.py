@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ChangesAPI
+
+urlpatterns = [
+    path("api/changes/", ChangesAPI.as_view(), name="api_changes"),
+]
@@ -0,0 +1,75 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from activities.models import Activity
+from activities.serializers import ActivitySerializer
+from adoptions.models import Adoption
+from adoptions.serializers import AdoptionSerializer
+from animals.models import Animal, AnimalPhoto
+from animals.serializers import AnimalPhotoSerializer, AnimalSerializer
+from .models import Change
+
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 1000
+
+# Модель в журнале -> (тип в ответе, выборка для загрузки записей, сериализатор)
+SYNC_TYPES = {
+    'animals.animal': ('animal', lambda: Animal.objects.with_cards(), AnimalSerializer),
+    'animals.animalphoto': ('photo', lambda: AnimalPhoto.objects.all(), AnimalPhotoSerializer),
+    'activities.activity': ('activity', lambda: Activity.objects.with_author(), ActivitySerializer),
+    'adoptions.adoption': ('adoption', lambda: Adoption.objects.select_related('user', 'animal'), AdoptionSerializer),
+}
+# Заявки содержат данные пользователей - их синхронизируют только сотрудники
+STAFF_ONLY = {'adoptions.adoption'}
+
+
+class ChangesAPI(APIView):
+    """GET /api/changes/?since=<токен> - изменения после токена прошлой синхронизации.
+
+    Ответ: changes - записи по возрастанию номера изменения (для каждой записи
+    только её последнее состояние или tombstone deleted=true), next - токен
+    для следующего запроса, has_more - есть ли ещё страница. Первая
+    синхронизация - без since (или since=0).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since') or 0)
+            limit = int(request.query_params.get('limit') or CHANGES_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "since и limit должны быть целыми числами"}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({"error": "since и limit должны быть положительными"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, CHANGES_MAX_PAGE_SIZE)
+
+        labels = [
+            label for label in SYNC_TYPES
+            if label not in STAFF_ONLY or request.user.role in ['admin', 'volunteer']
+        ]
+        changes = list(Change.objects.filter(pk__gt=since, model__in=labels).order_by('pk')[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # Живые записи страницы - одним запросом на модель
+        objects = {}
+        for label in {change.model for change in changes}:
+            ids = [change.object_id for change in changes if change.model == label and not change.deleted]
+            objects[label] = SYNC_TYPES[label][1]().in_bulk(ids) if ids else {}
+
+        items = []
+        for change in changes:
+            type_name, _, serializer_class = SYNC_TYPES[change.model]
+            obj = objects[change.model].get(change.object_id)
+            item = {'seq': change.pk, 'type': type_name, 'id': change.object_id, 'deleted': obj is None}
+            # Записи без строки в БД (удаляется параллельно) отдаются как удалённые
+            if obj is not None:
+                item['data'] = serializer_class(obj).data
+            items.append(item)
+
+        return Response({
+            'changes': items,
+            'next': str(changes[-1].pk if changes else since),
+            'has_more': has_more,
+        })
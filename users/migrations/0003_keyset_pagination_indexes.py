@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0002_alter_customuser_options_alter_customuser_created_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(fields=["created_at", "id"], name="user_created_id_idx"),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.utils.text import slugify
+
+from config.slugs import save_with_slug
 
 
 class CustomUser(AbstractUser):
@@ -27,18 +28,14 @@ class CustomUser(AbstractUser):
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
         ordering = ['username']
+        indexes = [
+            # Keyset-пагинация API по (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='user_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.username
 
     def save(self, *args, **kwargs):
-        # Автоматически создаём slug из username, если не указан
-        if not self.slug:
-            base_slug = slugify(self.username)
-            slug = base_slug
-            counter = 1
-            while CustomUser.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        # Автоматически создаём slug из username (с транслитерацией), если не указан
+        save_with_slug(self, self.username, 'user', lambda: super(CustomUser, self).save(*args, **kwargs))
@@ -66,7 +66,7 @@ class AuthAndUsersTests(TestCase):
         url = reverse("api_users")
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = response.json()["results"]
         self.assertGreaterEqual(len(data), 2)
 
     def test_user_list_api_non_admin_sees_only_self(self):
@@ -75,7 +75,7 @@ class AuthAndUsersTests(TestCase):
         url = reverse("api_users")
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = response.json()["results"]
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["username"], "user")
 
@@ -96,3 +96,8 @@ class AuthAndUsersTests(TestCase):
         self.assertEqual(response.status_code, 403)
         self.assertFalse(User.objects.filter(username="apiuser").exists())
 
+    def test_cyrillic_usernames_get_unique_slugs(self):
+        """Кириллические логины транслитерируются, совпадения получают суффикс."""
+        first = User.objects.create_user(username="Иван")
+        second = User.objects.create_user(username="иван")
+        self.assertEqual((first.slug, second.slug), ("ivan", "ivan-1"))
@@ -4,11 +4,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from config.instrumentation import query_budget
+from config.pagination import KeysetPagination
+from config.query_plan import QueryPlanMixin
 from .forms import RegisterForm, LoginForm
 from .models import CustomUser
 from .serializers import UserSerializer, UserCreateSerializer
 
 
+@query_budget(0)
 def register_view(request):
     if request.method == "POST":
         form = RegisterForm(request.POST)
@@ -23,6 +27,7 @@ def register_view(request):
     return render(request, "users/register.html", {"form": form})
 
 
+@query_budget(0)
 def login_view(request):
     if request.method == "POST":
         form = LoginForm(data=request.POST)
@@ -35,14 +40,17 @@ def login_view(request):
     return render(request, "users/login.html", {"form": form})
 
 
+@query_budget(4)
 def logout_view(request):
     logout(request)
     return redirect("/")
 
 
 # API Views
-class UserListAPI(APIView):
+@query_budget(3)
+class UserListAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = UserSerializer
     
     def get(self, request):
         # Администраторы видят всех пользователей, остальные - только себя
@@ -51,8 +59,10 @@ class UserListAPI(APIView):
         else:
             users = CustomUser.objects.filter(id=request.user.id)
         
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination('created_at')
+        page = paginator.paginate_queryset(self.optimize_queryset(users), request)
+        serializer = UserSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     def post(self, request):
         # Только администраторы могут создавать пользователей через API
@@ -69,12 +79,14 @@ class UserListAPI(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserDetailAPI(APIView):
+@query_budget(3)
+class UserDetailAPI(QueryPlanMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = UserSerializer
     
     def get_object(self, pk):
         try:
-            return CustomUser.objects.get(pk=pk)
+            return self.optimize_queryset(CustomUser.objects.all()).get(pk=pk)
         except CustomUser.DoesNotExist:
             return None
     